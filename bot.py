@@ -1,9 +1,10 @@
 import discord
 from discord.ext import commands
 import asyncio
-from cogs.survey_modal import SurveyModerationView
 from templates.survey_template import SurveyButton
-from utils.db import init_db
+from utils.db import db, init_db
+from utils.config import guild_config
+from utils.cards import cards
 
 with open('token.txt', 'r') as file:
     TOKEN = file.read().strip()
@@ -21,6 +22,7 @@ async def load_extensions():
         "cogs.welcome",
         "cogs.template",
         "cogs.survey_com",
+        "cogs.survey_accept",
         "cogs.leveling",
         "cogs.leveling_com", 
         "cogs.leveling_push",
@@ -29,6 +31,9 @@ async def load_extensions():
         "cogs.moderation.moderation_warns",
         "cogs.moderation.moderation_mute",
         "cogs.moderation.moderation_del",
+        "cogs.moderation.moderation_bulk",
+        "cogs.moderation.moderation_automod",
+        "cogs.moderation.moderation_flood",
     ]
     
     for ext in extensions:
@@ -41,9 +46,6 @@ async def load_extensions():
 @bot.event
 async def on_ready():
     bot.add_view(SurveyButton())
-    # Удалите эту строку или замените на что-то вроде:
-    if hasattr(SurveyModerationView, 'user_id'):
-        bot.add_view(SurveyModerationView(user_id=0))
     
     print(f"✅ Бот {bot.user} запущен и готов к работе!")
     print(f"✅ Подключен к {len(bot.guilds)} серверам")
@@ -75,10 +77,17 @@ async def sync(ctx):
 
 async def main():
     init_db()
+    guild_config.load()
     
-    async with bot:
-        await load_extensions()
-        await bot.start(TOKEN)
+    try:
+        async with bot:
+            guild_config.start()
+            await load_extensions()
+            await bot.start(TOKEN)
+    finally:
+        await cards.close()
+        await guild_config.close()
+        await db.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
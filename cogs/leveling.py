@@ -1,12 +1,19 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import datetime
 import asyncio
-import random
+import io
 import json
-from pathlib import Path
+import random
 from typing import Optional
+from utils.db import db
+from utils.xp_buffer import XPBuffer
+from utils.ranking import Leaderboards
+from utils.level_curve import curve
+from utils.xp_ledger import XPLedger, SOURCE_VOICE
+from utils.voice_sessions import VoiceSessions
+from utils.cooldowns import CooldownTracker
+from utils.cards import cards
 
 class LevelingSystem(commands.Cog):
     """Система уровней с текстовой и голосовой активностью"""
@@ -16,106 +23,189 @@ class LevelingSystem(commands.Cog):
         'text_xp_max': 25,
         'voice_xp_per_min': 20,
         'xp_cooldown': 60,
-        'base_xp': 100,
-        'xp_multiplier': 50,
+        'cooldown_save_interval': 10,  # Чаще кулдауна, иначе после сбоя сохранённые записи уже истекли
         'voice_multiplier': 1.5,
         'save_interval': 300,
+        'xp_flush_interval': 5,
+        'xp_flush_size': 200,
+        'ledger_compact_interval': 3600,
         'leaderboard_users_per_page': 10
     }
 
     def __init__(self, bot):
         self.bot = bot
-        self.voice_users = {}
-        self.last_message = {}
+        self.voice_sessions = VoiceSessions()
+        self.cooldowns = CooldownTracker(self.LEVEL_SETTINGS['xp_cooldown'])
+        self.ledger = XPLedger()
+        self.xp_buffer = XPBuffer(
+            curve.level_for,
+            ledger=self.ledger,
+            flush_interval=self.LEVEL_SETTINGS['xp_flush_interval'],
+            max_pending=self.LEVEL_SETTINGS['xp_flush_size']
+        )
+        self.leaderboards = Leaderboards(
+            db.get_guild_scores,
+            per_page=self.LEVEL_SETTINGS['leaderboard_users_per_page']
+        )
         self.voice_task = self.bot.loop.create_task(self.voice_activity_task())
-        self.user_data_path = Path("data/users")
-        self.user_data_path.mkdir(parents=True, exist_ok=True)
+        self.compact_task = None
+        self.cooldown_task = None
+
+    async def cog_load(self):
+        snapshot_lsn = int(await db.get_meta("xp_ledger_lsn") or 0)
+        await self.ledger.open(snapshot_lsn)
+        self.xp_buffer.snapshot_lsn = snapshot_lsn
+        await self._recover_xp(snapshot_lsn)
+        await self._sync_level_curve()
+        # Кулдауны переживают перезапуск: иначе он открывал бы окно для накрутки опыта
+        self.cooldowns.load(json.loads(await db.get_meta("xp_cooldowns") or "[]"))
+        self.xp_buffer.start()
+        self.compact_task = asyncio.create_task(self.ledger_compact_task())
+        self.cooldown_task = asyncio.create_task(self.cooldown_save_task())
+        if self.bot.is_ready():
+            # Ког перезагружен на работающем боте: on_ready больше не придёт
+            await self._restore_voice_sessions()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         if self.voice_task:
             self.voice_task.cancel()
+        if self.compact_task:
+            self.compact_task.cancel()
+        if self.cooldown_task:
+            self.cooldown_task.cancel()
+        # Начисляем открытые сессии, иначе перезапуск съедает до save_interval голосового времени
+        try:
+            await self._accrue_voice(self.voice_sessions.collect())
+        except Exception as e:
+            print(f"Ошибка при начислении голосового опыта: {e}")
+        await self._save_cooldowns()
+        await self.xp_buffer.close()
+        await self.ledger.close()
+
+    async def _recover_xp(self, snapshot_lsn):
+        """Проигрывает записи журнала, не попавшие в базу до остановки бота"""
+        records = await self.ledger.read_after(snapshot_lsn)
+        if not records:
+            return
+
+        deltas = {}
+        for record in records:
+            delta = deltas.setdefault(
+                (record.guild_id, record.user_id),
+                {"text_xp": 0, "voice_xp": 0, "voice_time": 0}
+            )
+            delta["text_xp"] += record.text_xp
+            delta["voice_xp"] += record.voice_xp
+            delta["voice_time"] += record.voice_time
 
-    def _get_user_data(self, user_id):
-        """Загружает данные пользователя"""
-        file_path = self.user_data_path / f"{user_id}.json"
-        if file_path.exists():
+        rows = [
+            {"guild_id": guild_id, "user_id": user_id, **delta, "level": None}
+            for (guild_id, user_id), delta in deltas.items()
+        ]
+        await db.apply_xp_batch(rows, records[-1].lsn)
+        self.xp_buffer.snapshot_lsn = records[-1].lsn
+        for guild_id in {guild_id for guild_id, _ in deltas}:
+            await db.recompute_levels(guild_id, curve)
+        print(f"✅ Восстановлено из журнала опыта: {len(records)} записей")
+
+    async def ledger_compact_task(self):
+        """Фоновая задача: сжимает и чистит сегменты журнала, вошедшие в снимок"""
+        while True:
+            await asyncio.sleep(self.LEVEL_SETTINGS['ledger_compact_interval'])
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return {"user_id": user_id}
-        return {"user_id": user_id}
-
-    def _save_user_data(self, user_id, data):
-        """Сохраняет данные пользователя"""
-        file_path = self.user_data_path / f"{user_id}.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-
-    def get_level_xp(self, level):
-        """Рассчитывает необходимый опыт для уровня"""
-        return int((level ** 2) * self.LEVEL_SETTINGS['xp_multiplier'] + self.LEVEL_SETTINGS['base_xp'])
-
-    def get_level_from_xp(self, xp):
-        """Определяет уровень на основе опыта"""
-        level = 1
-        while xp >= self.get_level_xp(level):
-            level += 1
-        return level
+                await self.ledger.compact(self.xp_buffer.snapshot_lsn)
+            except Exception as e:
+                print(f"Ошибка при сжатии журнала опыта: {e}")
+
+    async def _save_cooldowns(self):
+        await db.set_meta("xp_cooldowns", json.dumps(self.cooldowns.dump()))
+
+    async def cooldown_save_task(self):
+        """Фоновая задача: сохраняет кулдауны, чтобы они пережили и аварийную остановку"""
+        while True:
+            await asyncio.sleep(self.LEVEL_SETTINGS['cooldown_save_interval'])
+            try:
+                await self._save_cooldowns()
+            except Exception as e:
+                print(f"Ошибка при сохранении кулдаунов: {e}")
+
+    async def _sync_level_curve(self):
+        """Пересчитывает сохранённые уровни, если параметры кривой изменились"""
+        if await db.get_meta("level_curve") == curve.signature:
+            return
+        for guild_id in await db.get_leveling_guilds():
+            changed = await db.recompute_levels(guild_id, curve)
+            if changed:
+                print(f"✅ Пересчитаны уровни на сервере {guild_id}: {changed}")
+        await db.set_meta("level_curve", curve.signature)
+
+    @staticmethod
+    def _is_voice_active(member, state):
+        """Засчитывается ли время: участник слышит и может говорить, и не в AFK-канале"""
+        if state.channel is None or state.channel == member.guild.afk_channel:
+            return False
+        return not (state.self_mute or state.mute or state.self_deaf or state.deaf)
+
+    async def _restore_voice_sessions(self):
+        """Восстанавливает голосовые сессии по тем, кто сейчас сидит в голосовых каналах"""
+        states = {}
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    if not member.bot and member.voice:
+                        states[(guild.id, member.id)] = (channel.id, self._is_voice_active(member, member.voice))
+
+        # Тех, кто вышел, пока бот был отключён от шлюза, рассчитываем по последнему каналу
+        ended = self.voice_sessions.sync(states)
+        await self._accrue_voice(ended)
+        print(f"✅ Восстановлено голосовых сессий: {len(self.voice_sessions)}")
+
+    async def _accrue_voice(self, sessions):
+        """Начисляет голосовой опыт по списку [((guild_id, user_id), channel_id, минуты)]"""
+        by_guild = {}
+        for (guild_id, user_id), channel_id, minutes in sessions:
+            by_guild.setdefault(guild_id, []).append((user_id, channel_id, minutes))
+
+        for guild_id, entries in by_guild.items():
+            await self.xp_buffer.preload(guild_id, [user_id for user_id, _, _ in entries])
+            for user_id, channel_id, minutes in entries:
+                xp_earned = int(minutes * self.LEVEL_SETTINGS['voice_xp_per_min'])
+                if xp_earned <= 0:
+                    continue
+                new_level = await self._update_user_xp(user_id, guild_id, xp_earned, True, minutes)
+                if new_level and (channel := self.bot.get_channel(channel_id)):
+                    member = channel.guild.get_member(user_id)
+                    await channel.send(
+                        f"🎉 {member.mention if member else f'<@{user_id}>'} достиг {new_level} уровня в голосовом канале!",
+                        delete_after=10
+                    )
 
     async def voice_activity_task(self):
-        """Фоновая задача для обработки голосовой активности"""
+        """Фоновая задача: раз в интервал начисляет опыт всем сессиям и сохраняет его одной транзакцией"""
         while True:
             await asyncio.sleep(self.LEVEL_SETTINGS['save_interval'])
-            for user_id, (channel_id, join_time) in list(self.voice_users.items()):
-                if channel := self.bot.get_channel(channel_id):
-                    minutes = (datetime.datetime.now() - join_time).total_seconds() / 60
-                    await self._update_user_xp(
-                        user_id=user_id,
-                        guild_id=channel.guild.id,
-                        xp_earned=minutes * self.LEVEL_SETTINGS['voice_xp_per_min'],
-                        is_voice=True,
-                        voice_minutes=minutes
-                    )
-                    self.voice_users[user_id] = (channel_id, datetime.datetime.now())
+            try:
+                await self._accrue_voice(self.voice_sessions.collect())
+                await self.xp_buffer.flush()
+            except Exception as e:
+                print(f"Ошибка при начислении голосового опыта: {e}")
 
     async def _update_user_xp(self, user_id, guild_id, xp_earned=0, is_voice=False, voice_minutes=0):
         """Обновляет опыт пользователя"""
-        user_data = self._get_user_data(user_id)
-        
-        if "leveling" not in user_data:
-            user_data["leveling"] = self._get_default_leveling_data()
-        
         xp_earned = int(xp_earned * (self.LEVEL_SETTINGS['voice_multiplier'] if is_voice else 1))
-        
+
         if is_voice:
-            user_data["leveling"]["voice_xp"] += xp_earned
-            user_data["leveling"]["voice_time"] += voice_minutes
+            old_level, new_level = await self.xp_buffer.add(
+                guild_id, user_id, voice_xp=xp_earned, voice_time=voice_minutes, source=SOURCE_VOICE
+            )
         else:
-            user_data["leveling"]["text_xp"] += xp_earned
-        
-        user_data["leveling"]["total_xp"] += xp_earned
-        
-        old_level = user_data["leveling"]["level"]
-        new_level = max(1, self.get_level_from_xp(user_data["leveling"]["total_xp"]))
-        user_data["leveling"]["level"] = new_level
-        
-        self._save_user_data(user_id, user_data)
-        
+            old_level, new_level = await self.xp_buffer.add(guild_id, user_id, text_xp=xp_earned)
+        self.leaderboards.update(guild_id, user_id, self.xp_buffer.totals[(guild_id, user_id)]["total_xp"])
+
         if new_level > old_level:
             return new_level
         return None
 
-    def _get_default_leveling_data(self):
-        """Возвращает стандартные данные для нового пользователя"""
-        return {
-            "text_xp": 0,
-            "voice_xp": 0,
-            "total_xp": 0,
-            "level": 1,
-            "voice_time": 0
-        }
-
     def _create_progress_bar(self, progress):
         """Создает строку прогресс-бара"""
         filled = '⬜'
@@ -139,13 +229,9 @@ class LevelingSystem(commands.Cog):
             return
 
         user_id = message.author.id
-        now = datetime.datetime.now().timestamp()
-
-        if user_id in self.last_message:
-            if now - self.last_message[user_id] < self.LEVEL_SETTINGS['xp_cooldown']:
-                return
+        if not self.cooldowns.hit((message.guild.id, user_id)):
+            return
 
-        self.last_message[user_id] = now
         xp = random.randint(self.LEVEL_SETTINGS['text_xp_min'], self.LEVEL_SETTINGS['text_xp_max'])
         if new_level := await self._update_user_xp(user_id, message.guild.id, xp):
             await message.channel.send(
@@ -153,64 +239,77 @@ class LevelingSystem(commands.Cog):
                 delete_after=10
             )
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self._restore_voice_sessions()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        await self._restore_voice_sessions()
+
+    @commands.Cog.listener()
+    async def on_disconnect(self):
+        # Время без связи не засчитываем: сессии закрываются по последнему известному моменту
+        self.voice_sessions.suspend()
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        """Обработчик голосовой активности"""
+        """Обработчик голосовой активности: вход, выход, переход, заглушение"""
         if member.bot or not member.guild:
             return
 
-        user_id = member.id
-        now = datetime.datetime.now()
+        key = (member.guild.id, member.id)
+        if after.channel is not None:
+            self.voice_sessions.update(key, after.channel.id, self._is_voice_active(member, after))
+        elif (session := self.voice_sessions.end(key)) is not None:
+            channel_id, minutes = session
+            await self._accrue_voice([(key, channel_id, minutes)])
 
-        if before.channel is None and after.channel is not None:
-            self.voice_users[user_id] = (after.channel.id, now)
-        elif before.channel is not None and after.channel is None and user_id in self.voice_users:
-            channel_id, join_time = self.voice_users.pop(user_id)
-            minutes = (now - join_time).total_seconds() / 60
-            xp_earned = int(minutes * self.LEVEL_SETTINGS['voice_xp_per_min'])
-            
-            if xp_earned > 0 and (new_level := await self._update_user_xp(
-                user_id, member.guild.id, xp_earned, True, minutes
-            )):
-                if channel := self.bot.get_channel(channel_id):
-                    await channel.send(
-                        f"🎉 {member.mention} достиг {new_level} уровня в голосовом канале!",
-                        delete_after=10
-                    )
+    async def get_leaderboard(self, guild_id):
+        """Возвращает таблицу лидеров сервера"""
+        if not self.leaderboards.is_loaded(guild_id):
+            # База отстаёт от буфера, поэтому перед первой загрузкой сбрасываем его
+            await self.xp_buffer.flush()
+        return await self.leaderboards.get(guild_id)
 
-    def _get_user_rank(self, user_id):
+    async def _get_user_rank(self, user_id, guild_id):
         """Определяет ранг пользователя"""
-        all_users = []
-        for file in self.user_data_path.glob("*.json"):
-            if data := self._get_user_data(file.stem):
-                if "leveling" in data:
-                    all_users.append((data["user_id"], data["leveling"]["total_xp"]))
-        
-        all_users.sort(key=lambda x: x[1], reverse=True)
-        return next((i+1 for i, (uid, _) in enumerate(all_users) if uid == user_id), None)
+        index = await self.get_leaderboard(guild_id)
+        return index.rank(user_id)
 
     @app_commands.command(name="ранг", description="Показать ваш уровень и статистику")
     @app_commands.describe(участник="Участник, чей уровень хотите проверить")
     async def rank(self, interaction: discord.Interaction, участник: Optional[discord.Member] = None):
         """Команда для отображения ранга пользователя"""
         target = участник or interaction.user
-        user_data = self._get_user_data(target.id)
+        leveling_data = await self.xp_buffer.get(interaction.guild_id, target.id)
         
-        if "leveling" not in user_data:
+        if not leveling_data:
             return await interaction.response.send_message(
                 f"{target.display_name} ещё не имеет уровня.",
                 ephemeral=True
             )
 
-        leveling_data = user_data["leveling"]
         xp = leveling_data["total_xp"]
         level = leveling_data["level"]
         voice_time = leveling_data["voice_time"]
-        rank, _ = self._get_user_rank(target.id)
+        rank = await self._get_user_rank(target.id, interaction.guild_id)
         
-        current_level_xp = self.get_level_xp(level-1)
-        next_level_xp = self.get_level_xp(level)
+        current_level_xp = curve.xp_for_level(level-1)
+        next_level_xp = curve.xp_for_level(level)
         progress = min(100, int((xp - current_level_xp) / (next_level_xp - current_level_xp) * 100))
+
+        if cards.available:
+            # Первая отрисовка может занять больше 3 секунд (аватар, запуск пула)
+            await interaction.response.defer()
+            try:
+                card = await cards.rank_card(
+                    target, level, rank, xp - current_level_xp, next_level_xp - current_level_xp,
+                    self.format_voice_time(voice_time), discord.Color.gold().to_rgb()
+                )
+                return await interaction.followup.send(file=discord.File(io.BytesIO(card), "rank.png"))
+            except Exception as e:
+                print(f"Ошибка отрисовки карточки ранга: {e}")
         
         embed = discord.Embed(title=f"Статистика {target.display_name}", color=discord.Color.gold())
         embed.add_field(name="🔢 Ранг", value=f"#{rank}" if rank else "Н/Д", inline=True)
@@ -223,19 +322,17 @@ class LevelingSystem(commands.Cog):
             inline=False
         )
         embed.set_thumbnail(url=target.display_avatar.url)
-        await interaction.response.send_message(embed=embed)
+        if interaction.response.is_done():
+            await interaction.followup.send(embed=embed)
+        else:
+            await interaction.response.send_message(embed=embed)
 
     @app_commands.command(name="лидеры", description="Топ активных участников сервера")
     async def top(self, interaction: discord.Interaction):
         """Команда для отображения таблицы лидеров"""
-        all_users = []
-        for file in self.user_data_path.glob("*.json"):
-            if data := self._get_user_data(file.stem):
-                if "leveling" in data:
-                    all_users.append((data["user_id"], data["leveling"]))
-        
-        all_users.sort(key=lambda x: x[1]["total_xp"], reverse=True)
-        total_pages = len(all_users) // self.LEVEL_SETTINGS['leaderboard_users_per_page']  # Округление вверх
+        per_page = self.LEVEL_SETTINGS['leaderboard_users_per_page']
+        index = await self.get_leaderboard(interaction.guild_id)
+        total_pages = max(1, -(-len(index) // per_page))  # Округление вверх
         
         view = LeaderboardView(self.bot, interaction.guild_id, total_pages)
         embed = await view.create_leaderboard_embed(page=1)
@@ -254,42 +351,52 @@ class LeaderboardView(discord.ui.View):
 
     async def create_leaderboard_embed(self, page):
         """Создает embed для текущей страницы"""
+        leveling_cog = self.bot.get_cog("LevelingSystem")
+        index = await leveling_cog.get_leaderboard(self.guild_id)
+        self.total_pages = max(1, -(-len(index) // 10))
+
+        # Листание в основном попадает в кэш: страница перерисовывается,
+        # только если через неё прошёл участник с изменившимся опытом
+        pages = leveling_cog.leaderboards.pages
+        sort = leveling_cog.leaderboards.SORT_XP
+        description = pages.get(self.guild_id, page, sort)
+        if description is None:
+            generation = pages.generation(self.guild_id, page, sort)
+            description = await self._render_page(leveling_cog, index, page)
+            pages.put(self.guild_id, page, sort, generation, description)
+
+        embed = discord.Embed(
+            title=f"Топ рейтинга участников (Страница {page}/{self.total_pages})",
+            description=description,
+            color=discord.Color.blurple()
+        )
+        embed.set_footer(text=f"Всего участников: {len(index)}")
+        return embed
+
+    async def _render_page(self, leveling_cog, index, page):
+        """Отрисовывает текст страницы таблицы лидеров"""
         offset = (page - 1) * 10
-        user_files = Path("data/users").glob("*.json")
-        all_users = []
-        
-        for file in user_files:
-            with open(file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if "leveling" in data:
-                    all_users.append(data)
-        
-        all_users.sort(key=lambda x: x["leveling"]["total_xp"], reverse=True)
-        top_users = all_users[offset:offset+10]
+        page_users = index.page(offset, 10)
+        profiles = await leveling_cog.xp_buffer.get_many(self.guild_id, [user_id for user_id, _ in page_users])
+        top_users = [profiles[user_id] for user_id, _ in page_users if user_id in profiles]
         guild = self.bot.get_guild(self.guild_id)
         
         leaderboard = []
         for i, user in enumerate(top_users, start=offset+1):
             member = guild.get_member(user["user_id"]) if guild else None
             name = member.display_name if member else f"Неизвестный ({user['user_id']})"
-            voice_time = LevelingSystem.format_voice_time(user["leveling"]["voice_time"])
+            voice_time = LevelingSystem.format_voice_time(user["voice_time"])
             
             if i == 1:
-                entry = f"🏆 **#{i}. {name}**\nУровень: {user['leveling']['level']} | Опыт: {user['leveling']['total_xp']} | 🔊 {voice_time}"
+                entry = f"🏆 **#{i}. {name}**\nУровень: {user['level']} | Опыт: {user['total_xp']} | 🔊 {voice_time}"
             elif i in (2, 3):
-                entry = f"🎖️ **#{i}. {name}**\nУровень: {user['leveling']['level']} | Опыт: {user['leveling']['total_xp']} | 🔊 {voice_time}"
+                entry = f"🎖️ **#{i}. {name}**\nУровень: {user['level']} | Опыт: {user['total_xp']} | 🔊 {voice_time}"
             else:
-                entry = f"**#{i}. {name}**\nУровень: {user['leveling']['level']} | Опыт: {user['leveling']['total_xp']}" + (f" | 🔊 {voice_time}" if user["leveling"]["voice_time"] > 0 else "")
+                entry = f"**#{i}. {name}**\nУровень: {user['level']} | Опыт: {user['total_xp']}" + (f" | 🔊 {voice_time}" if user["voice_time"] > 0 else "")
             
             leaderboard.append(entry)
 
-        embed = discord.Embed(
-            title=f"Топ рейтинга участников (Страница {page}/{self.total_pages})",
-            description="\n\n".join(leaderboard) if leaderboard else "Нет данных",
-            color=discord.Color.blurple()
-        )
-        embed.set_footer(text=f"Всего участников: {len(all_users)}")
-        return embed
+        return "\n\n".join(leaderboard) if leaderboard else "Нет данных"
     
     @discord.ui.button(label="◀", style=discord.ButtonStyle.gray, disabled=True)
     async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
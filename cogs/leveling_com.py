@@ -1,105 +1,63 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-from pathlib import Path
 from typing import Optional
+from utils.xp_ledger import SOURCE_ADMIN
 
 class LevelingCommands(commands.Cog):
     """Команды для управления системой уровней"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.data_path = Path("data/users")
-        self.data_path.mkdir(parents=True, exist_ok=True)
         
         # Настройки опыта (совместимость с leveling.py)
         self.xp_settings = {
             'voice_xp_per_min': 20,
-            'min_xp': 0,
-            'max_level': 100
+            'min_xp': 0
         }
 
-    def _load_user_data(self, user_id: int) -> dict:
-        """Загружает данные пользователя из файла"""
-        file_path = self.data_path / f"{user_id}.json"
-        try:
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {"user_id": user_id}
-        except (json.JSONDecodeError, IOError):
-            return {"user_id": user_id}
-
-    def _save_user_data(self, user_id: int, data: dict):
-        """Сохраняет данные пользователя в файл"""
-        file_path = self.data_path / f"{user_id}.json"
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            return True
-        except IOError:
-            return False
-
-    def _init_leveling_data(self, user_data: dict) -> dict:
-        """Инициализирует данные уровня, если их нет"""
-        if "leveling" not in user_data:
-            user_data["leveling"] = {
-                "text_xp": 0,
-                "voice_xp": 0,
-                "total_xp": 0,
-                "level": 1,
-                "voice_time": 0
-            }
-        return user_data
-
-    def _calculate_level(self, total_xp: int) -> int:
-        """Рассчитывает уровень на основе общего опыта"""
-        level = 1
-        while total_xp >= self._get_level_requirement(level) and level < self.xp_settings['max_level']:
-            level += 1
-        return min(level, self.xp_settings['max_level'])
-
-    def _get_level_requirement(self, level: int) -> int:
-        """Возвращает необходимый опыт для уровня"""
-        return 100 * (level ** 2)  # Базовый расчет (можно адаптировать)
+    def _default_leveling_data(self) -> dict:
+        """Возвращает данные уровня для нового пользователя"""
+        return {
+            "text_xp": 0,
+            "voice_xp": 0,
+            "total_xp": 0,
+            "level": 1,
+            "voice_time": 0
+        }
 
-    async def _update_user_stats(self, user_id: int, xp_change: int, voice_minutes: int = 0) -> tuple:
+    async def _update_user_stats(self, user_id: int, guild_id: int, xp_change: int, voice_minutes: int = 0) -> tuple:
         """Обновляет статистику пользователя и возвращает (старый_уровень, новый_уровень)"""
-        user_data = self._load_user_data(user_id)
-        user_data = self._init_leveling_data(user_data)
-        
-        old_level = user_data["leveling"]["level"]
-        
-        # Обновляем опыт
-        user_data["leveling"]["total_xp"] = max(
-            self.xp_settings['min_xp'],
-            user_data["leveling"]["total_xp"] + xp_change
-        )
+        # Правка проходит через буфер опыта, чтобы попасть в журнал наравне с обычным начислением
+        leveling_cog = self.bot.get_cog("LevelingSystem")
+        if not leveling_cog:
+            raise RuntimeError("система уровней не загружена")
+
+        leveling = await leveling_cog.xp_buffer.get(guild_id, user_id) or self._default_leveling_data()
         
-        # Обновляем голосовое время (если указано)
+        # Снятие не может увести опыт и время ниже нуля (и общий опыт ниже минимума)
+        min_change = self.xp_settings['min_xp'] - leveling["total_xp"]
         if voice_minutes:
-            user_data["leveling"]["voice_time"] = max(
-                0,
-                user_data["leveling"]["voice_time"] + voice_minutes
-            )
-            user_data["leveling"]["voice_xp"] = max(
-                0,
-                user_data["leveling"]["voice_xp"] + int(voice_minutes * self.xp_settings['voice_xp_per_min'])
+            voice_time = max(-leveling["voice_time"], voice_minutes)
+            text_xp = 0
+            voice_xp = max(
+                -leveling["voice_xp"],
+                min_change,
+                int(voice_minutes * self.xp_settings['voice_xp_per_min'])
             )
         else:
-            user_data["leveling"]["text_xp"] = max(
-                0,
-                user_data["leveling"]["text_xp"] + xp_change
-            )
-        
-        # Пересчитываем уровень
-        user_data["leveling"]["level"] = self._calculate_level(user_data["leveling"]["total_xp"])
-        new_level = user_data["leveling"]["level"]
+            voice_time = 0
+            text_xp = max(-leveling["text_xp"], min_change, xp_change)
+            voice_xp = 0
         
-        # Сохраняем изменения
-        if not self._save_user_data(user_id, user_data):
-            raise IOError("Не удалось сохранить данные пользователя")
+        old_level, new_level = await leveling_cog.xp_buffer.add(
+            guild_id, user_id,
+            text_xp=text_xp, voice_xp=voice_xp, voice_time=voice_time,
+            source=SOURCE_ADMIN
+        )
+        leveling_cog.leaderboards.update(
+            guild_id, user_id, leveling_cog.xp_buffer.totals[(guild_id, user_id)]["total_xp"]
+        )
         
         return old_level, new_level
 
@@ -151,7 +109,7 @@ class LevelingCommands(commands.Cog):
             
             if тип.value == "general":
                 # Общий опыт
-                old_level, new_level = await self._update_user_stats(участник.id, amount)
+                old_level, new_level = await self._update_user_stats(участник.id, interaction.guild_id, amount)
                 
                 action_word = "начислен" if действие.value == "add" else "снят"
                 message = f"✅ {участник.mention}: {action_word} {количество} общего опыта"
@@ -163,7 +121,8 @@ class LevelingCommands(commands.Cog):
                 # Голосовой опыт
                 voice_xp = int(amount * self.xp_settings['voice_xp_per_min'])
                 old_level, new_level = await self._update_user_stats(
-                    участник.id, 
+                    участник.id,
+                    interaction.guild_id,
                     voice_xp,
                     voice_minutes=amount
                 )
@@ -1,109 +1,191 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
+import asyncio
 import datetime
-import json
-from pathlib import Path
+import heapq
+import itertools
+import time
+from typing import Optional
+from cogs.leveling import LeaderboardView
+from utils.config import guild_config
+from utils.db import db
+from utils.post_schedule import Slot, parse_slots, get_timezone
+
+PREPARE_LEAD = 60          # За сколько секунд до публикации собирать таблицу
+CATCH_UP_WINDOW = 6 * 3600  # Пропущенную за время простоя публикацию догоняем, если опоздали не больше чем на это
+CONFIG_CHECK = 60           # Как часто проверять, не поменялись ли настройки (одно сравнение числа)
+
+PREPARE, POST = 0, 1
+
 
 class LevelingPush(commands.Cog):
-    """Автоматическая публикация таблицы лидеров"""
-    
+    """Автоматическая публикация таблицы лидеров.
+
+    Ближайшие публикации всех серверов лежат в куче, и задача спит до первой
+    из них, а не проверяет каждый сервер раз в минуту. Время последней
+    публикации каждого слота хранится в базе: после перезапуска пропущенный
+    слот публикуется сразу. За PREPARE_LEAD секунд до слота таблица
+    собирается заранее, чтобы в назначенное время осталось только отправить.
+    """
+
     def __init__(self, bot):
         self.bot = bot
-        self.schedule = {}
-        self.load_config()
-        self.daily_post.start()
-
-    def load_config(self):
-        """Загружает конфигурацию из файла"""
-        config_path = Path("data/leveling_config.json")
-        if config_path.exists():
-            try:
-                with open(config_path, "r", encoding="utf-8") as f:
-                    self.schedule = json.load(f)
-            except json.JSONDecodeError:
-                self.schedule = {}
-
-    def save_config(self):
-        """Сохраняет конфигурацию в файл"""
-        config_path = Path("data/leveling_config.json")
-        config_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(self.schedule, f, ensure_ascii=False, indent=4)
-
-    def update_guild_config(self, guild_id, channel_id=None, post_time=None):
+        self._queue = []
+        self._order = itertools.count()
+        self._prepared = {}
+        self._config_version = None
+        self._wake = asyncio.Event()
+        self._task = None
+
+    async def cog_load(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def cog_unload(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def update_guild_config(self, guild_id, channel_id=None, slots=None, timezone=None):
         """Обновляет конфигурацию для сервера"""
-        if str(guild_id) not in self.schedule:
-            self.schedule[str(guild_id)] = {}
-        
+        values = {}
         if channel_id is not None:
-            self.schedule[str(guild_id)]["channel_id"] = channel_id
-        if post_time is not None:
-            self.schedule[str(guild_id)]["post_time"] = post_time
-        
-        self.save_config()
-
-    @tasks.loop(minutes=1)
-    async def daily_post(self):
-        """Ежедневная публикация таблицы лидеров"""
-        now = datetime.datetime.now()
-        current_time = now.strftime("%H:%M")
-        
-        for guild_id, config in self.schedule.items():
-            if config.get("post_time") == current_time and config.get("channel_id"):
+            values["channel_id"] = channel_id
+        if slots is not None:
+            values["slots"] = [slot.key for slot in slots]
+        if timezone is not None:
+            values["timezone"] = timezone
+        await guild_config.update(guild_id, "leaderboard", values)
+        self._wake.set()
+
+    @staticmethod
+    def _meta_key(guild_id, slot):
+        return f"leaderboard_post:{guild_id}:{slot.key}"
+
+    @staticmethod
+    def _guild_schedule(config):
+        """(слоты, часовой пояс) из настроек; старый формат — одна строка post_time"""
+        slots = config.get("slots")
+        if slots is None:
+            slots = [config["post_time"]] if config.get("post_time") else []
+        slots = {slot.key: slot for slot in map(Slot.parse, slots)}
+        return list(slots.values()), get_timezone(config.get("timezone"))
+
+    # --- Очередь публикаций ---
+
+    def _push(self, due, guild_id, slot, tz):
+        heapq.heappush(self._queue, (due, POST, next(self._order), guild_id, slot, tz))
+        if due - PREPARE_LEAD > time.time():
+            heapq.heappush(self._queue, (due - PREPARE_LEAD, PREPARE, next(self._order), guild_id, slot, tz))
+
+    async def _rebuild(self):
+        """Заново раскладывает слоты всех серверов (только при смене настроек)"""
+        self._config_version = guild_config.version
+        self._queue = []
+        now = time.time()
+        for guild_id, config in guild_config.guilds_with("leaderboard").items():
+            if not config.get("channel_id"):
+                continue
+            try:
+                slots, tz = self._guild_schedule(config)
+            except ValueError as e:
+                print(f"Ошибка расписания таблицы лидеров для {guild_id}: {e}")
+                continue
+            for slot in slots:
+                last = await db.get_meta(self._meta_key(guild_id, slot))
+                due = slot.next_after(float(last) if last else now, tz)
+                if due < now - CATCH_UP_WINDOW:
+                    # Простой был слишком долгим: старый топ уже не актуален
+                    due = slot.next_after(now, tz)
+                self._push(due, guild_id, slot, tz)
+
+        # Заготовки удалённых или изменённых слотов больше не опубликуются
+        scheduled = {(guild_id, slot.key) for _, _, _, guild_id, slot, _ in self._queue}
+        self._prepared = {key: embed for key, embed in self._prepared.items() if key in scheduled}
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._wake.clear()
+            if guild_config.version != self._config_version:
+                await self._rebuild()
+
+            now = time.time()
+            while self._queue and self._queue[0][0] <= now:
+                _, action, _, guild_id, slot, tz = heapq.heappop(self._queue)
                 try:
-                    guild = self.bot.get_guild(int(guild_id))
-                    if not guild:
-                        continue
-                        
-                    channel = guild.get_channel(int(config["channel_id"]))
-                    if not channel:
-                        continue
-                        
-                    leveling_cog = self.bot.get_cog("LevelingSystem")
-                    if not leveling_cog:
-                        continue
-                        
-                    leaderboard_view = leveling_cog.LeaderboardView(self.bot, guild.id, 1)
-                    embed = await leaderboard_view.create_leaderboard_embed(page=1)
-                    
-                    await channel.send(
-                        f"**Ежедневный топ сервера ({now.strftime('%d.%m.%Y')})**",
-                        embed=embed
-                    )
-                    
+                    if action == PREPARE:
+                        await self._prepare(guild_id, slot)
+                    else:
+                        await self._post(guild_id, slot, tz)
                 except Exception as e:
                     print(f"Ошибка при публикации таблицы лидеров: {e}")
 
-    @daily_post.before_loop
-    async def before_daily_post(self):
-        await self.bot.wait_until_ready()
+            delay = CONFIG_CHECK
+            if self._queue:
+                delay = min(delay, max(0, self._queue[0][0] - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _build_embed(self, guild_id):
+        if not self.bot.get_cog("LevelingSystem"):
+            return None
+        leaderboard_view = LeaderboardView(self.bot, guild_id, 1)
+        return await leaderboard_view.create_leaderboard_embed(page=1)
+
+    async def _prepare(self, guild_id, slot):
+        """Собирает таблицу заранее, чтобы в срок осталось только отправить её"""
+        embed = await self._build_embed(guild_id)
+        if embed:
+            self._prepared[(guild_id, slot.key)] = embed
+
+    async def _post(self, guild_id, slot, tz):
+        embed = self._prepared.pop((guild_id, slot.key), None)
+        try:
+            guild = self.bot.get_guild(guild_id)
+            config = guild_config.get_section(guild_id, "leaderboard")
+            channel = guild.get_channel(int(config["channel_id"])) if guild and config.get("channel_id") else None
+            if channel:
+                embed = embed or await self._build_embed(guild_id)
+                if embed:
+                    date = datetime.datetime.now(tz).strftime('%d.%m.%Y')
+                    period = "Еженедельный" if slot.weekly else "Ежедневный"
+                    await channel.send(f"**{period} топ сервера ({date})**", embed=embed)
+        finally:
+            # Слот считается отработанным и при ошибке, чтобы не повторять его в цикле
+            posted_at = time.time()
+            await db.set_meta(self._meta_key(guild_id, slot), str(posted_at))
+            self._push(slot.next_after(posted_at, tz), guild_id, slot, tz)
 
     @app_commands.command(name="таблица", description="Настройка автоматической публикации таблицы лидеров")
     @app_commands.default_permissions(administrator=True)
     @app_commands.describe(
         канал="Канал для публикации таблицы",
-        время="Время публикации в формате ЧЧ:ММ (например 21:00)"
+        время="Время в формате ЧЧ:ММ; несколько через запятую, для раза в неделю — «пт 21:00»",
+        часовой_пояс="Часовой пояс, например Europe/Moscow (по умолчанию — время сервера бота)"
     )
     async def setup_leaderboard(self, interaction: discord.Interaction,
-                              канал: discord.TextChannel, время: str):
+                              канал: discord.TextChannel, время: str,
+                              часовой_пояс: Optional[str] = None):
         """Настройка автоматической публикации таблицы лидеров"""
         try:
-            datetime.datetime.strptime(время, "%H:%M")
-        except ValueError:
+            slots = parse_slots(время)
+            get_timezone(часовой_пояс)
+        except ValueError as e:
             return await interaction.response.send_message(
-                "❌ Неверный формат времени! Используйте ЧЧ:ММ (например 21:00)",
+                f"❌ {str(e).capitalize()}! Примеры: 21:00 или 9:00, пт 21:00; пояс — Europe/Moscow",
                 ephemeral=True
             )
-        
-        self.update_guild_config(interaction.guild_id, канал.id, время)
+
+        await self.update_guild_config(interaction.guild_id, канал.id, slots, часовой_пояс)
+        schedule = ", ".join(slot.key for slot in slots)
         await interaction.response.send_message(
-            f"✅ Таблица лидеров будет публиковаться ежедневно в {время} в канале {канал.mention}",
+            f"✅ Таблица лидеров будет публиковаться в канале {канал.mention}: {schedule}"
+            + (f" ({часовой_пояс})" if часовой_пояс else ""),
             ephemeral=True
         )
 
-    def cog_unload(self):
-        self.daily_post.cancel()
-
 async def setup(bot):
-    await bot.add_cog(LevelingPush(bot))
\ No newline at end of file
+    await bot.add_cog(LevelingPush(bot))
@@ -0,0 +1,169 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Optional
+from utils.automod import WordMatcher
+from utils.config import guild_config
+
+AUTOMOD_ACTIONS = {
+    "delete": "только удалить",
+    "warn": "удалить и предупредить",
+    "mute": "удалить и заглушить"
+}
+DEFAULT_SETTINGS = {"action": "warn", "mute_duration": "10m", "warns_before_mute": 3}
+
+
+class ModerationAutomod(commands.Cog):
+    """Автомодерация: фильтр запрещённых слов и фраз.
+
+    Списки слов лежат в настройках сервера (раздел automod). Для каждого
+    сервера собирается автомат WordMatcher; при смене настроек сравниваются
+    только списки, а автомат пересобирается у тех серверов, где список
+    изменился (добавленные слова дописываются в готовый автомат).
+    """
+
+    automod = app_commands.Group(
+        name="автомод",
+        description="Фильтр запрещённых слов",
+        default_permissions=discord.Permissions(administrator=True)
+    )
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._matchers = {}
+        self._config_version = None
+
+    def get_matcher(self, guild_id: int) -> Optional[WordMatcher]:
+        if guild_config.version != self._config_version:
+            self._config_version = guild_config.version
+            for cached_id in list(self._matchers):
+                self._refresh(cached_id)
+        if guild_id not in self._matchers:
+            self._refresh(guild_id)
+        return self._matchers[guild_id]
+
+    def _refresh(self, guild_id: int):
+        words = set(guild_config.get(guild_id, "automod", "words", []))
+        matcher = self._matchers.get(guild_id)
+        if not words:
+            self._matchers[guild_id] = None
+        elif matcher is None or not matcher.words <= words:
+            # Слова удалены: из бора их не вынуть, собираем заново
+            self._matchers[guild_id] = WordMatcher(words)
+        elif words != matcher.words:
+            matcher.add(words - matcher.words)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        await self.check_message(message)
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before: discord.Message, after: discord.Message):
+        # Иначе запрещённое слово можно дописать правкой уже отправленного сообщения
+        if before.content != after.content:
+            await self.check_message(after)
+
+    async def check_message(self, message: discord.Message):
+        """Удаляет сообщение с запрещённым словом и наказывает автора"""
+        if message.author.bot or not message.guild or not message.content:
+            return
+        if not isinstance(message.author, discord.Member) or message.author.guild_permissions.manage_messages:
+            return
+
+        matcher = self.get_matcher(message.guild.id)
+        if matcher is None:
+            return
+        word = matcher.search(message.content)
+        if word is None:
+            return
+
+        try:
+            await message.delete()
+        except (discord.NotFound, discord.Forbidden):
+            pass
+        await self.punish(message.author, word)
+
+    async def punish(self, member: discord.Member, word: str):
+        settings = {**DEFAULT_SETTINGS, **guild_config.get_section(member.guild.id, "automod")}
+        reason = f"Автомодерация: запрещённое слово «{word}»"
+        try:
+            action = settings["action"]
+            if action == "warn":
+                warns_cog = self.bot.get_cog("ModerationWarns")
+                warns_count = await warns_cog.auto_warn(member, reason) if warns_cog else 0
+                # Повторные нарушения ведут к муту
+                if warns_count and warns_count % settings["warns_before_mute"] == 0:
+                    action = "mute"
+            if action == "mute":
+                mute_cog = self.bot.get_cog("ModerationMute")
+                if mute_cog:
+                    await mute_cog.auto_mute(member, settings["mute_duration"], reason)
+        except discord.HTTPException as e:
+            print(f"Ошибка автомодерации для {member.id}: {e}")
+
+    @staticmethod
+    def _parse_words(text: str) -> set:
+        return {word.strip().lower() for word in text.split(",") if word.strip()}
+
+    @automod.command(name="добавить", description="Добавить слова или фразы (через запятую; «слов*» — по началу слова)")
+    @app_commands.describe(слова="Слова через запятую")
+    async def add_words(self, interaction: discord.Interaction, слова: str):
+        words = set(guild_config.get(interaction.guild_id, "automod", "words", []))
+        added = self._parse_words(слова) - words
+        await guild_config.set(interaction.guild_id, "automod", "words", sorted(words | added))
+        await interaction.response.send_message(f"✅ Добавлено слов: {len(added)}", ephemeral=True)
+
+    @automod.command(name="удалить", description="Удалить слова или фразы из фильтра")
+    @app_commands.describe(слова="Слова через запятую")
+    async def remove_words(self, interaction: discord.Interaction, слова: str):
+        words = set(guild_config.get(interaction.guild_id, "automod", "words", []))
+        removed = words & self._parse_words(слова)
+        await guild_config.set(interaction.guild_id, "automod", "words", sorted(words - removed))
+        await interaction.response.send_message(f"✅ Удалено слов: {len(removed)}", ephemeral=True)
+
+    @automod.command(name="список", description="Показать запрещённые слова")
+    async def list_words(self, interaction: discord.Interaction):
+        words = guild_config.get(interaction.guild_id, "automod", "words", [])
+        if not words:
+            return await interaction.response.send_message("Список запрещённых слов пуст.", ephemeral=True)
+        text = ", ".join(f"||{word}||" for word in words)
+        if len(text) > 4000:
+            text = text[:4000].rsplit(", ", 1)[0] + " …"
+        embed = discord.Embed(title=f"Запрещённые слова ({len(words)})", description=text, color=discord.Color.orange())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @automod.command(name="действие", description="Что делать с нарушителем")
+    @app_commands.describe(
+        действие="Действие при срабатывании фильтра",
+        длительность="Длительность мута (например 10m, 1h)",
+        предупреждений="После скольких предупреждений выдавать мут"
+    )
+    @app_commands.choices(действие=[
+        app_commands.Choice(name=name, value=action) for action, name in AUTOMOD_ACTIONS.items()
+    ])
+    async def set_action(self, interaction: discord.Interaction, действие: app_commands.Choice[str],
+                         длительность: Optional[str] = None,
+                         предупреждений: Optional[app_commands.Range[int, 1, 20]] = None):
+        values = {"action": действие.value}
+        if длительность:
+            mute_cog = self.bot.get_cog("ModerationMute")
+            try:
+                valid = mute_cog is not None and mute_cog.parse_duration(длительность) > 0
+            except (ValueError, IndexError):
+                valid = False
+            if not valid:
+                return await interaction.response.send_message(
+                    "❌ Неверный формат времени! Примеры: 10m, 1h, 1d",
+                    ephemeral=True
+                )
+            values["mute_duration"] = длительность
+        if предупреждений:
+            values["warns_before_mute"] = предупреждений
+        await guild_config.update(interaction.guild_id, "automod", values)
+        await interaction.response.send_message(
+            f"✅ Автомодерация: {AUTOMOD_ACTIONS[действие.value]}",
+            ephemeral=True
+        )
+
+async def setup(bot):
+    await bot.add_cog(ModerationAutomod(bot))
@@ -0,0 +1,264 @@
+import discord
+from discord import app_commands, ui
+from discord.ext import commands
+import asyncio
+import datetime
+import re
+import time
+from typing import Optional
+from utils.config import guild_config
+from utils.log_dispatcher import log_dispatcher
+from cogs.moderation.moderation_mute import ModerationMute, MAX_TIMEOUT
+
+MAX_TARGETS = 1000
+BULK_BAN_CHUNK = 200  # Предел guild.bulk_ban за один запрос
+PROGRESS_INTERVAL = 2
+
+BULK_ACTIONS = {
+    "ban": ("бан", "ban_members"),
+    "kick": ("кик", "kick_members"),
+    "mute": ("мут", "moderate_members")
+}
+
+
+def parse_ids(text: str) -> list:
+    """Достаёт ID из строки: через пробел, запятую или упоминания"""
+    return list(dict.fromkeys(int(match) for match in re.findall(r"\d{15,20}", text)))
+
+
+class BulkConfirmView(ui.View):
+    """Предпросмотр массового действия: выполняется только после подтверждения"""
+
+    def __init__(self, cog, moderator: discord.Member, action: str, targets: list, reason: str, seconds: int = 0):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.moderator = moderator
+        self.action = action
+        self.targets = targets
+        self.reason = reason
+        self.seconds = seconds
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.moderator.id
+
+    @ui.button(label="Выполнить", style=discord.ButtonStyle.red, emoji="🔨")
+    async def confirm(self, interaction: discord.Interaction, button: ui.Button):
+        self.stop()
+        await interaction.response.edit_message(content="⏳ Выполняется...", embed=None, view=None)
+        await self.cog.run_bulk(interaction, self.action, self.targets, self.reason, self.seconds)
+
+    @ui.button(label="Отмена", style=discord.ButtonStyle.gray)
+    async def cancel(self, interaction: discord.Interaction, button: ui.Button):
+        self.stop()
+        await interaction.response.edit_message(content="Действие отменено.", embed=None, view=None)
+
+
+class ModerationBulk(commands.Cog):
+    """Массовые бан, кик и мут во время рейдов"""
+
+    def __init__(self, bot, concurrency=5):
+        self.bot = bot
+        self.concurrency = concurrency
+
+    def _select_targets(self, guild: discord.Guild, moderator: discord.Member, action: str,
+                        ids: list, role: Optional[discord.Role], joined_within: int):
+        """Возвращает (цели, пропущенные): цели — участники или discord.Object для бана по ID.
+
+        Способы выбора пересекаются: из списка ID берутся только те, кто подходит
+        и под роль, и под время захода, если они заданы.
+        """
+        since = discord.utils.utcnow() - datetime.timedelta(seconds=joined_within) if joined_within else None
+
+        def selected(member: discord.Member) -> bool:
+            if role and role not in member.roles:
+                return False
+            return since is None or bool(member.joined_at and member.joined_at >= since)
+
+        filtered = 0
+        if ids:
+            candidates = [guild.get_member(user_id) or discord.Object(id=user_id) for user_id in ids]
+            if role or since:
+                # Не участнику сервера нечем подойти под роль или время захода
+                candidates = [
+                    target for target in candidates
+                    if isinstance(target, discord.Member) and selected(target)
+                ]
+                filtered = len(ids) - len(candidates)
+        else:
+            candidates = [member for member in (role.members if role else guild.members) if selected(member)]
+
+        targets, skipped = [], filtered
+        for target in candidates:
+            if isinstance(target, discord.Member):
+                # Не трогаем ботов, себя, владельца и тех, кто не ниже модератора по ролям
+                if (target.bot or target.id in (moderator.id, guild.owner_id)
+                        or (target.top_role >= moderator.top_role and moderator.id != guild.owner_id)
+                        or target.top_role >= guild.me.top_role):
+                    skipped += 1
+                    continue
+            elif action != "ban":
+                # Кикнуть или заглушить можно только участника сервера
+                skipped += 1
+                continue
+            targets.append(target)
+        return targets[:MAX_TARGETS], skipped + max(0, len(targets) - MAX_TARGETS)
+
+    # Права проверяются по выбранному действию: модератору без права бана доступны кик и мут
+    @app_commands.command(name="массово", description="Массовый бан, кик или мут (с предпросмотром)")
+    @app_commands.describe(
+        действие="Что сделать с выбранными участниками",
+        причина="Причина",
+        список="ID участников через пробел или запятую",
+        роль="Выбрать всех с этой ролью",
+        зашли_за="Выбрать зашедших за последние (например 10m, 2h)",
+        длительность="Длительность мута (например 1h, 7d)"
+    )
+    @app_commands.choices(действие=[
+        app_commands.Choice(name=name, value=action) for action, (name, _) in BULK_ACTIONS.items()
+    ])
+    async def bulk(self, interaction: discord.Interaction, действие: app_commands.Choice[str], причина: str,
+                   список: Optional[str] = None, роль: Optional[discord.Role] = None,
+                   зашли_за: Optional[str] = None, длительность: Optional[str] = None):
+        action = действие.value
+        if not getattr(interaction.user.guild_permissions, BULK_ACTIONS[action][1]):
+            return await interaction.response.send_message("❌ Недостаточно прав для этого действия!", ephemeral=True)
+
+        ids = parse_ids(список) if список else []
+        if not (ids or роль or зашли_за):
+            return await interaction.response.send_message(
+                "❌ Укажите хотя бы один способ выбора: ID, роль или время захода.",
+                ephemeral=True
+            )
+
+        try:
+            joined_within = ModerationMute.parse_duration(зашли_за) if зашли_за else 0
+            seconds = ModerationMute.parse_duration(длительность) if action == "mute" else 0
+        except (ValueError, IndexError):
+            joined_within = seconds = 0
+        if (зашли_за and not joined_within) or (action == "mute" and not 0 < seconds <= MAX_TIMEOUT):
+            return await interaction.response.send_message(
+                "❌ Неверный формат времени! Примеры: 1h, 30m, 7d (мут — не больше 28d)",
+                ephemeral=True
+            )
+
+        targets, skipped = self._select_targets(
+            interaction.guild, interaction.user, action, ids, роль, joined_within
+        )
+        if not targets:
+            return await interaction.response.send_message(
+                f"Под условия не попал ни один участник (пропущено: {skipped}).",
+                ephemeral=True
+            )
+
+        preview = ", ".join(f"<@{target.id}>" for target in targets[:30])
+        if len(targets) > 30:
+            preview += f" и ещё {len(targets) - 30}"
+        embed = discord.Embed(
+            title=f"Предпросмотр: {BULK_ACTIONS[action][0]} — {len(targets)} уч.",
+            description=preview,
+            color=discord.Color.orange()
+        )
+        embed.add_field(name="Причина", value=причина)
+        selectors = []
+        if ids:
+            selectors.append(f"ID из списка ({len(ids)})")
+        if роль:
+            selectors.append(f"с ролью {роль.mention}")
+        if зашли_за:
+            selectors.append(f"зашли за {зашли_за}")
+        embed.add_field(name="Отбор", value=", ".join(selectors), inline=False)
+        if action == "mute":
+            embed.add_field(name="Длительность", value=длительность)
+        if skipped:
+            embed.add_field(name="Пропущено", value=f"{skipped} (не подошли под отбор, боты, модераторы, не на сервере, сверх лимита)")
+        embed.set_footer(text="Пока вы не нажмёте «Выполнить», ничего не произойдёт")
+
+        await interaction.response.send_message(
+            embed=embed,
+            view=BulkConfirmView(self, interaction.user, action, targets, причина, seconds),
+            ephemeral=True
+        )
+
+    async def _apply(self, guild: discord.Guild, action: str, targets: list, reason: str, seconds: int, progress):
+        """Выполняет действие с ограничением параллельности; возвращает (успешно, ошибки)"""
+        done, failed = [], []
+
+        if action == "ban" and hasattr(guild, "bulk_ban"):
+            # Один запрос банит до 200 пользователей
+            for start in range(0, len(targets), BULK_BAN_CHUNK):
+                chunk = targets[start:start + BULK_BAN_CHUNK]
+                try:
+                    result = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=0)
+                    done += [user.id for user in result.banned]
+                    failed += [user.id for user in result.failed]
+                except discord.HTTPException:
+                    failed += [target.id for target in chunk]
+                await progress(len(done) + len(failed))
+            return done, failed
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        until = discord.utils.utcnow() + datetime.timedelta(seconds=seconds)
+
+        async def run(target):
+            async with semaphore:
+                try:
+                    if action == "ban":
+                        await guild.ban(target, reason=reason, delete_message_seconds=0)
+                    elif action == "kick":
+                        await target.kick(reason=reason)
+                    else:
+                        await target.timeout(until, reason=reason)
+                    done.append(target.id)
+                except discord.HTTPException:
+                    failed.append(target.id)
+            await progress(len(done) + len(failed))
+
+        await asyncio.gather(*(run(target) for target in targets))
+        return done, failed
+
+    async def run_bulk(self, interaction: discord.Interaction, action: str, targets: list, reason: str, seconds: int):
+        name = BULK_ACTIONS[action][0]
+        last_update = time.monotonic()
+
+        async def progress(processed):
+            # Правим сообщение не чаще раза в PROGRESS_INTERVAL секунд
+            nonlocal last_update
+            if time.monotonic() - last_update < PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            try:
+                await interaction.edit_original_response(content=f"⏳ {name}: {processed}/{len(targets)}")
+            except discord.HTTPException:
+                pass
+
+        done, failed = await self._apply(interaction.guild, action, targets, reason, seconds, progress)
+
+        await interaction.edit_original_response(
+            content=f"✅ {name}: выполнено {len(done)} из {len(targets)}" + (f", ошибок: {len(failed)}" if failed else "")
+        )
+        self.log_summary(interaction, name, done, failed, reason)
+
+    def log_summary(self, interaction: discord.Interaction, action: str, done: list, failed: list, reason: str):
+        """Одна запись в лог на всё массовое действие"""
+        channel_id = guild_config.get(interaction.guild_id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if not channel:
+            return
+
+        affected = " ".join(f"<@{user_id}>" for user_id in done)
+        if len(affected) > 3900:
+            affected = affected[:3900].rsplit(" ", 1)[0] + " …"
+        embed = discord.Embed(
+            title=f"Массовое действие: {action.upper()} ({len(done)})",
+            description=affected or "—",
+            color=discord.Color.dark_red(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Модератор", value=interaction.user.mention)
+        embed.add_field(name="Причина", value=reason)
+        if failed:
+            embed.add_field(name="Ошибок", value=len(failed))
+        log_dispatcher.send(channel, embed)
+
+async def setup(bot):
+    await bot.add_cog(ModerationBulk(bot))
@@ -1,16 +1,37 @@
 import discord
 from discord import app_commands, ui
 from discord.ext import commands
+import asyncio
+import datetime
+import re
+import time
 from typing import Optional
+from utils.config import guild_config
+from utils.log_dispatcher import log_dispatcher
+from utils.notifier import notifier
+from utils.timers import timers
+from cogs.moderation.moderation_mute import ModerationMute
+
+PURGE_MAX_SCAN = 5000
+BULK_DELETE_CHUNK = 100     # Предел одного массового удаления
+BULK_DELETE_MAX_AGE = 13.9 * 86400  # Массово удаляются только сообщения моложе 14 дней
+PURGE_CONCURRENCY = 3       # Одновременных удалений старых сообщений
+PROGRESS_INTERVAL = 2
+# Регулярное выражение проверяется в цикле событий и даже короткое (например «(a+)+$»)
+# может надолго его занять, поэтому по умолчанию текст ищется как подстрока,
+# а выражение включается явно
+PURGE_MAX_PATTERN = 100
+LINK_PATTERN = re.compile(r"https?://|discord\.gg/", re.IGNORECASE)
 
 class ConfirmActionModal(ui.Modal, title="Подтверждение действия"):
-    def __init__(self, target: discord.Member, reason: str, action: str, cog, parent_view=None):
+    def __init__(self, target: discord.Member, reason: str, action: str, cog, parent_view=None, duration: Optional[str] = None):
         super().__init__()
         self.target = target
         self.original_reason = reason
         self.action = action
         self.cog = cog
         self.parent_view = parent_view
+        self.duration = duration
         
         self.reason = ui.TextInput(
             label="Причина",
@@ -25,12 +46,30 @@ class ConfirmActionModal(ui.Modal, title="Подтверждение дейст
         if self.action.lower() == "кик":
             await self.cog.kick_user(interaction, self.target, self.reason.value, self.parent_view)
         elif self.action.lower() == "бан":
-            await self.cog.ban_user(interaction, self.target, self.reason.value, self.parent_view)
+            await self.cog.ban_user(interaction, self.target, self.reason.value, self.parent_view, self.duration)
 
 class ModerationDel(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        timers.register("unban", self.expire_ban, self.bot)
+
+    async def cog_unload(self):
+        timers.unregister("unban")
+
+    async def expire_ban(self, timer: dict):
+        """Снимает временный бан, когда истёк срок"""
+        guild = self.bot.get_guild(timer["guild_id"])
+        if not guild:
+            # Планировщик запускается после готовности бота: сервера нет — бот его покинул
+            return
+        try:
+            await guild.unban(discord.Object(id=timer["user_id"]), reason="Срок бана истёк")
+        except discord.NotFound:
+            # Бан уже сняли вручную
+            pass
+
     async def kick_user(self, interaction: discord.Interaction, member: discord.Member, reason: str, parent_view=None):
         try:
             await member.kick(reason=reason)
@@ -45,7 +84,7 @@ class ModerationDel(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Отправка уведомления
-            await self.send_kick_notification(member, interaction.user, reason)
+            self.send_kick_notification(member, interaction.user, reason)
             
             # Обновление сообщения жалобы
             if parent_view and hasattr(self.bot.get_cog("ModerationReports"), 'log_report_action'):
@@ -61,7 +100,7 @@ class ModerationDel(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"Ошибка: {e}", ephemeral=True)
 
-    async def send_kick_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
+    def send_kick_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
         embed = discord.Embed(
             title="Вы были кикнуты",
             description=f"С сервера {moderator.guild.name} вас кикнули.",
@@ -70,18 +109,18 @@ class ModerationDel(commands.Cog):
         embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Причина", value=reason)
         
-        try:
-            await member.send(embed=embed)
-        except:
-            pass
+        # После кика у бота может не остаться общего сервера с участником: отказ не запоминаем
+        notifier.send(member, embed, remember_closed=False)
 
-    async def ban_user(self, interaction: discord.Interaction, member: discord.Member, reason: str, parent_view=None):
+    async def ban_user(self, interaction: discord.Interaction, member: discord.Member, reason: str, parent_view=None, duration: Optional[str] = None):
         try:
             await member.ban(reason=reason, delete_message_days=0)
+            if duration:
+                await timers.schedule(interaction.guild_id, member.id, "unban", ModerationMute.parse_duration(duration), reason)
             
             embed = discord.Embed(
                 title="✅ Участник забанен",
-                description=f"{member.mention} был забанен на сервере.",
+                description=f"{member.mention} был забанен на сервере" + (f" на {duration}." if duration else "."),
                 color=discord.Color.red()
             )
             embed.add_field(name="Причина", value=reason)
@@ -89,23 +128,23 @@ class ModerationDel(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Отправка уведомления
-            await self.send_ban_notification(member, interaction.user, reason)
+            self.send_ban_notification(member, interaction.user, reason, duration)
             
             # Обновление сообщения жалобы
             if parent_view and hasattr(self.bot.get_cog("ModerationReports"), 'log_report_action'):
                 await self.bot.get_cog("ModerationReports").log_report_action(
                     interaction.message, 
-                    "бан", 
+                    f"бан на {duration}" if duration else "бан",
                     interaction.user
                 )
             
             # Логирование
-            await self.log_punishment(interaction, member, "бан", reason)
+            await self.log_punishment(interaction, member, "бан", reason, duration)
 
         except Exception as e:
             await interaction.response.send_message(f"Ошибка: {e}", ephemeral=True)
 
-    async def send_ban_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
+    def send_ban_notification(self, member: discord.Member, moderator: discord.Member, reason: str, duration: Optional[str] = None):
         embed = discord.Embed(
             title="Вы были забанены",
             description=f"На сервере {moderator.guild.name} вас забанили.",
@@ -113,18 +152,14 @@ class ModerationDel(commands.Cog):
         )
         embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Причина", value=reason)
+        if duration:
+            embed.add_field(name="Длительность", value=duration)
         
-        try:
-            await member.send(embed=embed)
-        except:
-            pass
+        notifier.send(member, embed, remember_closed=False)
 
-    async def log_punishment(self, interaction: discord.Interaction, target: discord.Member, action: str, reason: str):
-        base_cog = self.bot.get_cog("ModerationBase")
-        if not base_cog or not base_cog.data["log_channels"]["punishments"]:
-            return
-            
-        channel = self.bot.get_channel(base_cog.data["log_channels"]["punishments"])
+    async def log_punishment(self, interaction: discord.Interaction, target: discord.Member, action: str, reason: str, duration: Optional[str] = None):
+        channel_id = guild_config.get(interaction.guild_id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
         if not channel:
             return
             
@@ -135,9 +170,11 @@ class ModerationDel(commands.Cog):
         )
         embed.add_field(name="Модератор", value=interaction.user.mention)
         embed.add_field(name="Участник", value=target.mention)
+        if duration:
+            embed.add_field(name="Длительность", value=duration)
         embed.add_field(name="Причина", value=reason)
         
-        await channel.send(embed=embed)
+        log_dispatcher.send(channel, embed)
 
     @app_commands.command(name="кик", description="Кикнуть участника с сервера")
     @app_commands.describe(участник="Участник для кика", причина="Причина")
@@ -147,10 +184,24 @@ class ModerationDel(commands.Cog):
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="бан", description="Забанить участника на сервере")
-    @app_commands.describe(участник="Участник для бана", причина="Причина")
+    @app_commands.describe(
+        участник="Участник для бана",
+        причина="Причина",
+        длительность="Срок бана (1h, 7d, 90d); без срока — навсегда"
+    )
     @commands.has_permissions(ban_members=True)
-    async def ban(self, interaction: discord.Interaction, участник: discord.Member, причина: str = None):
-        modal = ConfirmActionModal(участник, причина or "Не указана", "бан", self)
+    async def ban(self, interaction: discord.Interaction, участник: discord.Member, причина: str = None, длительность: Optional[str] = None):
+        if длительность:
+            try:
+                seconds = ModerationMute.parse_duration(длительность)
+            except (ValueError, IndexError):
+                seconds = 0
+            if not seconds:
+                return await interaction.response.send_message(
+                    "Неверный формат времени! Примеры: 1h, 30m, 7d",
+                    ephemeral=True
+                )
+        modal = ConfirmActionModal(участник, причина or "Не указана", "бан", self, duration=длительность)
         await interaction.response.send_modal(modal)
 
     @app_commands.command(name="разбан", description="Разбанить участника")
@@ -160,6 +211,7 @@ class ModerationDel(commands.Cog):
         try:
             user = await self.bot.fetch_user(int(user_id))
             await interaction.guild.unban(user, reason=причина)
+            await timers.cancel(interaction.guild_id, user.id, "unban")
             
             embed = discord.Embed(
                 title="✅ Участник разбанен",
@@ -177,10 +229,7 @@ class ModerationDel(commands.Cog):
                 color=discord.Color.green()
             )
             embed.add_field(name="Модератор", value=interaction.user.mention)
-            try:
-                await user.send(embed=embed)
-            except:
-                pass
+            notifier.send(user, embed, remember_closed=False)
             
             # Логирование
             await self.log_punishment(interaction, user, "разбан", причина or "Не указана")
@@ -188,5 +237,162 @@ class ModerationDel(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"Ошибка: {e}", ephemeral=True)
 
+    @app_commands.command(name="очистить", description="Удалить сообщения в канале по фильтрам")
+    @app_commands.default_permissions(manage_messages=True)
+    @app_commands.describe(
+        количество="Сколько последних сообщений просмотреть",
+        участник="Только сообщения этого участника",
+        текст="Только сообщения, содержащие этот текст",
+        регулярка="Считать текст регулярным выражением",
+        вложения="Только сообщения с вложениями",
+        ссылки="Только сообщения со ссылками",
+        за="Только за последнее время (например 10m, 2h)"
+    )
+    async def purge(self, interaction: discord.Interaction,
+                    количество: app_commands.Range[int, 1, PURGE_MAX_SCAN],
+                    участник: Optional[discord.User] = None,
+                    текст: Optional[str] = None,
+                    регулярка: bool = False,
+                    вложения: bool = False,
+                    ссылки: bool = False,
+                    за: Optional[str] = None):
+        if текст and len(текст) > PURGE_MAX_PATTERN:
+            return await interaction.response.send_message(
+                f"❌ Текст длиннее {PURGE_MAX_PATTERN} символов.",
+                ephemeral=True
+            )
+        try:
+            pattern = re.compile(текст if регулярка else re.escape(текст), re.IGNORECASE) if текст else None
+        except re.error as e:
+            return await interaction.response.send_message(f"❌ Неверное регулярное выражение: {e}", ephemeral=True)
+        try:
+            window = ModerationMute.parse_duration(за) if за else 0
+        except (ValueError, IndexError):
+            window = 0
+        if за and not window:
+            return await interaction.response.send_message("❌ Неверный формат времени! Примеры: 10m, 2h, 1d", ephemeral=True)
+
+        def matches(message: discord.Message) -> bool:
+            if message.pinned or message.type not in (discord.MessageType.default, discord.MessageType.reply):
+                return False
+            if участник and message.author.id != участник.id:
+                return False
+            if pattern and not pattern.search(message.content):
+                return False
+            if вложения and not message.attachments:
+                return False
+            if ссылки and not LINK_PATTERN.search(message.content):
+                return False
+            return True
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        channel = interaction.channel
+        now = discord.utils.utcnow()
+        cutoff = now - datetime.timedelta(seconds=window) if window else None
+        bulk_before = now - datetime.timedelta(seconds=BULK_DELETE_MAX_AGE)
+
+        scanned = deleted = failed = 0
+        chunk, old_tasks = [], []
+        semaphore = asyncio.Semaphore(PURGE_CONCURRENCY)
+        last_update = time.monotonic()
+
+        async def progress(force=False):
+            # Правим ответ не чаще раза в PROGRESS_INTERVAL секунд
+            nonlocal last_update
+            if not force and time.monotonic() - last_update < PROGRESS_INTERVAL:
+                return
+            last_update = time.monotonic()
+            try:
+                await interaction.edit_original_response(
+                    content=f"⏳ Просмотрено: {scanned}/{количество}, удалено: {deleted}"
+                )
+            except discord.HTTPException:
+                pass
+
+        async def delete_chunk():
+            nonlocal deleted, failed
+            batch = chunk[:]
+            chunk.clear()
+            try:
+                await channel.delete_messages(batch, reason=f"Очистка: {interaction.user}")
+                deleted += len(batch)
+            except discord.HTTPException:
+                failed += len(batch)
+
+        async def delete_old(message):
+            nonlocal deleted, failed
+            async with semaphore:
+                try:
+                    await message.delete()
+                    deleted += 1
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException:
+                    failed += 1
+
+        try:
+            async for message in channel.history(limit=количество):
+                if cutoff and message.created_at < cutoff:
+                    break
+                scanned += 1
+                if not matches(message):
+                    continue
+                if message.created_at > bulk_before:
+                    chunk.append(message)
+                    if len(chunk) == BULK_DELETE_CHUNK:
+                        await delete_chunk()
+                else:
+                    # Старше 14 дней массово не удалить: по одному, с ограничением параллельности
+                    old_tasks.append(asyncio.create_task(delete_old(message)))
+                await progress()
+            if chunk:
+                await delete_chunk()
+            await asyncio.gather(*old_tasks)
+        except discord.Forbidden:
+            forbidden = True
+        else:
+            forbidden = False
+        finally:
+            # При ошибке не оставляем удаления старых сообщений работать после ответа
+            for task in old_tasks:
+                task.cancel()
+            await asyncio.gather(*old_tasks, return_exceptions=True)
+        if forbidden:
+            return await interaction.edit_original_response(content="❌ У бота нет прав на чтение или удаление сообщений здесь.")
+
+        await interaction.edit_original_response(
+            content=f"✅ Удалено сообщений: {deleted} (просмотрено {scanned})"
+            + (f", не удалось: {failed}" if failed else "")
+        )
+        self.log_purge(interaction, deleted, участник, текст, вложения, ссылки, за)
+
+    def log_purge(self, interaction: discord.Interaction, deleted: int, user: Optional[discord.User],
+                  text: Optional[str], attachments: bool, links: bool, window: Optional[str]):
+        channel_id = guild_config.get(interaction.guild_id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if not channel or not deleted:
+            return
+
+        filters = [
+            name for name, enabled in (
+                (f"участник {user.mention}" if user else None, user),
+                (f"текст `{text}`" if text else None, text),
+                ("с вложениями", attachments),
+                ("со ссылками", links),
+                (f"за {window}" if window else None, window)
+            ) if enabled
+        ]
+        embed = discord.Embed(
+            title="Действие модерации: ОЧИСТКА",
+            color=discord.Color.blurple(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Модератор", value=interaction.user.mention)
+        embed.add_field(name="Канал", value=interaction.channel.mention)
+        embed.add_field(name="Удалено", value=deleted)
+        embed.add_field(name="Фильтры", value=", ".join(filters) or "нет", inline=False)
+
+        log_dispatcher.send(channel, embed)
+
 async def setup(bot):
     await bot.add_cog(ModerationDel(bot))
\ No newline at end of file
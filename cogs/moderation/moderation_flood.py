@@ -0,0 +1,77 @@
+import discord
+from discord.ext import commands
+import asyncio
+from utils.flood import FloodDetector, WAVE_REASON
+
+FLOOD_MUTE_DURATION = "10m"
+# Одно упоминание @everyone ниже порога детектора: объявление не наказывается, только серия.
+# Discord отмечает mention_everyone, лишь когда у автора есть право упоминать всех
+EVERYONE_MENTION_WEIGHT = 5
+
+
+class ModerationFlood(commands.Cog):
+    """Защита от спама: заглушает флудера и удаляет его сообщения из окна детектора"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.detector = FloodDetector()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.author.bot or not message.guild:
+            return
+        if not isinstance(message.author, discord.Member) or message.author.guild_permissions.manage_messages:
+            return
+
+        mentions = len(message.raw_mentions) + len(message.raw_role_mentions)
+        if message.mention_everyone:
+            mentions += EVERYONE_MENTION_WEIGHT
+        reason = self.detector.check(
+            message.guild.id,
+            message.author.id,
+            message.channel.id,
+            message.id,
+            message.content,
+            mentions
+        )
+        if not reason:
+            return
+        targets = [message.author]
+        if message.content and reason == WAVE_REASON:
+            # Волна спама: наказываем всех, кто успел отправить этот текст
+            targets = [
+                member for user_id in self.detector.authors_of(message.guild.id, message.content)
+                if (member := message.guild.get_member(user_id))
+                and not member.bot and not member.guild_permissions.manage_messages
+            ]
+        await asyncio.gather(*(self.punish(member, reason) for member in targets))
+
+    async def punish(self, member: discord.Member, reason: str):
+        # Забираем сообщения сразу, чтобы следующие сообщения пачки не запускали наказание повторно
+        messages = self.detector.take_messages(member.guild.id, member.id)
+        reason = f"Автомодерация: {reason}"
+
+        mute_cog = self.bot.get_cog("ModerationMute")
+        if mute_cog and not member.is_timed_out():
+            try:
+                await mute_cog.auto_mute(member, FLOOD_MUTE_DURATION, reason)
+            except discord.HTTPException as e:
+                print(f"Ошибка мута за флуд {member.id}: {e}")
+
+        await asyncio.gather(*(
+            self.purge(member.guild, channel_id, message_ids)
+            for channel_id, message_ids in messages.items()
+        ))
+
+    async def purge(self, guild: discord.Guild, channel_id: int, message_ids: list):
+        channel = guild.get_channel_or_thread(channel_id)
+        if channel is None:
+            return
+        try:
+            # Сообщения в окне свежие, поэтому подходит массовое удаление
+            await channel.delete_messages([discord.Object(id=message_id) for message_id in message_ids])
+        except discord.HTTPException as e:
+            print(f"Ошибка удаления флуда в канале {channel_id}: {e}")
+
+async def setup(bot):
+    await bot.add_cog(ModerationFlood(bot))
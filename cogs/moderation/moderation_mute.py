@@ -3,6 +3,13 @@ from discord import app_commands, ui
 from discord.ext import commands
 import datetime
 from typing import Optional
+from utils.config import guild_config
+from utils.log_dispatcher import log_dispatcher
+from utils.notifier import notifier
+from utils.timers import timers
+
+# Дольше таймаут Discord не выдаёт: более долгий мут делается ролью и снимается по таймеру
+MAX_TIMEOUT = 28 * 86400
 
 class MuteDurationSelect(ui.Select):
     def __init__(self, target: discord.Member, reason: str, cog, parent_view=None):
@@ -10,8 +17,8 @@ class MuteDurationSelect(ui.Select):
             ("1 минута", "1m"), ("5 минут", "5m"), ("10 минут", "10m"),
             ("30 минут", "30m"), ("1 час", "1h"), ("2 часа", "2h"),
             ("5 часов", "5h"), ("12 часов", "12h"), ("1 день", "1d"),
-            ("2 дня", "2d"), ("7 дней", "7d"), ("14 дней", "14d"), 
-            ("1 месяц", "30d")
+            ("2 дня", "2d"), ("7 дней", "7d"), ("14 дней", "14d"),
+            ("28 дней", "28d"), ("1 месяц", "30d")
         ]
         options = [discord.SelectOption(label=label, value=value) for label, value in durations]
         super().__init__(placeholder="Выберите длительность мута...", options=options)
@@ -38,23 +45,57 @@ class ModerationMute(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        timers.register("unmute", self.expire_mute, self.bot)
+
+    async def cog_unload(self):
+        timers.unregister("unmute")
+
+    def get_mute_role(self, guild: discord.Guild) -> Optional[discord.Role]:
+        role_id = guild_config.get(guild.id, "moderation", "mute_role_id")
+        return guild.get_role(role_id) if role_id else None
+
+    async def expire_mute(self, timer: dict):
+        """Снимает роль мута, когда истёк срок"""
+        guild = self.bot.get_guild(timer["guild_id"])
+        if not guild:
+            # Планировщик запускается после готовности бота: сервера нет — бот его покинул
+            return
+        member = guild.get_member(timer["user_id"])
+        role = self.get_mute_role(guild)
+        if not member or not role or role not in member.roles:
+            return
+        try:
+            await member.remove_roles(role, reason="Срок мута истёк")
+        except discord.NotFound:
+            pass
+
     async def mute_user(self, interaction: discord.Interaction, member: discord.Member, duration: str, reason: str, parent_view=None):
-        base_cog = self.bot.get_cog("ModerationBase")
-        if not base_cog:
-            return await interaction.response.send_message(
-                "Ошибка: система модерации не загружена.",
-                ephemeral=True
-            )
-            
-        seconds = self.parse_duration(duration)
+        try:
+            seconds = self.parse_duration(duration)
+        except (ValueError, IndexError):
+            seconds = 0
         if not seconds:
             return await interaction.response.send_message(
                 "Неверный формат времени! Примеры: 1h, 30m, 7d",
                 ephemeral=True
             )
+
+        role = None
+        if seconds > MAX_TIMEOUT:
+            role = self.get_mute_role(interaction.guild)
+            if not role:
+                return await interaction.response.send_message(
+                    "Мут дольше 28 дней выдаётся ролью: задайте её командой /роль_мута.",
+                    ephemeral=True
+                )
             
         try:
-            await member.timeout(discord.utils.utcnow() + datetime.timedelta(seconds=seconds), reason=reason)
+            if role:
+                await member.add_roles(role, reason=reason)
+                await timers.schedule(interaction.guild_id, member.id, "unmute", seconds, reason)
+            else:
+                await member.timeout(discord.utils.utcnow() + datetime.timedelta(seconds=seconds), reason=reason)
             
             embed = discord.Embed(
                 title="✅ Участник заглушен",
@@ -66,7 +107,7 @@ class ModerationMute(commands.Cog):
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
             # Отправка уведомления
-            await self.send_mute_notification(member, interaction.user, reason, duration)
+            self.send_mute_notification(member, interaction.user, reason, duration)
             
             # Обновление сообщения жалобы
             if parent_view and hasattr(self.bot.get_cog("ModerationReports"), 'log_report_action'):
@@ -82,7 +123,7 @@ class ModerationMute(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"Ошибка: {e}", ephemeral=True)
 
-    async def send_mute_notification(self, member: discord.Member, moderator: discord.Member, reason: str, duration: str):
+    def send_mute_notification(self, member: discord.Member, moderator: discord.Member, reason: str, duration: str):
         embed = discord.Embed(
             title="Вы получили мут",
             description=f"На сервере {moderator.guild.name} вам выдали мут.",
@@ -92,17 +133,14 @@ class ModerationMute(commands.Cog):
         embed.add_field(name="Причина", value=reason)
         embed.add_field(name="Длительность", value=duration)
         
-        try:
-            await member.send(embed=embed)
-        except:
-            pass
+        notifier.send(member, embed)
 
     async def log_punishment(self, interaction: discord.Interaction, target: discord.Member, action: str, reason: str, duration: Optional[str] = None):
-        base_cog = self.bot.get_cog("ModerationBase")
-        if not base_cog or not base_cog.data["log_channels"]["punishments"]:
-            return
-            
-        channel = self.bot.get_channel(base_cog.data["log_channels"]["punishments"])
+        self.log_action(interaction.guild_id, interaction.user, target, action, reason, duration)
+
+    def log_action(self, guild_id: int, moderator: discord.Member, target: discord.Member, action: str, reason: str, duration: Optional[str] = None):
+        channel_id = guild_config.get(guild_id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
         if not channel:
             return
             
@@ -111,13 +149,20 @@ class ModerationMute(commands.Cog):
             color=discord.Color.blurple(),
             timestamp=discord.utils.utcnow()
         )
-        embed.add_field(name="Модератор", value=interaction.user.mention)
+        embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Участник", value=target.mention)
         if duration:
             embed.add_field(name="Длительность", value=duration)
         embed.add_field(name="Причина", value=reason)
         
-        await channel.send(embed=embed)
+        log_dispatcher.send(channel, embed)
+
+    async def auto_mute(self, member: discord.Member, duration: str, reason: str):
+        """Мут от имени бота (автомодерация) через таймаут Discord"""
+        seconds = min(self.parse_duration(duration), MAX_TIMEOUT)
+        await member.timeout(discord.utils.utcnow() + datetime.timedelta(seconds=seconds), reason=reason)
+        self.send_mute_notification(member, member.guild.me, reason, duration)
+        self.log_action(member.guild.id, member.guild.me, member, "мут", reason, duration)
 
     @app_commands.command(name="мут", description="Заглушить участника на время")
     @app_commands.describe(
@@ -139,6 +184,10 @@ class ModerationMute(commands.Cog):
     async def unmute(self, interaction: discord.Interaction, участник: discord.Member, причина: str = None):
         try:
             await участник.timeout(None, reason=причина)
+            role = self.get_mute_role(interaction.guild)
+            if role and role in участник.roles:
+                await участник.remove_roles(role, reason=причина)
+            await timers.cancel(interaction.guild_id, участник.id, "unmute")
             
             embed = discord.Embed(
                 title="✅ Мут снят",
@@ -156,10 +205,7 @@ class ModerationMute(commands.Cog):
                 color=discord.Color.green()
             )
             embed.add_field(name="Модератор", value=interaction.user.mention)
-            try:
-                await участник.send(embed=embed)
-            except:
-                pass
+            notifier.send(участник, embed)
             
             # Логирование
             await self.log_punishment(interaction, участник, "снятие мута", причина or "Не указана")
@@ -167,6 +213,13 @@ class ModerationMute(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"Ошибка: {e}", ephemeral=True)
 
+    @app_commands.command(name="роль_мута", description="Роль для мутов дольше 28 дней")
+    @app_commands.describe(роль="Роль, которая запрещает писать и говорить")
+    @app_commands.default_permissions(administrator=True)
+    async def set_mute_role(self, interaction: discord.Interaction, роль: discord.Role):
+        await guild_config.set(interaction.guild_id, "moderation", "mute_role_id", роль.id)
+        await interaction.response.send_message(f"✅ Роль мута: {роль.mention}", ephemeral=True)
+
     @staticmethod
     def parse_duration(duration: str) -> int:
         units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
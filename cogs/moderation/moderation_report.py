@@ -1,114 +1,80 @@
 import discord
 from discord import app_commands, ui
 from discord.ext import commands
-from datetime import datetime
 from typing import Optional
-from utils.user_data import get_user_data, save_user_data
-import json
-from pathlib import Path
-
-class ReportSystem:
-    def __init__(self):
-        self.reports_file = Path("data/reports.json")
-        self._init_storage()
-
-    def _init_storage(self):
-        if not self.reports_file.exists():
-            with open(self.reports_file, "w", encoding="utf-8") as f:
-                json.dump({"reports": {}, "last_id": 0}, f)
-
-    def _load_data(self):
-        with open(self.reports_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def _save_data(self, data):
-        with open(self.reports_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
-    def add_report(self, guild_id: int, target_id: int, reporter_id: int, reason: str) -> int:
-        data = self._load_data()
-        report_id = data["last_id"] + 1
-        
-        report = {
-            "id": report_id,
-            "guild_id": guild_id,
-            "target_id": target_id,
-            "reporter_id": reporter_id,
-            "reason": reason,
-            "status": "pending",
-            "moderator_id": None,
-            "action_taken": None,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        data["reports"][str(report_id)] = report
-        data["last_id"] = report_id
-        self._save_data(data)
-        
-        return report_id
-
-    def update_report(self, report_id: int, status: str, moderator_id: int, action_taken: str):
-        data = self._load_data()
-        if str(report_id) in data["reports"]:
-            report = data["reports"][str(report_id)]
-            report["status"] = status
-            report["moderator_id"] = moderator_id
-            report["action_taken"] = action_taken
-            self._save_data(data)
-            return True
-        return False
+from utils.db import db
+from utils.config import guild_config
+from utils.user_resolver import users
 
-class ReportActionView(ui.View):
-    def __init__(self, target: discord.Member, reporter: discord.Member, reason: str, report_id: int):
-        super().__init__(timeout=None)
-        self.target = target
-        self.reporter = reporter
-        self.reason = reason
+REPORTS_PER_PAGE = 5
+REPORT_STATUSES = {
+    "pending": "На рассмотрении",
+    "approved": "Одобрено",
+    "rejected": "Отклонено"
+}
+
+class ReportActionButton(ui.DynamicItem[ui.Button], template=r"report:(?P<action>punish|ignore):(?P<id>\d+)"):
+    """Кнопка решения по жалобе: ID жалобы хранится в custom_id, остальное читается из базы"""
+
+    ACTIONS = {
+        "punish": ("Наказать", discord.ButtonStyle.red, "🔨"),
+        "ignore": ("Игнорировать", discord.ButtonStyle.gray, "❌")
+    }
+
+    def __init__(self, action: str, report_id: int):
+        label, style, emoji = self.ACTIONS[action]
+        super().__init__(ui.Button(label=label, style=style, emoji=emoji, custom_id=f"report:{action}:{report_id}"))
+        self.action = action
         self.report_id = report_id
 
-    @ui.button(label="Наказать", style=discord.ButtonStyle.red, emoji="🔨")
-    async def punish(self, interaction: discord.Interaction, button: ui.Button):
-        view = PunishmentSelectView(self.target, self.reason, self.report_id)
-        await interaction.response.send_message(
-            "Выберите тип наказания:",
-            view=view,
-            ephemeral=True
-        )
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["action"], int(match["id"]))
 
-    @ui.button(label="Игнорировать", style=discord.ButtonStyle.gray, emoji="❌")
-    async def ignore(self, interaction: discord.Interaction, button: ui.Button):
-        report_cog = interaction.client.get_cog("ModerationReports")
-        if report_cog:
-            report_cog.report_system.update_report(
+    async def callback(self, interaction: discord.Interaction):
+        report = await db.get_report(self.report_id)
+        if not report or report["status"] != "pending":
+            await interaction.message.edit(view=None)
+            return await interaction.response.send_message("Жалоба уже рассмотрена.", ephemeral=True)
+
+        if self.action == "ignore":
+            handled = await db.update_report(
                 self.report_id,
                 status="rejected",
                 moderator_id=interaction.user.id,
                 action_taken="ignored"
             )
-        
-        # Добавляем запись в профиль пользователя
-        target_data = get_user_data(self.target.id)
-        if "moderation" not in target_data:
-            target_data["moderation"] = {"reports": []}
-        
-        target_data["moderation"]["reports"].append({
-            "report_id": self.report_id,
-            "status": "rejected",
-            "moderator_id": interaction.user.id,
-            "action": "ignored",
-            "timestamp": datetime.now().isoformat()
-        })
-        save_user_data(self.target.id, target_data)
-        
-        await interaction.message.edit(view=None)
-        await interaction.response.send_message("Жалоба проигнорирована.", ephemeral=True)
+
+            await interaction.message.edit(view=None)
+            return await interaction.response.send_message(
+                "Жалоба проигнорирована." if handled else "Жалоба уже рассмотрена.",
+                ephemeral=True
+            )
+
+        target = interaction.guild.get_member(report["target_id"])
+        if not target:
+            return await interaction.response.send_message("Участник уже покинул сервер.", ephemeral=True)
+
+        view = PunishmentSelectView(target, report["reason"], self.report_id, interaction.message)
+        await interaction.response.send_message(
+            "Выберите тип наказания:",
+            view=view,
+            ephemeral=True
+        )
+
+class ReportActionView(ui.View):
+    def __init__(self, report_id: int):
+        super().__init__(timeout=None)
+        self.add_item(ReportActionButton("punish", report_id))
+        self.add_item(ReportActionButton("ignore", report_id))
 
 class PunishmentSelectView(ui.View):
-    def __init__(self, target: discord.Member, reason: str, report_id: int):
+    def __init__(self, target: discord.Member, reason: str, report_id: int, report_message: discord.Message):
         super().__init__()
         self.target = target
         self.reason = reason
         self.report_id = report_id
+        self.report_message = report_message
 
     @ui.select(
         placeholder="Выберите наказание",
@@ -120,31 +86,18 @@ class PunishmentSelectView(ui.View):
         ]
     )
     async def select_punishment(self, interaction: discord.Interaction, select: ui.Select):
-        report_cog = interaction.client.get_cog("ModerationReports")
-        if not report_cog:
-            return await interaction.response.send_message("Ошибка системы!", ephemeral=True)
-
         action = select.values[0]
-        report_cog.report_system.update_report(
+        if not await db.update_report(
             self.report_id,
             status="approved",
             moderator_id=interaction.user.id,
             action_taken=action
-        )
-        
-        # Добавляем запись в профиль пользователя
-        target_data = get_user_data(self.target.id)
-        if "moderation" not in target_data:
-            target_data["moderation"] = {"reports": []}
-        
-        target_data["moderation"]["reports"].append({
-            "report_id": self.report_id,
-            "status": "approved",
-            "moderator_id": interaction.user.id,
-            "action": action,
-            "timestamp": datetime.now().isoformat()
-        })
-        save_user_data(self.target.id, target_data)
+        ):
+            await self.report_message.edit(view=None)
+            return await interaction.response.send_message(
+                "Жалоба уже рассмотрена другим модератором.",
+                ephemeral=True
+            )
         
         # Применяем наказание
         if action == "warn":
@@ -153,7 +106,7 @@ class PunishmentSelectView(ui.View):
                 await warn_cog.warn(interaction, self.target, self.reason)
         # Здесь можно добавить обработку других действий (мут, кик, бан)
         
-        await interaction.message.edit(view=None)
+        await self.report_message.edit(view=None)
         await interaction.response.send_message(
             f"Наказание '{action}' применено к {self.target.mention}",
             ephemeral=True
@@ -162,19 +115,23 @@ class PunishmentSelectView(ui.View):
 class ModerationReports(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.report_system = ReportSystem()
-        self.reports_log_channel = None  # Будет установлено при загрузке
 
-    async def setup_log_channel(self, guild_id: int):
-        # Здесь можно реализовать логику получения канала логов
-        # Например, из конфига или базы данных
-        return None
+    async def cog_load(self):
+        self.bot.add_dynamic_items(ReportActionButton)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(ReportActionButton)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        # При загрузке кога ищем канал для логов
-        for guild in self.bot.guilds:
-            self.reports_log_channel = await self.setup_log_channel(guild.id)
+        # Жалобы из старых профилей сохранены без сервера; бот тогда работал на одном сервере
+        if len(self.bot.guilds) == 1:
+            await db.claim_legacy_reports(self.bot.guilds[0].id)
+
+    def get_log_channel(self, guild_id: int):
+        """Канал, куда приходят жалобы сервера"""
+        channel_id = guild_config.get(guild_id, "logs", "reports_channel_id")
+        return self.bot.get_channel(channel_id) if channel_id else None
 
     @app_commands.command(name="жалоба", description="Отправить жалобу на участника")
     @app_commands.describe(участник="Участник для жалобы", причина="Причина жалобы")
@@ -193,16 +150,21 @@ class ModerationReports(commands.Cog):
                 ephemeral=True
             )
 
-        if not self.reports_log_channel:
-            self.reports_log_channel = await self.setup_log_channel(interaction.guild.id)
-            if not self.reports_log_channel:
-                return await interaction.response.send_message(
-                    "❌ Система жалоб не настроена администратором.",
-                    ephemeral=True
-                )
+        reports_log_channel = self.get_log_channel(interaction.guild.id)
+        if not reports_log_channel:
+            return await interaction.response.send_message(
+                "❌ Система жалоб не настроена администратором.",
+                ephemeral=True
+            )
+
+        if await db.has_pending_report(interaction.guild.id, interaction.user.id, участник.id):
+            return await interaction.response.send_message(
+                "Ваша жалоба на этого участника ещё рассматривается.",
+                ephemeral=True
+            )
 
         try:
-            report_id = self.report_system.add_report(
+            report_id = await db.add_report(
                 guild_id=interaction.guild.id,
                 target_id=участник.id,
                 reporter_id=interaction.user.id,
@@ -218,9 +180,9 @@ class ModerationReports(commands.Cog):
             embed.add_field(name="Участник", value=участник.mention)
             embed.set_footer(text=f"ID: {участник.id}")
 
-            await self.reports_log_channel.send(
+            await reports_log_channel.send(
                 embed=embed,
-                view=ReportActionView(участник, interaction.user, причина, report_id)
+                view=ReportActionView(report_id)
             )
 
             await interaction.response.send_message(
@@ -234,44 +196,117 @@ class ModerationReports(commands.Cog):
                 ephemeral=True
             )
 
-    @app_commands.command(name="жалобы", description="Посмотреть жалобы на участника")
-    @app_commands.describe(участник="Участник для проверки")
-    async def view_reports(self, interaction: discord.Interaction, участник: discord.Member):
-        user_data = get_user_data(участник.id)
-        
-        if "moderation" not in user_data or not user_data["moderation"].get("reports"):
-            return await interaction.response.send_message(
-                f"На {участник.mention} нет жалоб.",
-                ephemeral=True
+    @app_commands.command(name="жалобы", description="Посмотреть жалобы на участника или по статусу")
+    @app_commands.describe(участник="Участник для проверки", статус="Показать жалобы сервера с этим статусом")
+    @app_commands.choices(статус=[
+        app_commands.Choice(name=name, value=status) for status, name in REPORT_STATUSES.items()
+    ])
+    async def view_reports(self, interaction: discord.Interaction,
+                           участник: Optional[discord.Member] = None,
+                           статус: Optional[app_commands.Choice[str]] = None):
+        guild_id = interaction.guild_id
+
+        if участник:
+            stats = await db.get_report_stats(guild_id, участник.id)
+            total = sum(stats.values())
+            if not total:
+                return await interaction.response.send_message(
+                    f"На {участник.mention} нет жалоб.",
+                    ephemeral=True
+                )
+            view = ReportListView(
+                self.bot,
+                interaction.guild,
+                title=f"Жалобы на {участник.display_name}",
+                fields=[("Всего жалоб", total, False)] + [
+                    (name, stats.get(status, 0), True) for status, name in REPORT_STATUSES.items()
+                ],
+                fetch=lambda limit, offset: db.get_reports(guild_id, участник.id, limit, offset),
+                total=total
             )
-            
-        reports = user_data["moderation"]["reports"]
-        approved = sum(1 for r in reports if r["status"] == "approved")
-        rejected = sum(1 for r in reports if r["status"] == "rejected")
-        pending = sum(1 for r in reports if r["status"] == "pending")
-        
+        else:
+            if not interaction.user.guild_permissions.manage_messages:
+                return await interaction.response.send_message(
+                    "❌ Список жалоб сервера доступен только модераторам. Укажите участника.",
+                    ephemeral=True
+                )
+            status = статус.value if статус else "pending"
+            total = await db.count_reports_by_status(guild_id, status)
+            if not total:
+                return await interaction.response.send_message(
+                    f"Жалоб со статусом «{REPORT_STATUSES[status]}» нет.",
+                    ephemeral=True
+                )
+            view = ReportListView(
+                self.bot,
+                interaction.guild,
+                title=f"Жалобы: {REPORT_STATUSES[status]}",
+                fields=[("Всего", total, False)],
+                fetch=lambda limit, offset: db.get_reports_by_status(guild_id, status, limit, offset),
+                total=total
+            )
+
+        await interaction.response.send_message(
+            embed=await view.create_embed(), view=view, ephemeral=True
+        )
+
+class ReportListView(ui.View):
+    """Постраничный просмотр жалоб: каждая страница запрашивается из базы при листании"""
+
+    def __init__(self, bot, guild, title, fields, fetch, total):
+        super().__init__(timeout=120)
+        self.bot = bot
+        self.guild = guild
+        self.title = title
+        self.fields = fields
+        self.fetch = fetch
+        self.current_page = 1
+        self.total_pages = max(1, -(-total // REPORTS_PER_PAGE))  # Округление вверх
+        self.next_page.disabled = self.total_pages <= 1
+
+    async def create_embed(self):
         embed = discord.Embed(
-            title=f"Жалобы на {участник.display_name}",
+            title=f"{self.title} (Страница {self.current_page}/{self.total_pages})",
             color=discord.Color.orange()
         )
-        embed.add_field(name="Всего жалоб", value=len(reports), inline=False)
-        embed.add_field(name="Одобрено", value=approved, inline=True)
-        embed.add_field(name="Отклонено", value=rejected, inline=True)
-        embed.add_field(name="На рассмотрении", value=pending, inline=True)
-        
-        # Показываем последние 5 жалоб
-        recent_reports = sorted(reports, key=lambda x: x["timestamp"], reverse=True)[:5]
-        for i, report in enumerate(recent_reports, 1):
-            moderator = await self.bot.fetch_user(report["moderator_id"]) if report["moderator_id"] else "Не назначен"
+        for name, value, inline in self.fields:
+            embed.add_field(name=name, value=value, inline=inline)
+
+        reports = await self.fetch(REPORTS_PER_PAGE, (self.current_page - 1) * REPORTS_PER_PAGE)
+        moderators = await users.resolve_many(
+            self.bot, [report["moderator_id"] for report in reports if report["moderator_id"]], self.guild
+        )
+        for report in reports:
+            if not report["moderator_id"]:
+                moderator = "Не назначен"
+            elif moderator := moderators[report["moderator_id"]]:
+                moderator = moderator.mention
+            else:
+                moderator = "Неизвестен"
             embed.add_field(
-                name=f"Жалоба #{report.get('report_id', '?')}",
-                value=f"**Статус:** {report['status']}\n"
-                      f"**Действие:** {report.get('action', 'нет')}\n"
-                      f"**Модератор:** {moderator.mention if isinstance(moderator, discord.User) else moderator}",
+                name=f"Жалоба #{report['id']}",
+                value=f"**Участник:** <@{report['target_id']}>\n"
+                      f"**Статус:** {REPORT_STATUSES.get(report['status'], report['status'])}\n"
+                      f"**Причина:** {report['reason'] or 'не указана'}\n"
+                      f"**Действие:** {report['action_taken'] or 'нет'}\n"
+                      f"**Модератор:** {moderator}",
                 inline=False
             )
-            
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return embed
+
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        self.current_page = page
+        self.prev_page.disabled = page <= 1
+        self.next_page.disabled = page >= self.total_pages
+        await interaction.response.edit_message(embed=await self.create_embed(), view=self)
+
+    @ui.button(label="◀", style=discord.ButtonStyle.gray, disabled=True)
+    async def prev_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show_page(interaction, max(1, self.current_page - 1))
+
+    @ui.button(label="▶", style=discord.ButtonStyle.gray)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show_page(interaction, min(self.total_pages, self.current_page + 1))
 
 async def setup(bot):
     await bot.add_cog(ModerationReports(bot))
\ No newline at end of file
@@ -3,7 +3,11 @@ from discord import app_commands, ui
 from discord.ext import commands
 import time
 from datetime import datetime
-from utils.user_data import get_user_data, save_user_data
+from utils.db import db
+from utils.config import guild_config
+from utils.log_dispatcher import log_dispatcher
+from utils.notifier import notifier
+from utils.user_resolver import users
 from typing import Optional
 
 class WarnModal(ui.Modal, title="Выдать предупреждение"):
@@ -23,19 +27,12 @@ class WarnModal(ui.Modal, title="Выдать предупреждение"):
         self.add_item(self.reason_input)
 
     async def on_submit(self, interaction: discord.Interaction):
-        user_data = get_user_data(self.target.id)
-        
-        if "moderation" not in user_data:
-            user_data["moderation"] = {"warns": []}
-        
-        warn_data = {
-            "moderator_id": interaction.user.id,
-            "reason": self.reason_input.value,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        user_data["moderation"]["warns"].append(warn_data)
-        save_user_data(self.target.id, user_data)
+        warns_count = await db.add_warn(
+            interaction.guild_id,
+            self.target.id,
+            interaction.user.id,
+            self.reason_input.value
+        )
         
         embed = discord.Embed(
             title="✅ Предупреждение выдано",
@@ -43,17 +40,17 @@ class WarnModal(ui.Modal, title="Выдать предупреждение"):
             color=discord.Color.orange()
         )
         embed.add_field(name="Причина", value=self.reason_input.value)
-        embed.add_field(name="Всего предупреждений", value=len(user_data["moderation"]["warns"]))
+        embed.add_field(name="Всего предупреждений", value=warns_count)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
         # Отправка уведомления
-        await self.send_warn_notification(self.target, interaction.user, self.reason_input.value)
+        self.send_warn_notification(self.target, interaction.user, self.reason_input.value)
         
         # Логирование
         await self.log_punishment(interaction, self.target, "предупреждение", self.reason_input.value)
 
-    async def send_warn_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
+    def send_warn_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
         embed = discord.Embed(
             title="Вы получили предупреждение",
             description=f"На сервере {moderator.guild.name} вам выдали предупреждение.",
@@ -62,14 +59,12 @@ class WarnModal(ui.Modal, title="Выдать предупреждение"):
         embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Причина", value=reason)
         
-        try:
-            await member.send(embed=embed)
-        except:
-            pass
+        notifier.send(member, embed)
 
     async def log_punishment(self, interaction: discord.Interaction, target: discord.Member, action: str, reason: str):
-        log_cog = interaction.client.get_cog("ModerationBase")
-        if not log_cog or not log_cog.punishments_log_channel:
+        channel_id = guild_config.get(interaction.guild_id, "logs", "punishments_channel_id")
+        channel = interaction.client.get_channel(channel_id) if channel_id else None
+        if not channel:
             return
             
         embed = discord.Embed(
@@ -81,7 +76,7 @@ class WarnModal(ui.Modal, title="Выдать предупреждение"):
         embed.add_field(name="Участник", value=target.mention)
         embed.add_field(name="Причина", value=reason)
         
-        await log_cog.punishments_log_channel.send(embed=embed)
+        log_dispatcher.send(channel, embed)
 
 class ModerationWarns(commands.Cog):
     def __init__(self, bot):
@@ -97,19 +92,7 @@ class ModerationWarns(commands.Cog):
         if участник.guild_permissions.manage_messages:
             return await interaction.response.send_message("Вы не можете выдать предупреждение модератору!", ephemeral=True)
         
-        user_data = get_user_data(участник.id)
-        
-        if "moderation" not in user_data:
-            user_data["moderation"] = {"warns": []}
-        
-        warn_data = {
-            "moderator_id": interaction.user.id,
-            "reason": причина,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        user_data["moderation"]["warns"].append(warn_data)
-        save_user_data(участник.id, user_data)
+        warns_count = await db.add_warn(interaction.guild_id, участник.id, interaction.user.id, причина)
         
         embed = discord.Embed(
             title="✅ Предупреждение выдано",
@@ -117,17 +100,17 @@ class ModerationWarns(commands.Cog):
             color=discord.Color.orange()
         )
         embed.add_field(name="Причина", value=причина)
-        embed.add_field(name="Всего предупреждений", value=len(user_data["moderation"]["warns"]))
+        embed.add_field(name="Всего предупреждений", value=warns_count)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
         # Отправка уведомления
-        await self.send_warn_notification(участник, interaction.user, причина)
+        self.send_warn_notification(участник, interaction.user, причина)
         
         # Логирование
         await self.log_punishment(interaction, участник, "предупреждение", причина)
 
-    async def send_warn_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
+    def send_warn_notification(self, member: discord.Member, moderator: discord.Member, reason: str):
         embed = discord.Embed(
             title="Вы получили предупреждение",
             description=f"На сервере {moderator.guild.name} вам выдали предупреждение.",
@@ -136,14 +119,15 @@ class ModerationWarns(commands.Cog):
         embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Причина", value=reason)
         
-        try:
-            await member.send(embed=embed)
-        except:
-            pass
+        notifier.send(member, embed)
 
     async def log_punishment(self, interaction: discord.Interaction, target: discord.Member, action: str, reason: str):
-        log_cog = interaction.client.get_cog("ModerationBase")
-        if not log_cog or not log_cog.punishments_log_channel:
+        self.log_action(interaction.guild_id, interaction.user, target, action, reason)
+
+    def log_action(self, guild_id: int, moderator: discord.Member, target: discord.Member, action: str, reason: str):
+        channel_id = guild_config.get(guild_id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if not channel:
             return
             
         embed = discord.Embed(
@@ -151,18 +135,25 @@ class ModerationWarns(commands.Cog):
             color=discord.Color.blurple(),
             timestamp=discord.utils.utcnow()
         )
-        embed.add_field(name="Модератор", value=interaction.user.mention)
+        embed.add_field(name="Модератор", value=moderator.mention)
         embed.add_field(name="Участник", value=target.mention)
         embed.add_field(name="Причина", value=reason)
         
-        await log_cog.punishments_log_channel.send(embed=embed)
+        log_dispatcher.send(channel, embed)
+
+    async def auto_warn(self, member: discord.Member, reason: str) -> int:
+        """Предупреждение от имени бота (автомодерация); возвращает число предупреждений"""
+        warns_count = await db.add_warn(member.guild.id, member.id, self.bot.user.id, reason)
+        self.send_warn_notification(member, member.guild.me, reason)
+        self.log_action(member.guild.id, member.guild.me, member, "предупреждение", reason)
+        return warns_count
 
     @app_commands.command(name="предлист", description="Посмотреть предупреждения участника")
     @app_commands.describe(участник="Участник для проверки")
     async def warns(self, interaction: discord.Interaction, участник: discord.Member):
-        user_data = get_user_data(участник.id)
+        warns = await db.get_warns(interaction.guild_id, участник.id)
         
-        if "moderation" not in user_data or not user_data["moderation"].get("warns"):
+        if not warns:
             return await interaction.response.send_message(
                 f"У {участник.mention} нет предупреждений.",
                 ephemeral=True
@@ -173,12 +164,15 @@ class ModerationWarns(commands.Cog):
             color=discord.Color.orange()
         )
         
-        for i, warn in enumerate(user_data["moderation"]["warns"], 1):
-            moderator = await self.bot.fetch_user(warn["moderator_id"])
-            timestamp = discord.utils.format_dt(discord.utils.utcfromtimestamp(warn["timestamp"]), "f")
+        moderators = await users.resolve_many(
+            self.bot, [warn["moderator_id"] for warn in warns], interaction.guild
+        )
+        for i, warn in enumerate(warns, 1):
+            moderator = moderators[warn["moderator_id"]]
+            timestamp = discord.utils.format_dt(datetime.fromisoformat(warn["created_at"]), "f")
             embed.add_field(
                 name=f"Предупреждение #{i}",
-                value=f"**Модератор:** {moderator.mention}\n**Причина:** {warn['reason']}\n**Дата:** {timestamp}",
+                value=f"**Модератор:** {moderator.mention if moderator else 'Неизвестен'}\n**Причина:** {warn['reason']}\n**Дата:** {timestamp}",
                 inline=False
             )
             
@@ -188,15 +182,13 @@ class ModerationWarns(commands.Cog):
     @app_commands.describe(участник="Участник для снятия предупреждения", номер="Номер предупреждения для снятия (по умолчанию последнее)")
     @commands.has_permissions(manage_messages=True)
     async def unwarn(self, interaction: discord.Interaction, участник: discord.Member, номер: Optional[int] = None):
-        user_data = get_user_data(участник.id)
+        warns = await db.get_warns(interaction.guild_id, участник.id)
         
-        if "moderation" not in user_data or not user_data["moderation"].get("warns"):
+        if not warns:
             return await interaction.response.send_message(
                 f"У {участник.mention} нет предупреждений.",
                 ephemeral=True
             )
-            
-        warns = user_data["moderation"]["warns"]
         
         if номер is None:
             # Снимаем последнее предупреждение
@@ -210,13 +202,7 @@ class ModerationWarns(commands.Cog):
                 )
             removed_warn = warns.pop(номер - 1)
         
-        # Если предупреждений не осталось, удаляем пустой список
-        if not warns:
-            user_data["moderation"].pop("warns")
-            if not user_data["moderation"]:
-                user_data.pop("moderation")
-        
-        save_user_data(участник.id, user_data)
+        await db.delete_warn(removed_warn["id"])
         
         embed = discord.Embed(
             title="✅ Предупреждение снято",
@@ -224,7 +210,7 @@ class ModerationWarns(commands.Cog):
             color=discord.Color.green()
         )
         embed.add_field(name="Причина", value=removed_warn["reason"])
-        embed.add_field(name="Осталось предупреждений", value=len(warns) if "moderation" in user_data and "warns" in user_data["moderation"] else 0)
+        embed.add_field(name="Осталось предупреждений", value=len(warns))
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
         
@@ -236,10 +222,7 @@ class ModerationWarns(commands.Cog):
         )
         embed.add_field(name="Модератор", value=interaction.user.mention)
         embed.add_field(name="Причина", value=removed_warn["reason"])
-        try:
-            await участник.send(embed=embed)
-        except:
-            pass
+        notifier.send(участник, embed)
         
         # Логирование
         await self.log_punishment(interaction, участник, "снятие предупреждения", removed_warn["reason"])
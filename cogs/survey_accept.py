@@ -1,168 +1,89 @@
 import discord
 from discord.ext import commands
-from discord import app_commands
-import re
-import json
-from datetime import datetime
-
-from utils.db import save_survey, get_survey_by_user, update_survey_status  # Добавлен новый импорт
-
-CONFIG_PATH = "config.json"
-REACTION_EMOJI = "❤️"
-
-
-def get_config_value(key):
-    try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        return config.get("анкетирование", {}).get(key)
-    except FileNotFoundError:
-        return None
-
-
-class SurveyModal(discord.ui.Modal, title="📔 Отправка анкеты"):
-    name = discord.ui.TextInput(label="Имя / Псевдоним", required=True, max_length=100)
-    age = discord.ui.TextInput(label="Возраст", required=True, max_length=50)
-    creative_fields = discord.ui.TextInput(label="Вид деятельности", required=True, max_length=200)
-    about = discord.ui.TextInput(
-        label="О себе",
-        style=discord.TextStyle.paragraph,
-        required=True,
-        min_length=100
-    )
-    socials = discord.ui.TextInput(label="Ссылки на соцсети", required=False)
-
-    async def on_submit(self, interaction: discord.Interaction):
-        if re.search(r"[A-Za-zА-Яа-яЁё]", self.age.value.strip()):
-            return await interaction.response.send_message(
-                "⚠️ В поле возраст нельзя вводить буквы. Пожалуйста, используйте только цифры и символы.",
-                ephemeral=True
-            )
-
-        save_survey(
-            user_id=interaction.user.id,
-            name=self.name.value,
-            age=self.age.value,
-            creative_fields=self.creative_fields.value,
-            about=self.about.value,
-            socials=self.socials.value if self.socials.value else None
+from discord import app_commands, ui
+
+from utils.db import db
+from cogs.survey_modal import SurveyModal, SurveyDecisionButton, LegacySurveyButton
+
+SURVEYS_PER_PAGE = 5
+SURVEY_STATUSES = {
+    "pending": ("🕒", "на модерации", discord.Color.orange()),
+    "approved": ("✅", "одобрена", discord.Color.green()),
+    "rejected": ("❌", "отклонена", discord.Color.red())
+}
+
+
+class SurveyQueueView(ui.View):
+    """Очередь анкет на модерации: страницы читаются из базы по индексу (guild_id, status)"""
+
+    def __init__(self, guild_id, total):
+        super().__init__(timeout=120)
+        self.guild_id = guild_id
+        self.total = total
+        self.current_page = 1
+        self.total_pages = max(1, -(-total // SURVEYS_PER_PAGE))  # Округление вверх
+        self.next_page.disabled = self.total_pages <= 1
+
+    async def create_embed(self):
+        embed = discord.Embed(
+            title=f"Анкеты на модерации: {self.total} (Страница {self.current_page}/{self.total_pages})",
+            color=discord.Color.orange()
         )
-
-        moderation_channel_id = get_config_value("канал_модерации")
-        if not moderation_channel_id:
-            return await interaction.response.send_message("❌ Канал модерации не настроен.", ephemeral=True)
-
-        channel = interaction.client.get_channel(int(moderation_channel_id))
-        if channel is None:
-            return await interaction.response.send_message("❌ Не удалось найти канал модерации.", ephemeral=True)
-
-        embed = discord.Embed(title="📥 Новая анкета на модерации", color=discord.Color.orange())
-        embed.add_field(name="Имя / Псевдоним", value=self.name.value, inline=False)
-        embed.add_field(name="Возраст", value=self.age.value, inline=False)
-        embed.add_field(name="Вид деятельности", value=self.creative_fields.value, inline=False)
-        embed.add_field(name="О себе", value=self.about.value, inline=False)
-        embed.add_field(name="Соцсети", value=self.socials.value if self.socials.value else "—", inline=False)
-        embed.set_footer(text=f"Отправлено: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
-
-        view = ModerationButtons(interaction.user)
-        await channel.send(embed=embed, view=view)
-        await interaction.response.send_message("✅ Анкета отправлена на модерацию!", ephemeral=True)
-
-
-class ModerationButtons(discord.ui.View):
-    def __init__(self, author):
-        super().__init__(timeout=None)
-        self.author = author
-
-    @discord.ui.button(label="✅ Одобрить", style=discord.ButtonStyle.success)
-    async def approve(self, interaction: discord.Interaction, button: discord.ui.Button):
-        publication_channel_id = get_config_value("канал_публикации")
-        if not publication_channel_id:
-            return await interaction.response.send_message("❌ Канал публикации не настроен.", ephemeral=True)
-
-        data = get_survey_by_user(self.author.id)
-        if not data:
-            return await interaction.response.send_message("❌ Анкета не найдена.", ephemeral=True)
-
-        channel = interaction.client.get_channel(int(publication_channel_id))
-        if channel is None:
-            return await interaction.response.send_message("❌ Не удалось найти канал публикации.", ephemeral=True)
-
-        embed = discord.Embed(title="📝 Новая анкета", color=discord.Color.purple())
-        embed.add_field(name="Имя / Псевдоним", value=data["name"], inline=False)
-        embed.add_field(name="Возраст", value=data["age"], inline=False)
-        embed.add_field(name="Вид деятельности", value=data["creative_fields"], inline=False)
-        embed.add_field(name="О себе", value=data["about"], inline=False)
-        embed.add_field(name="Соцсети", value=data["socials"] if data["socials"] else "—", inline=False)
-        embed.set_footer(text=f"Отправлено пользователем: {self.author.display_name}")
-
-        msg = await channel.send(embed=embed)
-        await msg.add_reaction(REACTION_EMOJI)
-        
-        # Обновляем статус анкеты
-        update_survey_status(self.author.id, "approved")
-        await interaction.response.send_message("✅ Анкета одобрена и опубликована.", ephemeral=True)
-
-    @discord.ui.button(label="❌ Отклонить", style=discord.ButtonStyle.danger)
-    async def reject(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Получаем данные анкеты
-        data = get_survey_by_user(self.author.id)
-        if not data:
-            return await interaction.response.send_message("❌ Анкета не найдена.", ephemeral=True)
-
-        # Запрашиваем причину отклонения
-        modal = RejectReasonModal()
-        await interaction.response.send_modal(modal)
-        await modal.wait()
-
-        if not modal.reason:
-            return
-
-        # Формируем полное сообщение с анкетой
-        message = (
-            "**Ваша анкета была отклонена.**\n"
-            f"Причина: {modal.reason}\n\n"
-            "## Полный текст вашей анкеты:\n"
-            f"### Имя / Псевдоним\n{data.get('name', 'Не указано')}\n\n"
-            f"### Возраст\n{data.get('age', 'Не указано')}\n\n"
-            f"### Вид деятельности\n{data.get('creative_fields', 'Не указано')}\n\n"
-            f"### О себе\n{data.get('about', 'Не указано')}\n\n"
-            f"### Соцсети\n{data.get('socials', 'Не указаны')}\n\n"
-            "Вы можете отредактировать анкету и отправить её заново с помощью команды `/анкета редактировать`"
+        surveys = await db.get_surveys_by_status(
+            self.guild_id, "pending", SURVEYS_PER_PAGE, (self.current_page - 1) * SURVEYS_PER_PAGE
         )
+        for survey in surveys:
+            about = survey["about"][:150] + "..." if len(survey["about"]) > 150 else survey["about"]
+            embed.add_field(
+                name=f"Анкета #{survey['id']} — {survey['name']}",
+                value=f"**Автор:** <@{survey['user_id']}>\n"
+                      f"**Отправлена:** {survey['created_at'][:16].replace('T', ' ')}\n"
+                      f"**Творчество:** {survey['creativity']}\n"
+                      f"**О себе:** {about}",
+                inline=False
+            )
+        if not surveys:
+            embed.description = "Очередь пуста"
+        return embed
 
-        try:
-            await self.author.send(message)
-        except discord.Forbidden:
-            await interaction.followup.send("⚠️ Не удалось отправить пользователю ЛС.", ephemeral=True)
-        else:
-            await interaction.followup.send("❌ Анкета отклонена. Уведомление отправлено пользователю.", ephemeral=True)
-        
-        # Обновляем статус анкеты
-        update_survey_status(self.author.id, "rejected", modal.reason)
-
-
-class RejectReasonModal(discord.ui.Modal, title="Укажите причину отклонения"):
-    reason = discord.ui.TextInput(
-        label="Причина отклонения",
-        style=discord.TextStyle.paragraph,
-        required=True,
-        max_length=500
-    )
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        self.current_page = page
+        self.prev_page.disabled = page <= 1
+        self.next_page.disabled = page >= self.total_pages
+        await interaction.response.edit_message(embed=await self.create_embed(), view=self)
 
-    def __init__(self):
-        super().__init__()
-        self.reason = None
+    @ui.button(label="◀", style=discord.ButtonStyle.gray, disabled=True)
+    async def prev_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show_page(interaction, max(1, self.current_page - 1))
 
-    async def on_submit(self, interaction: discord.Interaction):
-        self.reason = self.reason.value
-        await interaction.response.defer()
+    @ui.button(label="▶", style=discord.ButtonStyle.gray)
+    async def next_page(self, interaction: discord.Interaction, button: ui.Button):
+        await self._show_page(interaction, min(self.total_pages, self.current_page + 1))
 
 
 class SurveyCog(commands.Cog):
+    анкеты = app_commands.Group(
+        name="анкеты",
+        description="Модерация анкет",
+        default_permissions=discord.Permissions(manage_messages=True)
+    )
+
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Кнопки модерации анкет разбирают ID из custom_id: один обработчик на все сообщения
+        self.bot.add_dynamic_items(SurveyDecisionButton, LegacySurveyButton)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(SurveyDecisionButton, LegacySurveyButton)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Анкеты из старого JSON сохранены без сервера; бот тогда работал на одном сервере
+        if len(self.bot.guilds) == 1:
+            await db.claim_legacy_surveys(self.bot.guilds[0].id)
+
     @app_commands.command(name="анкета", description="Редактировать или посмотреть анкету")
     @app_commands.describe(
         действие="Что сделать: редактировать или посмотреть",
@@ -184,31 +105,32 @@ class SurveyCog(commands.Cog):
             await interaction.response.send_modal(SurveyModal())
         elif действие.value == "посмотреть":
             user = участник or interaction.user
-            data = get_survey_by_user(user.id)
+            data = await db.get_current_survey(user.id)
 
             if not data:
                 return await interaction.response.send_message("❌ Анкета не найдена.", ephemeral=True)
 
-            status = data.get("status", "на модерации")
-            status_emoji = "✅" if status == "approved" else "❌" if status == "rejected" else "🕒"
-            
-            embed = discord.Embed(
-                title=f"{status_emoji} Анкета пользователя {user.display_name}",
-                color=discord.Color.green() if status == "approved" else discord.Color.red() if status == "rejected" else discord.Color.orange()
-            )
+            emoji, status, color = SURVEY_STATUSES.get(data["status"], SURVEY_STATUSES["pending"])
+            embed = discord.Embed(title=f"{emoji} Анкета пользователя {user.display_name}", color=color)
             embed.add_field(name="Имя / Псевдоним", value=data["name"], inline=False)
             embed.add_field(name="Возраст", value=data["age"], inline=False)
-            embed.add_field(name="Вид деятельности", value=data["creative_fields"], inline=False)
-            embed.add_field(name="О себе", value=data["about"], inline=False)
-            embed.add_field(name="Соцсети", value=data["socials"] if data["socials"] else "—", inline=False)
-            
-            if status == "rejected" and data.get("reject_reason"):
-                embed.add_field(name="Причина отклонения", value=data["reject_reason"], inline=False)
-                
-            embed.set_footer(text=f"Статус: {'одобрена' if status == 'approved' else 'отклонена' if status == 'rejected' else 'на модерации'}")
+            embed.add_field(name="Вид деятельности", value=data["creativity"], inline=False)
+            embed.add_field(name="О себе", value=data["about"][:1024], inline=False)
+            embed.add_field(name="Соцсети", value=data["socials"] or "—", inline=False)
+
+            if data["status"] == "rejected" and data["rejection_reason"]:
+                embed.add_field(name="Причина отклонения", value=data["rejection_reason"], inline=False)
+
+            embed.set_footer(text=f"Статус: {status}")
 
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @анкеты.command(name="очередь", description="Анкеты, ожидающие модерации")
+    async def queue(self, interaction: discord.Interaction):
+        total = await db.count_surveys_by_status(interaction.guild_id, "pending")
+        view = SurveyQueueView(interaction.guild_id, total)
+        await interaction.response.send_message(embed=await view.create_embed(), view=view, ephemeral=True)
+
 
 async def setup(bot):
-    await bot.add_cog(SurveyCog(bot))
\ No newline at end of file
+    await bot.add_cog(SurveyCog(bot))
@@ -2,7 +2,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional
-from utils.user_data import get_user_data, save_user_data
+from utils.xp_ledger import SOURCE_ADMIN
 
 class LevelingAdminCommands(commands.Cog):  # Изменили название класса
     def __init__(self, bot):
@@ -37,24 +37,23 @@ class LevelingAdminCommands(commands.Cog):  # Изменили название
                 )
             
             await interaction.response.defer(ephemeral=True)
-            user_data = get_user_data(участник.id)
-            
-            # Инициализация структуры
-            if "leveling" not in user_data:
-                user_data["leveling"] = {
-                    "text_xp": 0,
-                    "voice_xp": 0,
-                    "total_xp": 0,
-                    "level": 1,
-                    "voice_time": 0  # Добавляем отсутствующее поле
-                }
-            
-            # Добавляем voice_time, если его нет
-            if "voice_time" not in user_data["leveling"]:
-                user_data["leveling"]["voice_time"] = 0
+            leveling_cog = self.bot.get_cog("LevelingSystem")
+            if not leveling_cog:
+                return await interaction.followup.send(
+                    "❌ Система уровней не загружена!",
+                    ephemeral=True
+                )
+
+            leveling = await leveling_cog.xp_buffer.get(interaction.guild_id, участник.id) or {
+                "text_xp": 0,
+                "voice_xp": 0,
+                "total_xp": 0,
+                "level": 1,
+                "voice_time": 0
+            }
             
             if тип.value == "voice":
-                old_time = user_data["leveling"]["voice_time"]
+                old_time = leveling["voice_time"]
                 change = количество if действие.value == "add" else -количество
                 new_time = max(0, old_time + change)
                 
@@ -64,9 +63,17 @@ class LevelingAdminCommands(commands.Cog):  # Изменили название
                         ephemeral=True
                     )
                 
-                user_data["leveling"]["voice_time"] = new_time
-                user_data["leveling"]["voice_xp"] = new_time * self.VOICE_XP_PER_MIN
-                user_data["leveling"]["total_xp"] = user_data["leveling"]["text_xp"] + user_data["leveling"]["voice_xp"]
+                # Правка проходит через буфер опыта и попадает в журнал как разница
+                await leveling_cog.xp_buffer.add(
+                    interaction.guild_id, участник.id,
+                    voice_xp=new_time * self.VOICE_XP_PER_MIN - leveling["voice_xp"],
+                    voice_time=new_time - old_time,
+                    source=SOURCE_ADMIN
+                )
+                leveling_cog.leaderboards.update(
+                    interaction.guild_id, участник.id,
+                    leveling_cog.xp_buffer.totals[(interaction.guild_id, участник.id)]["total_xp"]
+                )
                 
                 action_word = "начислено" if действие.value == "add" else "снято"
                 await interaction.followup.send(
@@ -74,8 +81,6 @@ class LevelingAdminCommands(commands.Cog):  # Изменили название
                     ephemeral=True
                 )
             
-            save_user_data(участник.id, user_data)
-            
         except Exception as e:
             await interaction.followup.send(
                 f"❌ Ошибка: {str(e)}",
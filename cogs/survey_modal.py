@@ -1,11 +1,11 @@
 import discord
+import re
 from discord import ui
 from discord.ui import Modal, TextInput
-import json
-from pathlib import Path
-from utils.user_data import get_user_data, save_user_data
-
-CONFIG_FILE = "data/survey_config.json"
+from utils.db import db
+from utils.config import guild_config
+from utils.user_resolver import users
+from utils.notifier import notifier
 
 class SurveyModal(Modal, title="📝 Заполнение анкеты"):
     name = TextInput(
@@ -42,33 +42,25 @@ class SurveyModal(Modal, title="📝 Заполнение анкеты"):
     )
 
     async def on_submit(self, interaction: discord.Interaction):
+        if re.search(r"[A-Za-zА-Яа-яЁё]", self.age.value.strip()):
+            return await interaction.response.send_message(
+                "⚠️ В поле возраст нельзя вводить буквы. Пожалуйста, используйте только цифры и символы.",
+                ephemeral=True
+            )
+
         try:
-            # Получаем или создаем данные пользователя
-            user_data = get_user_data(interaction.user.id)
-            
             # Сохраняем анкету
-            survey_data = {
+            survey_id = await db.add_survey(interaction.guild_id, interaction.user.id, {
                 "name": self.name.value,
                 "age": self.age.value,
                 "creativity": self.creativity.value,
                 "about": self.about.value,
-                "socials": self.socials.value if self.socials.value else "Не указано",
-                "status": "pending",
-                "timestamp": interaction.created_at.isoformat()
-            }
-
-            if "surveys" not in user_data:
-                user_data["surveys"] = {"current": None, "history": []}
-            
-            user_data["surveys"]["current"] = survey_data
-            user_data["surveys"]["history"].append(survey_data)
-            save_user_data(interaction.user.id, user_data)
+                "socials": self.socials.value if self.socials.value else "Не указано"
+            })
 
             # Отправляем на модерацию
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                config = json.load(f)
-            
-            mod_channel = interaction.client.get_channel(int(config["модерация"]))
+            channel_id = guild_config.get(interaction.guild_id, "survey", "moderation_channel_id")
+            mod_channel = interaction.client.get_channel(channel_id) if channel_id else None
             if mod_channel:
                 embed = discord.Embed(
                     title="📥 Новая анкета на модерации",
@@ -81,7 +73,7 @@ class SurveyModal(Modal, title="📝 Заполнение анкеты"):
                 embed.add_field(name="Соцсети", value=self.socials.value if self.socials.value else "—", inline=False)
                 embed.set_footer(text=f"Отправил: {interaction.user.display_name}", icon_url=interaction.user.display_avatar.url)
 
-                view = SurveyModerationView(interaction.user.id)
+                view = SurveyModerationView(survey_id)
                 await mod_channel.send(embed=embed, view=view)
                 await interaction.response.send_message("✅ Анкета отправлена на модерацию!", ephemeral=True)
             else:
@@ -91,32 +83,44 @@ class SurveyModal(Modal, title="📝 Заполнение анкеты"):
             print(f"Ошибка при отправке анкеты: {e}")
             await interaction.response.send_message("❌ Произошла ошибка при отправке анкеты", ephemeral=True)
 
-class SurveyModerationView(discord.ui.View):
-    def __init__(self, user_id: int):
-        super().__init__(timeout=None)
-        self.user_id = user_id
+class SurveyDecisionButton(ui.DynamicItem[ui.Button], template=r"survey:(?P<action>approve|reject):(?P<id>\d+)"):
+    """Кнопка решения по анкете: ID анкеты хранится в custom_id, а не в объекте в памяти"""
+
+    ACTIONS = {
+        "approve": ("✅ Одобрить", discord.ButtonStyle.success),
+        "reject": ("❌ Отклонить", discord.ButtonStyle.danger)
+    }
+
+    def __init__(self, action: str, survey_id: int):
+        label, style = self.ACTIONS[action]
+        super().__init__(ui.Button(label=label, style=style, custom_id=f"survey:{action}:{survey_id}"))
+        self.action = action
+        self.survey_id = survey_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["action"], int(match["id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        if self.action == "reject":
+            return await interaction.response.send_modal(RejectionReasonModal(self.survey_id))
 
-    @discord.ui.button(label="✅ Одобрить", style=discord.ButtonStyle.success, custom_id="approve_survey")
-    async def approve(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Логика одобрения
-        user_data = get_user_data(self.user_id)
-        if not user_data or "surveys" not in user_data:
+        survey = await db.get_survey(self.survey_id)
+        if not survey:
             return await interaction.response.send_message("❌ Анкета не найдена", ephemeral=True)
 
-        user_data["surveys"]["current"]["status"] = "approved"
-        save_user_data(self.user_id, user_data)
+        if not await db.update_survey_status(survey["id"], "approved"):
+            return await interaction.response.send_message("⚠️ Эта анкета уже рассмотрена", ephemeral=True)
 
         # Отправка в канал публикации
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        pub_channel = interaction.client.get_channel(int(config["публикация"]))
+        channel_id = guild_config.get(interaction.guild_id, "survey", "publication_channel_id")
+        pub_channel = interaction.client.get_channel(channel_id) if channel_id else None
         if pub_channel:
             embed = discord.Embed(
                 title="📝 Новая анкета участника",
                 color=discord.Color.green()
             )
-            survey = user_data["surveys"]["current"]
             embed.add_field(name="Имя", value=survey["name"], inline=False)
             embed.add_field(name="Возраст", value=survey["age"], inline=False)
             embed.add_field(name="Творчество", value=survey["creativity"], inline=False)
@@ -129,9 +133,27 @@ class SurveyModerationView(discord.ui.View):
         else:
             await interaction.response.send_message("❌ Ошибка: канал публикации не найден", ephemeral=True)
 
-    @discord.ui.button(label="❌ Отклонить", style=discord.ButtonStyle.danger, custom_id="reject_survey")
-    async def reject(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(RejectionReasonModal(self.user_id))
+class LegacySurveyButton(ui.DynamicItem[ui.Button], template=r"(?P<action>approve|reject)_survey"):
+    """Кнопки старых сообщений: в них не было ID анкеты, решение принимается через очередь"""
+
+    def __init__(self, action: str):
+        super().__init__(ui.Button(label=action, custom_id=f"{action}_survey"))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["action"])
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.response.send_message(
+            "⚠️ Эта кнопка устарела. Найдите анкету через /анкеты очередь.",
+            ephemeral=True
+        )
+
+class SurveyModerationView(ui.View):
+    def __init__(self, survey_id: int):
+        super().__init__(timeout=None)
+        self.add_item(SurveyDecisionButton("approve", survey_id))
+        self.add_item(SurveyDecisionButton("reject", survey_id))
 
 class RejectionReasonModal(Modal, title="Укажите причину отклонения"):
     reason = TextInput(
@@ -141,36 +163,35 @@ class RejectionReasonModal(Modal, title="Укажите причину откл
         max_length=1000
     )
 
-    def __init__(self, user_id: int):
+    def __init__(self, survey_id: int):
         super().__init__()
-        self.user_id = user_id
+        self.survey_id = survey_id
 
     async def on_submit(self, interaction: discord.Interaction):
-        user_data = get_user_data(self.user_id)
-        if not user_data or "surveys" not in user_data:
+        survey = await db.get_survey(self.survey_id)
+        if not survey:
             return await interaction.response.send_message("❌ Анкета не найдена", ephemeral=True)
 
-        user_data["surveys"]["current"]["status"] = "rejected"
-        user_data["surveys"]["current"]["rejection_reason"] = self.reason.value
-        save_user_data(self.user_id, user_data)
+        if not await db.update_survey_status(survey["id"], "rejected", self.reason.value):
+            return await interaction.response.send_message("⚠️ Эта анкета уже рассмотрена", ephemeral=True)
 
         # Отправка уведомления пользователю
-        user = await interaction.client.fetch_user(self.user_id)
+        user = await users.resolve(interaction.client, survey["user_id"])
         if user:
-            try:
-                embed = discord.Embed(
-                    title="❌ Ваша анкета была отклонена",
-                    color=discord.Color.red()
-                )
-                survey = user_data["surveys"]["current"]
-                embed.add_field(name="Причина", value=self.reason.value, inline=False)
-                embed.add_field(name="Имя", value=survey["name"], inline=False)
-                embed.add_field(name="Возраст", value=survey["age"], inline=False)
-                embed.add_field(name="Творчество", value=survey["creativity"], inline=False)
-                embed.add_field(name="О себе", value=survey["about"], inline=False)
-                embed.add_field(name="Соцсети", value=survey["socials"], inline=False)
-                
-                await user.send(embed=embed)
-                await interaction.response.send_message("✅ Пользователь уведомлен об отклонении", ephemeral=True)
-            except discord.Forbidden:
-                await interaction.response.send_message("⚠️ Не удалось отправить ЛС пользователю", ephemeral=True)
\ No newline at end of file
+            embed = discord.Embed(
+                title="❌ Ваша анкета была отклонена",
+                color=discord.Color.red()
+            )
+            embed.add_field(name="Причина", value=self.reason.value, inline=False)
+            embed.add_field(name="Имя", value=survey["name"], inline=False)
+            embed.add_field(name="Возраст", value=survey["age"], inline=False)
+            embed.add_field(name="Творчество", value=survey["creativity"], inline=False)
+            embed.add_field(name="О себе", value=survey["about"], inline=False)
+            embed.add_field(name="Соцсети", value=survey["socials"], inline=False)
+            
+            if notifier.send(user, embed):
+                await interaction.response.send_message("✅ Анкета отклонена, пользователю отправляется уведомление", ephemeral=True)
+            else:
+                await interaction.response.send_message("⚠️ Анкета отклонена, но у пользователя закрыты ЛС", ephemeral=True)
+        else:
+            await interaction.response.send_message("⚠️ Анкета отклонена, но пользователь не найден", ephemeral=True)
\ No newline at end of file
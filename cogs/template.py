@@ -1,44 +1,31 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import importlib.util
-import os
-import sys
+from utils.template_registry import template_registry
 
 class Template(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.templates = {
-            "анкета": "survey_template"
-        }
+
+    async def cog_load(self):
+        template_registry.load()
+        template_registry.start()
+
+    async def cog_unload(self):
+        template_registry.close()
 
     @app_commands.command(name="шаблон", description="Вызвать шаблонное сообщение")
     @app_commands.describe(имя="Название шаблона (например, анкета)")
     async def шаблон(self, interaction: discord.Interaction, имя: str):
-        if имя not in self.templates:
+        module = template_registry.get(имя)
+        if module is None:
             await interaction.response.send_message("❌ Такого шаблона не существует.", ephemeral=True)
             return
 
-        template_name = self.templates[имя]
-        
-        # Абсолютный путь к файлу шаблона
-        template_path = os.path.join(os.path.dirname(__file__), "..", "templates", f"{template_name}.py")
-        template_path = os.path.normpath(template_path)
-
-        if not os.path.exists(template_path):
-            await interaction.response.send_message(f"❌ Файл шаблона не найден по пути: {template_path}", ephemeral=True)
-            return
-
         try:
-            # Динамическая загрузка модуля
-            spec = importlib.util.spec_from_file_location(template_name, template_path)
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[template_name] = module
-            spec.loader.exec_module(module)
-            
             embed, view = module.get_template()
             await interaction.response.send_message(embed=embed, view=view)
-            
+
         except Exception as e:
             await interaction.response.send_message(f"❌ Ошибка загрузки шаблона: {type(e).__name__} - {str(e)}", ephemeral=True)
 
@@ -46,9 +33,8 @@ class Template(commands.Cog):
     async def шаблон_autocomplete(self, interaction: discord.Interaction, current: str):
         return [
             app_commands.Choice(name=name, value=name)
-            for name in self.templates
-            if current.lower() in name.lower()
+            for name in template_registry.complete(current)
         ]
 
 async def setup(bot):
-    await bot.add_cog(Template(bot))
\ No newline at end of file
+    await bot.add_cog(Template(bot))
@@ -1,17 +1,153 @@
 import discord
 from discord.ext import commands
 from discord import Member
-from datetime import datetime
+from datetime import datetime, timedelta
+import asyncio
+import io
+from utils.config import guild_config
+from utils.cards import cards
+from utils.join_raid import JoinRaidTracker
+from utils.log_dispatcher import log_dispatcher
+
+DIGEST_INTERVAL = 30      # Как часто во время рейда публикуется сводка входов
+DIGEST_MAX_MENTIONS = 40
+NEW_ACCOUNT_DAYS = 7      # Аккаунт младше этого считается новым
+LOCKDOWN_TIMEOUT = 3600   # Таймаут новым аккаунтам во время рейда, если включена блокировка
+LOCKDOWN_CONCURRENCY = 3  # Одновременных таймаутов, чтобы блокировка не выедала лимит запросов
 
 class Welcome(commands.Cog):
+    """Приветствия, прощания и бусты.
+
+    Во время наплыва входов (рейда) приветствия не отправляются по одному:
+    входы и выходы копятся и раз в DIGEST_INTERVAL секунд уходят одной
+    сводкой, так что канал приветствий не забивает лимит запросов бота.
+    Новые аккаунты в сводке отмечаются, а при включённой блокировке
+    (welcome.raid_lockdown) получают таймаут.
+    """
+
     def __init__(self, bot):
         self.bot = bot
-        self.booster_role_id = 1384488323652915220  # 🔁 Заменить на ID роли бустера
-        self.channel_id = 1284472130754449453      # 🔁 ID канала для сообщений
+        self.raids = JoinRaidTracker()
+        self._digests = {}  # guild_id -> {"joins": [...], "new": число, "leaves": число}
+        self._digest_tasks = {}
+        self._lockdowns = set()
+        self._lockdown_semaphore = asyncio.Semaphore(LOCKDOWN_CONCURRENCY)
+
+    async def cog_unload(self):
+        for task in [*self._digest_tasks.values(), *self._lockdowns]:
+            task.cancel()
+
+    @staticmethod
+    def get_channel(guild):
+        """Канал приветствий сервера из настроек (раздел welcome)"""
+        channel_id = guild_config.get(guild.id, "welcome", "channel_id")
+        return guild.get_channel(channel_id) if channel_id else None
+
+    @staticmethod
+    async def send_card(channel, member: Member, embed: discord.Embed, subtitle: str):
+        """Отправляет embed с карточкой; без Pillow или при ошибке — с миниатюрой аватара"""
+        if cards.available:
+            try:
+                card = await cards.welcome_card(member, member.display_name, subtitle, embed.color.to_rgb())
+                embed.set_image(url="attachment://card.png")
+                return await channel.send(embed=embed, file=discord.File(io.BytesIO(card), "card.png"))
+            except Exception as e:
+                print(f"Ошибка отрисовки карточки: {e}")
+                embed.set_image(url=None)
+        embed.set_thumbnail(url=member.display_avatar.url)
+        await channel.send(embed=embed)
+
+    @staticmethod
+    def is_new_account(member: Member) -> bool:
+        days = guild_config.get(member.guild.id, "welcome", "new_account_days", NEW_ACCOUNT_DAYS)
+        return discord.utils.utcnow() - member.created_at < timedelta(days=days)
+
+    def _digest(self, guild: discord.Guild) -> dict:
+        digest = self._digests.setdefault(guild.id, {"joins": [], "new": 0, "leaves": 0})
+        if guild.id not in self._digest_tasks:
+            self._digest_tasks[guild.id] = asyncio.create_task(self._digest_loop(guild))
+            self.alert_moderators(guild)
+        return digest
+
+    async def _digest_loop(self, guild: discord.Guild):
+        try:
+            while True:
+                await asyncio.sleep(DIGEST_INTERVAL)
+                digest = self._digests.pop(guild.id, None)
+                if digest:
+                    await self.send_digest(guild, digest)
+                elif not self.raids.in_raid(guild.id):
+                    break
+        finally:
+            self._digest_tasks.pop(guild.id, None)
+
+    async def send_digest(self, guild: discord.Guild, digest: dict):
+        channel = self.get_channel(guild)
+        if not channel:
+            return
+        joins = digest["joins"]
+        mentions = " ".join(member.mention for member in joins[:DIGEST_MAX_MENTIONS])
+        if len(joins) > DIGEST_MAX_MENTIONS:
+            mentions += f" и ещё {len(joins) - DIGEST_MAX_MENTIONS}"
+        embed = discord.Embed(
+            title=f"👋 Новых участников: {len(joins)}",
+            description=mentions or None,
+            color=discord.Color.green(),
+            timestamp=datetime.utcnow()
+        )
+        if digest["new"]:
+            embed.add_field(name="⚠️ Новых аккаунтов", value=digest["new"])
+        if digest["leaves"]:
+            embed.add_field(name="Покинули сервер", value=digest["leaves"])
+        embed.set_footer(text=f"Сводка за {DIGEST_INTERVAL} с: приток участников")
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"Ошибка отправки сводки входов: {e}")
+
+    def alert_moderators(self, guild: discord.Guild):
+        """Сообщает в лог наказаний, что начался наплыв входов"""
+        channel_id = guild_config.get(guild.id, "logs", "punishments_channel_id")
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if not channel:
+            return
+        lockdown = guild_config.get(guild.id, "welcome", "raid_lockdown", False)
+        embed = discord.Embed(
+            title="🚨 Наплыв участников",
+            description=f"За {self.raids.window} с зашло не меньше {self.raids.threshold} участников. "
+                        f"Приветствия собираются в сводку." + (
+                            f" Новые аккаунты получают таймаут на {LOCKDOWN_TIMEOUT // 60} мин." if lockdown else ""
+                        ),
+            color=discord.Color.dark_red(),
+            timestamp=discord.utils.utcnow()
+        )
+        log_dispatcher.send(channel, embed)
+
+    def queue_lock_down(self, member: Member):
+        """Ставит таймаут в фоне, не задерживая обработку следующих входов"""
+        task = asyncio.create_task(self.lock_down(member))
+        self._lockdowns.add(task)
+        task.add_done_callback(self._lockdowns.discard)
+
+    async def lock_down(self, member: Member):
+        async with self._lockdown_semaphore:
+            try:
+                await member.timeout(timedelta(seconds=LOCKDOWN_TIMEOUT), reason="Наплыв участников: новый аккаунт")
+            except discord.HTTPException as e:
+                print(f"Ошибка блокировки нового аккаунта {member.id}: {e}")
 
     @commands.Cog.listener()
     async def on_member_join(self, member: Member):
-        channel = member.guild.get_channel(self.channel_id)
+        if self.raids.record(member.guild.id):
+            digest = self._digest(member.guild)
+            digest["joins"].append(member)
+            if self.is_new_account(member):
+                digest["new"] += 1
+                if guild_config.get(member.guild.id, "welcome", "raid_lockdown", False):
+                    self.queue_lock_down(member)
+            return
+
+        channel = self.get_channel(member.guild)
         if channel:
             embed = discord.Embed(
                 title="👋 Новый участник!",
@@ -19,12 +155,15 @@ class Welcome(commands.Cog):
                 color=discord.Color.green(),
                 timestamp=datetime.utcnow()
             )
-            embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-            await channel.send(embed=embed)
+            await self.send_card(channel, member, embed, "Добро пожаловать на сервер!")
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: Member):
-        channel = member.guild.get_channel(self.channel_id)
+        if self.raids.in_raid(member.guild.id):
+            self._digest(member.guild)["leaves"] += 1
+            return
+
+        channel = self.get_channel(member.guild)
         if channel:
             embed = discord.Embed(
                 title="😢 Участник покинул сервер",
@@ -32,17 +171,16 @@ class Welcome(commands.Cog):
                 color=discord.Color.red(),
                 timestamp=datetime.utcnow()
             )
-            embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-            await channel.send(embed=embed)
+            await self.send_card(channel, member, embed, "Покинул сервер")
 
     @commands.Cog.listener()
     async def on_member_update(self, before: Member, after: Member):
-        booster_role = after.guild.get_role(self.booster_role_id)
+        booster_role = after.guild.get_role(guild_config.get(after.guild.id, "welcome", "booster_role_id", 0))
         if booster_role is None:
             return
 
         if booster_role not in before.roles and booster_role in after.roles:
-            channel = after.guild.get_channel(self.channel_id)
+            channel = self.get_channel(after.guild)
             if channel:
                 embed = discord.Embed(
                     title="💜 Сервер забущен!",
@@ -50,8 +188,7 @@ class Welcome(commands.Cog):
                     color=discord.Color.purple(),
                     timestamp=datetime.utcnow()
                 )
-                embed.set_thumbnail(url=after.avatar.url if after.avatar else after.default_avatar.url)
-                await channel.send(embed=embed)
+                await self.send_card(channel, after, embed, "Забустил сервер")
 
 async def setup(bot):
     await bot.add_cog(Welcome(bot))
@@ -1,6 +1,9 @@
 import discord
 from cogs.survey_modal import SurveyModal  # NEW
 
+# Имя шаблона в команде /шаблон
+NAME = "анкета"
+
 class SurveyButton(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -0,0 +1,100 @@
+import unicodedata
+from collections import deque
+
+# Латинские двойники и похожие цифры приводятся к кириллице: «cлoвo» с латинскими
+# буквами совпадёт со «слово». Таблица применяется после нижнего регистра, поэтому
+# и B, H, M, T заданы строчными. Ё и Й сводятся к Е и И при снятии диакритики
+HOMOGLYPHS = str.maketrans({
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к", "m": "м",
+    "o": "о", "p": "р", "t": "т", "x": "х", "y": "у",
+    "0": "о", "3": "з", "4": "ч", "6": "б", "@": "а"
+})
+
+
+def normalize(text):
+    """Нижний регистр, кириллица вместо двойников, без диакритики, невидимых символов и лишних пробелов"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if unicodedata.category(char) not in ("Mn", "Cf"))
+    return " ".join(text.translate(HOMOGLYPHS).split())
+
+
+class WordMatcher:
+    """Автомат Ахо — Корасик для списка запрещённых слов и фраз.
+
+    Поиск проходит текст один раз, поэтому время зависит от длины сообщения,
+    а не от размера списка. Слово совпадает только целиком (по границам слов);
+    запись со звёздочкой на конце («слов*») совпадает с началом слова.
+    Новые слова добавляются в готовый бор без пересборки, после чего
+    пересчитываются только суффиксные ссылки.
+    """
+
+    def __init__(self, words=()):
+        self.words = set()
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # (длина, слово, совпадение по началу)
+        self._linked = True
+        self.add(words)
+
+    def add(self, words):
+        """Добавляет слова в бор; ссылки пересчитываются при следующем поиске"""
+        for word in words:
+            prefix = word.endswith("*")
+            pattern = normalize(word.rstrip("*").strip())
+            if not pattern or word in self.words:
+                continue
+            self.words.add(word)
+            node = 0
+            for char in pattern:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._out[node].append((len(pattern), word, prefix))
+            self._linked = False
+
+    def _link(self):
+        """Суффиксные ссылки обходом в ширину; выходы наследуются по ссылке"""
+        outputs = [list(out) for out in self._out]
+        queue = deque()
+        for node in self._goto[0].values():
+            self._fail[node] = 0
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                outputs[child] = outputs[child] + [
+                    entry for entry in outputs[self._fail[child]] if entry not in outputs[child]
+                ]
+                queue.append(child)
+        self._out = outputs
+        self._linked = True
+
+    def search(self, text):
+        """Первое запрещённое слово в тексте или None"""
+        if not self.words:
+            return None
+        if not self._linked:
+            self._link()
+
+        text = normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, word, prefix in out[node]:
+                start = i - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if not prefix and i + 1 < len(text) and text[i + 1].isalnum():
+                    continue
+                return word
+        return None
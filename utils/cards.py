@@ -0,0 +1,220 @@
+import asyncio
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import aiohttp
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Без Pillow карточки не рисуются, команды отвечают текстом
+    Image = None
+
+AVATAR_DIR = Path("data/avatars")
+AVATAR_SIZE = 256
+AVATAR_PRUNE_INTERVAL = 3600  # Как часто чистить AVATAR_DIR
+
+# Шрифты с кириллицей: первый найденный в системе
+FONTS = ("arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf")
+
+BACKGROUND = (35, 39, 42)
+TEXT = (255, 255, 255)
+MUTED = (185, 187, 190)
+
+
+# --- Отрисовка (выполняется в отдельных процессах) ---
+
+def _font(size):
+    for name in FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _round_avatar(avatar_bytes, size):
+    avatar = Image.open(io.BytesIO(avatar_bytes)).convert("RGBA").resize((size, size))
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    avatar.putalpha(mask)
+    return avatar
+
+
+def _to_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def render_rank_card(avatar_bytes, name, level, rank, xp, level_xp, voice_time, accent):
+    """Карточка /ранг: аватар, имя, ранг, уровень и полоса прогресса"""
+    card = Image.new("RGBA", (900, 260), BACKGROUND)
+    draw = ImageDraw.Draw(card)
+    if avatar_bytes:
+        avatar = _round_avatar(avatar_bytes, 180)
+        card.paste(avatar, (40, 40), avatar)
+
+    draw.text((250, 45), name, font=_font(40), fill=TEXT)
+    draw.text((250, 100), f"Ранг #{rank}" if rank else "Ранг Н/Д", font=_font(28), fill=MUTED)
+    draw.text((500, 100), f"Уровень {level}", font=_font(28), fill=accent)
+    draw.text((250, 140), f"В войсе: {voice_time}", font=_font(22), fill=MUTED)
+
+    progress = min(1.0, xp / level_xp) if level_xp else 0
+    draw.rounded_rectangle((250, 185, 860, 215), radius=15, fill=(72, 75, 78))
+    if progress > 0:
+        draw.rounded_rectangle((250, 185, 250 + int(610 * progress), 215), radius=15, fill=accent)
+    draw.text((860, 150), f"{xp}/{level_xp} XP", font=_font(22), fill=MUTED, anchor="ra")
+    return _to_png(card)
+
+
+def render_welcome_card(avatar_bytes, title, subtitle, accent):
+    """Карточка приветствия, прощания или буста"""
+    card = Image.new("RGBA", (900, 300), BACKGROUND)
+    draw = ImageDraw.Draw(card)
+    draw.rectangle((0, 0, 900, 8), fill=accent)
+    if avatar_bytes:
+        avatar = _round_avatar(avatar_bytes, 150)
+        card.paste(avatar, (375, 30), avatar)
+    draw.text((450, 200), title, font=_font(36), fill=TEXT, anchor="ma")
+    draw.text((450, 250), subtitle, font=_font(24), fill=MUTED, anchor="ma")
+    return _to_png(card)
+
+
+# --- Сервис ---
+
+class CardRenderer:
+    """Рисует карточки в пуле процессов, чтобы не задерживать цикл событий.
+
+    Аватары кэшируются по хэшу аватара в памяти и в AVATAR_DIR и скачиваются
+    через одну HTTP-сессию. Готовые карточки хранятся по ключу из всех
+    выводимых на них данных: пока статистика и аватар не изменились,
+    повторный /ранг отдаёт готовую картинку.
+
+    Файлы аватаров на диске вытесняются по времени последнего использования:
+    не реже раза в AVATAR_PRUNE_INTERVAL удаляются файлы старше avatar_ttl дней
+    и самые старые сверх max_avatar_files.
+    """
+
+    def __init__(self, workers=2, max_avatars=256, max_cards=512, avatar_dir=AVATAR_DIR,
+                 max_avatar_files=5000, avatar_ttl=30):
+        self.workers = workers
+        self.max_avatars = max_avatars
+        self.max_cards = max_cards
+        self.avatar_dir = Path(avatar_dir)
+        self.max_avatar_files = max_avatar_files
+        self.avatar_ttl = avatar_ttl
+        self._pruned_at = 0
+        self._avatars = OrderedDict()
+        self._cards = OrderedDict()
+        self._pool = None
+        self._session = None
+
+    @property
+    def available(self):
+        return Image is not None
+
+    @staticmethod
+    def _remember(cache, key, value, limit):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def _read_file(self, path):
+        try:
+            data = path.read_bytes()
+            # Время изменения служит временем последнего использования для вытеснения
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _prune_files(self):
+        """Удаляет давно не использованные аватары и лишние сверх max_avatar_files"""
+        files = []
+        for path in self.avatar_dir.glob("*.png"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort(reverse=True)
+        expire_before = time.time() - self.avatar_ttl * 86400
+        for i, (mtime, path) in enumerate(files):
+            if i >= self.max_avatar_files or mtime < expire_before:
+                path.unlink(missing_ok=True)
+
+    def _write_file(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    async def avatar(self, user):
+        """PNG-аватар пользователя: память, затем диск, затем Discord"""
+        asset = user.display_avatar
+        data = self._avatars.get(asset.key)
+        if data is not None:
+            self._avatars.move_to_end(asset.key)
+            return data
+
+        loop = asyncio.get_running_loop()
+        path = self.avatar_dir / f"{asset.key}.png"
+        data = await loop.run_in_executor(None, self._read_file, path)
+        if data is None:
+            if self._session is None:
+                self._session = aiohttp.ClientSession()
+            url = asset.replace(size=AVATAR_SIZE, format="png", static_format="png").url
+            try:
+                async with self._session.get(url) as response:
+                    response.raise_for_status()
+                    data = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Ошибка загрузки аватара {user.id}: {e}")
+                return None
+            await loop.run_in_executor(None, self._write_file, path, data)
+            if time.monotonic() - self._pruned_at > AVATAR_PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                await loop.run_in_executor(None, self._prune_files)
+
+        self._remember(self._avatars, asset.key, data, self.max_avatars)
+        return data
+
+    async def render(self, key, user, func, *args):
+        """Возвращает PNG карточки из кэша или рисует её в пуле процессов"""
+        card = self._cards.get(key)
+        if card is not None:
+            self._cards.move_to_end(key)
+            return card
+
+        avatar = await self.avatar(user)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        card = await loop.run_in_executor(self._pool, func, avatar, *args)
+        self._remember(self._cards, key, card, self.max_cards)
+        return card
+
+    async def rank_card(self, member, level, rank, xp, level_xp, voice_time, accent):
+        key = ("rank", member.id, member.display_avatar.key, member.display_name,
+               level, rank, xp, level_xp, voice_time)
+        return await self.render(
+            key, member, render_rank_card,
+            member.display_name, level, rank, xp, level_xp, voice_time, accent
+        )
+
+    async def welcome_card(self, member, title, subtitle, accent):
+        key = ("welcome", member.id, member.display_avatar.key, title, subtitle)
+        return await self.render(key, member, render_welcome_card, title, subtitle, accent)
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+cards = CardRenderer()
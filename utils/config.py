@@ -1,6 +1,195 @@
-{
-  "анкетирование": {
-    "канал_модерации": "",
-    "канал_публикации": ""
-  }
-}
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CONFIG_PATH = Path("data/guild_config.json")
+
+# Раздел "default" действует на всех серверах, пока у сервера нет своего значения
+DEFAULT_SCOPE = "default"
+
+# Старые источники настроек: переносятся в CONFIG_PATH при первом запуске
+LEGACY_ROOT_CONFIG = Path("config.json")
+LEGACY_SURVEY_CONFIG = Path("data/survey_config.json")
+LEGACY_LEVELING_CONFIG = Path("data/leveling_config.json")
+LEGACY_MODERATION_DB = Path("data/moderation.db")
+LEGACY_WELCOME = {"channel_id": 1284472130754449453, "booster_role_id": 1384488323652915220}
+
+
+class GuildConfig:
+    """Настройки серверов: один JSON-файл и его копия в памяти.
+
+    Чтение идёт только из памяти. Изменения сразу записываются в файл
+    (через временный файл и замену), а правки файла вручную подхватываются
+    фоновой проверкой времени изменения.
+    Структура: {guild_id | "default": {раздел: {ключ: значение}}}.
+    """
+
+    def __init__(self, path=CONFIG_PATH, poll_interval=5):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._data = {}
+        self._stamp = None
+        # Растёт при каждой смене настроек: по нему подписчики видят, что пора перечитать
+        self.version = 0
+        self._task = None
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="guild-config")
+
+    # --- Чтение ---
+
+    def get(self, guild_id, section, key, default=None):
+        """Возвращает значение настройки сервера, а при его отсутствии — общее"""
+        for scope in (str(guild_id), DEFAULT_SCOPE):
+            value = self._data.get(scope, {}).get(section, {}).get(key)
+            if value is not None:
+                return value
+        return default
+
+    def get_section(self, guild_id, section):
+        """Возвращает раздел настроек сервера поверх общих значений"""
+        return {
+            **self._data.get(DEFAULT_SCOPE, {}).get(section, {}),
+            **self._data.get(str(guild_id), {}).get(section, {})
+        }
+
+    def guilds_with(self, section):
+        """Возвращает {guild_id: раздел} для серверов, где раздел задан явно"""
+        return {
+            int(scope): dict(sections[section])
+            for scope, sections in self._data.items()
+            if scope != DEFAULT_SCOPE and section in sections
+        }
+
+    # --- Запись ---
+
+    async def set(self, guild_id, section, key, value):
+        """Меняет настройку сервера и сразу сохраняет файл"""
+        await self.update(guild_id, section, {key: value})
+
+    async def update(self, guild_id, section, values):
+        """Меняет несколько настроек раздела одной записью файла"""
+        async with self._lock:
+            data = json.loads(json.dumps(self._data))
+            data.setdefault(str(guild_id), {}).setdefault(section, {}).update(values)
+            loop = asyncio.get_running_loop()
+            self._stamp = await loop.run_in_executor(self._executor, self._write, data)
+            self._data = data
+            self.version += 1
+
+    def _write(self, data):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, self.path)
+        return self._file_stamp()
+
+    # --- Загрузка и слежение за файлом ---
+
+    def _file_stamp(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """Читает настройки с диска (блокирует только при запуске)"""
+        if not self.path.exists():
+            self._write(self._migrate_legacy())
+            print(f"✅ Настройки серверов собраны в {self.path}")
+
+        self._apply(*self._read())
+
+    def _read(self):
+        """Читает и разбирает файл: (отметка файла, данные). Состояние не меняет"""
+        stamp = self._file_stamp()
+        with open(self.path, "r", encoding="utf-8") as f:
+            return stamp, json.load(f)
+
+    def _apply(self, stamp, data):
+        self._data = data
+        self._stamp = stamp
+        self.version += 1
+
+    def start(self):
+        """Запускает слежение за изменениями файла"""
+        self._task = asyncio.create_task(self._watch())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._executor.shutdown(wait=True)
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            async with self._lock:
+                stamp = await loop.run_in_executor(self._executor, self._file_stamp)
+                if stamp is None or stamp == self._stamp:
+                    continue
+                try:
+                    # Файл читается в потоке, а подменяются настройки в цикле событий,
+                    # где их читают команды и слушатели
+                    self._apply(*await loop.run_in_executor(self._executor, self._read))
+                    print(f"✅ Настройки серверов перечитаны из {self.path}")
+                except (json.JSONDecodeError, OSError) as e:
+                    # Файл могли сохранить наполовину: оставляем прежние настройки до следующей правки
+                    self._stamp = stamp
+                    print(f"Ошибка чтения {self.path}: {e}")
+
+    # --- Перенос старых форматов ---
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _migrate_legacy(self):
+        """Собирает настройки из config.json, data/*_config.json, moderation.db и кода"""
+        default = {"welcome": dict(LEGACY_WELCOME)}
+        data = {DEFAULT_SCOPE: default}
+
+        survey = {}
+        root = self._read_json(LEGACY_ROOT_CONFIG).get("анкетирование", {})
+        legacy_survey = self._read_json(LEGACY_SURVEY_CONFIG)
+        for key, old_keys in (
+            ("moderation_channel_id", ("модерация", "канал_модерации")),
+            ("publication_channel_id", ("публикация", "канал_публикации"))
+        ):
+            for value in (legacy_survey.get(old_keys[0]), root.get(old_keys[1])):
+                if value:
+                    survey[key] = int(value)
+                    break
+        if survey:
+            default["survey"] = survey
+
+        for guild_id, schedule in self._read_json(LEGACY_LEVELING_CONFIG).items():
+            data.setdefault(str(guild_id), {})["leaderboard"] = schedule
+
+        if LEGACY_MODERATION_DB.exists():
+            conn = sqlite3.connect(LEGACY_MODERATION_DB)
+            try:
+                rows = conn.execute(
+                    "SELECT guild_id, punishments_channel_id, reports_channel_id FROM log_channels"
+                ).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            finally:
+                conn.close()
+            for guild_id, punishments, reports in rows:
+                logs = {"punishments_channel_id": punishments, "reports_channel_id": reports}
+                data.setdefault(str(guild_id), {})["logs"] = {k: v for k, v in logs.items() if v}
+
+        return data
+
+
+guild_config = GuildConfig()
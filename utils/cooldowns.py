@@ -0,0 +1,68 @@
+import time
+from collections import deque
+
+
+class CooldownTracker:
+    """Кулдауны по ключу (например, (guild_id, user_id)) с истечением по корзинам времени.
+
+    Последнее срабатывание ключа хранится в словаре, а сам ключ записывается
+    в корзину шириной period / resolution секунд. Корзины образуют кольцо:
+    корзина, целиком ушедшая за period, удаляется вместе со своими ключами.
+    Поэтому в памяти только ключи, сработавшие за последние period секунд,
+    сколько бы бот ни работал, а очистка занимает O(1) в среднем на вызов.
+    """
+
+    def __init__(self, period, resolution=10, clock=time.time):
+        self.period = period
+        self.width = period / resolution
+        self.clock = clock
+        self._last = {}
+        self._buckets = deque()  # (номер корзины, ключи)
+
+    def __len__(self):
+        return len(self._last)
+
+    def hit(self, key, now=None):
+        """True и запоминает срабатывание, если ключ не на кулдауне; иначе False"""
+        now = self.clock() if now is None else now
+        self._expire(now)
+        last = self._last.get(key)
+        if last is not None and now - last < self.period:
+            return False
+        self._remember(key, now)
+        return True
+
+    def _remember(self, key, timestamp):
+        self._last[key] = timestamp
+        number = int(timestamp // self.width)
+        if not self._buckets or self._buckets[-1][0] != number:
+            self._buckets.append((number, set()))
+        self._buckets[-1][1].add(key)
+
+    def _expire(self, now):
+        while self._buckets and (self._buckets[0][0] + 1) * self.width <= now - self.period:
+            number, keys = self._buckets.popleft()
+            bucket_end = (number + 1) * self.width
+            for key in keys:
+                # Ключ мог сработать снова и попасть в более новую корзину
+                if self._last.get(key, bucket_end) < bucket_end:
+                    del self._last[key]
+
+    # --- Сохранение между перезапусками ---
+
+    def dump(self, now=None):
+        """Список [ключ..., время] для ключей, ещё не вышедших из кулдауна"""
+        now = self.clock() if now is None else now
+        self._expire(now)
+        return [
+            [*key, timestamp] if isinstance(key, tuple) else [key, timestamp]
+            for key, timestamp in self._last.items()
+            if now - timestamp < self.period
+        ]
+
+    def load(self, entries, now=None):
+        """Восстанавливает кулдауны из dump(); истёкшие записи пропускаются"""
+        now = self.clock() if now is None else now
+        for *key, timestamp in sorted(entries, key=lambda entry: entry[-1]):
+            if now - timestamp < self.period:
+                self._remember(tuple(key) if len(key) > 1 else key[0], timestamp)
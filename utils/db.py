@@ -1,38 +1,662 @@
+import asyncio
+import json
 import sqlite3
-import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 
 DB_PATH = "data/users.db"
+LEGACY_USERS_PATH = Path("data/users")
+LEGACY_REPORTS_PATH = Path("data/reports.json")
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id INTEGER PRIMARY KEY,
+    mod_channel_id INTEGER,
+    pub_channel_id INTEGER,
+    leaderboard_channel_id INTEGER,
+    leaderboard_time TEXT
+);
+
+-- Опыт хранится отдельно для каждого сервера. WITHOUT ROWID делает первичный ключ
+-- кластерным, поэтому строки одного сервера лежат на диске подряд и запросы
+-- таблицы лидеров читают только страницы своего сервера.
+CREATE TABLE IF NOT EXISTS leveling (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    text_xp INTEGER NOT NULL DEFAULT 0,
+    voice_xp INTEGER NOT NULL DEFAULT 0,
+    total_xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 1,
+    voice_time REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+
+-- Старые профили без сервера: переходят на сервер, где участник проявит активность первым
+CREATE TABLE IF NOT EXISTS leveling_legacy (
+    user_id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    text_xp INTEGER NOT NULL DEFAULT 0,
+    voice_xp INTEGER NOT NULL DEFAULT 0,
+    total_xp INTEGER NOT NULL DEFAULT 0,
+    level INTEGER NOT NULL DEFAULT 1,
+    voice_time REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS warns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER,
+    user_id INTEGER NOT NULL,
+    moderator_id INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_warns_user ON warns (user_id, id);
+
+-- id — псевдоним rowid: новая жалоба получает следующий номер атомарно при вставке
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    target_id INTEGER NOT NULL,
+    reporter_id INTEGER,
+    reason TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    moderator_id INTEGER,
+    action_taken TEXT,
+    created_at TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_reports_target;
+CREATE INDEX IF NOT EXISTS idx_reports_guild_target ON reports (guild_id, target_id, id);
+CREATE INDEX IF NOT EXISTS idx_reports_guild_status ON reports (guild_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_reports_reporter ON reports (reporter_id, target_id);
+
+CREATE TABLE IF NOT EXISTS surveys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    age TEXT NOT NULL,
+    creativity TEXT NOT NULL,
+    about TEXT NOT NULL,
+    socials TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    rejection_reason TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_surveys_user ON surveys (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_surveys_guild_status ON surveys (guild_id, status, id);
+
+-- Отложенные снятия наказаний. Индекс по expires_at работает как куча:
+-- ближайшие сроки читаются с начала индекса, сколько бы таймеров ни ждало
+CREATE TABLE IF NOT EXISTS timers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    reason TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (guild_id, user_id, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_timers_due ON timers (expires_at);
+'''
+
+# Запросы держим константами: sqlite3 кэширует скомпилированные выражения
+# по тексту SQL, поэтому повторные вызовы не разбирают запрос заново.
+SQL_GET_META = "SELECT value FROM meta WHERE key = ?"
+SQL_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+SQL_GET_LEVELING = "SELECT * FROM leveling WHERE guild_id = ? AND user_id = ?"
+SQL_APPLY_XP = '''
+INSERT INTO leveling (guild_id, user_id, text_xp, voice_xp, total_xp, level, voice_time)
+VALUES (:guild_id, :user_id, :text_xp, :voice_xp, :text_xp + :voice_xp, COALESCE(:level, 1), :voice_time)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET
+    text_xp = text_xp + excluded.text_xp,
+    voice_xp = voice_xp + excluded.voice_xp,
+    total_xp = total_xp + excluded.total_xp,
+    level = COALESCE(:level, level),
+    voice_time = voice_time + excluded.voice_time
+'''
+SQL_SAVE_LEVELING = '''
+INSERT INTO leveling (guild_id, user_id, text_xp, voice_xp, total_xp, level, voice_time)
+VALUES (:guild_id, :user_id, :text_xp, :voice_xp, :total_xp, :level, :voice_time)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET
+    text_xp = excluded.text_xp,
+    voice_xp = excluded.voice_xp,
+    total_xp = excluded.total_xp,
+    level = excluded.level,
+    voice_time = excluded.voice_time
+'''
+SQL_GUILD_SCORES = "SELECT user_id, total_xp FROM leveling WHERE guild_id = ?"
+SQL_GUILD_LEVELS = "SELECT user_id, total_xp, level FROM leveling WHERE guild_id = ?"
+SQL_SET_LEVEL = "UPDATE leveling SET level = ? WHERE guild_id = ? AND user_id = ?"
+SQL_LEVELING_GUILDS = "SELECT DISTINCT guild_id FROM leveling"
+SQL_GET_LEGACY_LEVELING = "SELECT * FROM leveling_legacy WHERE user_id = ?"
+SQL_DELETE_LEGACY_LEVELING = "DELETE FROM leveling_legacy WHERE user_id = ?"
+SQL_SAVE_LEGACY_LEVELING = '''
+INSERT OR REPLACE INTO leveling_legacy (user_id, guild_id, text_xp, voice_xp, total_xp, level, voice_time)
+VALUES (:user_id, :guild_id, :text_xp, :voice_xp, :total_xp, :level, :voice_time)
+'''
+
+SQL_ADD_WARN = "INSERT INTO warns (guild_id, user_id, moderator_id, reason, created_at) VALUES (?, ?, ?, ?, ?)"
+# Записи, перенесённые из JSON-профилей, не привязаны к серверу (guild_id IS NULL)
+SQL_GET_WARNS = "SELECT * FROM warns WHERE (guild_id = ? OR guild_id IS NULL) AND user_id = ? ORDER BY id"
+SQL_COUNT_WARNS = "SELECT COUNT(*) FROM warns WHERE (guild_id = ? OR guild_id IS NULL) AND user_id = ?"
+SQL_DELETE_WARN = "DELETE FROM warns WHERE id = ?"
+
+SQL_ADD_REPORT = '''
+INSERT INTO reports (guild_id, target_id, reporter_id, reason, status, created_at)
+VALUES (?, ?, ?, ?, 'pending', ?)
+'''
+SQL_GET_REPORT = "SELECT * FROM reports WHERE id = ?"
+# Решение принимается один раз: второй модератор получит отказ
+SQL_UPDATE_REPORT = "UPDATE reports SET status = ?, moderator_id = ?, action_taken = ? WHERE id = ? AND status = 'pending'"
+# Одна жалоба могла храниться и в reports.json, и в профиле участника: копии сливаются
+SQL_IMPORT_REPORT = '''
+INSERT INTO reports (id, guild_id, target_id, reporter_id, reason, status, moderator_id, action_taken, created_at)
+VALUES (:id, :guild_id, :target_id, :reporter_id, :reason, :status, :moderator_id, :action_taken, :created_at)
+ON CONFLICT (id) DO UPDATE SET
+    guild_id = COALESCE(guild_id, excluded.guild_id),
+    reporter_id = COALESCE(reporter_id, excluded.reporter_id),
+    reason = COALESCE(reason, excluded.reason)
+'''
+SQL_HAS_PENDING_REPORT = '''
+SELECT 1 FROM reports WHERE reporter_id = ? AND target_id = ? AND guild_id = ? AND status = 'pending'
+'''
+SQL_TARGET_REPORTS = '''
+SELECT * FROM reports WHERE guild_id = ? AND target_id = ?
+ORDER BY id DESC LIMIT ? OFFSET ?
+'''
+SQL_TARGET_REPORT_STATS = '''
+SELECT status, COUNT(*) AS count FROM reports
+WHERE guild_id = ? AND target_id = ?
+GROUP BY status
+'''
+SQL_STATUS_REPORTS = '''
+SELECT * FROM reports WHERE guild_id = ? AND status = ?
+ORDER BY id DESC LIMIT ? OFFSET ?
+'''
+SQL_COUNT_STATUS_REPORTS = "SELECT COUNT(*) FROM reports WHERE guild_id = ? AND status = ?"
+# Жалобы из JSON-профилей сохранены без сервера; их забирает единственный сервер, где они были
+SQL_REPORT_GUILDS = "SELECT DISTINCT guild_id FROM reports WHERE guild_id IS NOT NULL LIMIT 2"
+SQL_CLAIM_REPORTS = "UPDATE reports SET guild_id = ? WHERE guild_id IS NULL"
+
+SQL_ADD_SURVEY = '''
+INSERT INTO surveys (guild_id, user_id, name, age, creativity, about, socials, status, created_at)
+VALUES (:guild_id, :user_id, :name, :age, :creativity, :about, :socials, :status, :created_at)
+'''
+SQL_GET_SURVEY = "SELECT * FROM surveys WHERE id = ?"
+SQL_CURRENT_SURVEY = "SELECT * FROM surveys WHERE user_id = ? ORDER BY id DESC LIMIT 1"
+SQL_SURVEY_STATE = "SELECT guild_id, status FROM surveys WHERE id = ?"
+# Рассмотреть можно только анкету на модерации: второй модератор получит отказ
+SQL_UPDATE_SURVEY = "UPDATE surveys SET status = ?, rejection_reason = ? WHERE id = ? AND status = 'pending'"
+SQL_STATUS_SURVEYS = "SELECT * FROM surveys WHERE guild_id = ? AND status = ? ORDER BY id LIMIT ? OFFSET ?"
+SQL_COUNT_STATUS_SURVEYS = "SELECT COUNT(*) FROM surveys WHERE guild_id = ? AND status = ?"
+SQL_CLAIM_SURVEYS = "UPDATE surveys SET guild_id = ? WHERE guild_id IS NULL"
+
+SQL_ADD_TIMER = '''
+INSERT INTO timers (guild_id, user_id, kind, expires_at, reason) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, user_id, kind) DO UPDATE SET
+    expires_at = excluded.expires_at,
+    reason = excluded.reason,
+    attempts = 0
+'''
+SQL_DELETE_TIMER = "DELETE FROM timers WHERE guild_id = ? AND user_id = ? AND kind = ?"
+# Срок сверяется, чтобы не удалить и не сдвинуть таймер, который переставили, пока шла обработка
+SQL_FINISH_TIMER = "DELETE FROM timers WHERE id = ? AND expires_at = ?"
+SQL_POSTPONE_TIMER = "UPDATE timers SET expires_at = ?, attempts = attempts + 1 WHERE id = ? AND expires_at = ?"
+# Список видов передаётся JSON-массивом, чтобы текст запроса не зависел от их числа
+SQL_DUE_TIMERS = '''
+SELECT * FROM timers
+WHERE expires_at <= ? AND kind IN (SELECT value FROM json_each(?))
+ORDER BY expires_at LIMIT ?
+'''
+SQL_NEXT_TIMER = "SELECT MIN(expires_at) FROM timers WHERE kind IN (SELECT value FROM json_each(?))"
+
+
+class Database:
+    """Единое хранилище бота: SQLite в режиме WAL с выделенным потоком ввода-вывода.
+
+    Соединение создаётся и используется только в одном рабочем потоке,
+    поэтому цикл событий никогда не ждёт диск, а запросы не гоняются друг с другом.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-io")
+        self._conn = None
+        self._survey_counts = {}  # (guild_id, status) -> число анкет
+
+    def _connect(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn = conn
+        self._migrate_global_leveling()
+        conn.executescript(SCHEMA)
+        self._add_timer_attempts()
+        self._distribute_legacy_leveling()
+        self._migrate_json_profiles()
+        self._migrate_json_reports()
+        self._backfill_report_guilds()
+
+    def open(self):
+        """Открывает базу и создаёт таблицы (блокирует только при запуске)"""
+        if self._conn is None:
+            self._executor.submit(self._connect).result()
+
+    async def close(self):
+        """Закрывает соединение и останавливает поток ввода-вывода"""
+        if self._conn is not None:
+            await self.run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+    async def run(self, func, *args):
+        """Выполняет функцию в потоке базы данных"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _in_transaction(self, func, *args):
+        with self._conn:
+            return func(self._conn, *args)
+
+    async def transaction(self, func, *args):
+        """Выполняет func(conn, *args) в одной транзакции"""
+        return await self.run(self._in_transaction, func, *args)
+
+    async def execute(self, sql, params=()):
+        """Выполняет запрос на изменение и возвращает lastrowid"""
+        return await self.transaction(lambda conn: conn.execute(sql, params).lastrowid)
+
+    async def executemany(self, sql, seq_of_params):
+        """Выполняет пакет изменений одной транзакцией"""
+        return await self.transaction(lambda conn: conn.executemany(sql, seq_of_params).rowcount)
+
+    async def fetchone(self, sql, params=()):
+        row = await self.run(lambda: self._conn.execute(sql, params).fetchone())
+        return dict(row) if row else None
+
+    async def fetchall(self, sql, params=()):
+        rows = await self.run(lambda: self._conn.execute(sql, params).fetchall())
+        return [dict(row) for row in rows]
+
+    async def fetchval(self, sql, params=()):
+        row = await self.run(lambda: self._conn.execute(sql, params).fetchone())
+        return row[0] if row else None
+
+    async def get_meta(self, key):
+        """Возвращает служебное значение базы"""
+        return await self.fetchval(SQL_GET_META, (key,))
+
+    async def set_meta(self, key, value):
+        await self.execute(SQL_SET_META, (key, value))
+
+    # --- Уровни ---
+
+    async def get_leveling(self, guild_id, user_id):
+        """Возвращает данные уровня пользователя на сервере или None.
+
+        Если на сервере записи нет, но остался старый профиль без сервера,
+        он переносится на этот сервер.
+        """
+        def load(conn):
+            row = conn.execute(SQL_GET_LEVELING, (guild_id, user_id)).fetchone()
+            if row is None and (legacy := conn.execute(SQL_GET_LEGACY_LEVELING, (user_id,)).fetchone()):
+                conn.execute(SQL_SAVE_LEVELING, {**dict(legacy), "guild_id": guild_id})
+                conn.execute(SQL_DELETE_LEGACY_LEVELING, (user_id,))
+                row = conn.execute(SQL_GET_LEVELING, (guild_id, user_id)).fetchone()
+            return dict(row) if row else None
+
+        return await self.transaction(load)
+
+    async def apply_xp_batch(self, rows, ledger_lsn=None):
+        """Прибавляет накопленный опыт пачкой в одной транзакции.
+
+        Каждая строка: user_id, guild_id, text_xp, voice_xp, voice_time и level
+        (None, если уровень пересчитывать не нужно). ledger_lsn — номер последней
+        записи журнала опыта, вошедшей в пачку; он сохраняется в той же транзакции.
+        """
+        def apply(conn):
+            conn.executemany(SQL_APPLY_XP, rows)
+            if ledger_lsn is not None:
+                conn.execute(SQL_SET_META, ("xp_ledger_lsn", str(ledger_lsn)))
+
+        if rows:
+            await self.transaction(apply)
+
+    async def save_leveling(self, guild_id, user_id, data):
+        """Полностью перезаписывает данные уровня пользователя на сервере"""
+        params = {
+            "text_xp": 0, "voice_xp": 0, "total_xp": 0, "level": 1, "voice_time": 0,
+            **data,
+            "guild_id": guild_id,
+            "user_id": user_id
+        }
+        await self.execute(SQL_SAVE_LEVELING, params)
+
+    async def get_leveling_many(self, guild_id, user_ids):
+        """Возвращает данные уровня нескольких пользователей сервера: {user_id: запись}"""
+        if not user_ids:
+            return {}
+        placeholders = ", ".join("?" * len(user_ids))
+        rows = await self.fetchall(
+            f"SELECT * FROM leveling WHERE guild_id = ? AND user_id IN ({placeholders})",
+            (guild_id, *user_ids)
+        )
+        return {row["user_id"]: row for row in rows}
+
+    async def get_guild_scores(self, guild_id):
+        """Возвращает пары (user_id, total_xp) для построения таблицы лидеров сервера"""
+        rows = await self.fetchall(SQL_GUILD_SCORES, (guild_id,))
+        return [(row["user_id"], row["total_xp"]) for row in rows]
+
+    async def get_leveling_guilds(self):
+        """Возвращает ID серверов, на которых есть данные уровней"""
+        rows = await self.fetchall(SQL_LEVELING_GUILDS)
+        return [row["guild_id"] for row in rows]
+
+    async def recompute_levels(self, guild_id, curve):
+        """Пересчитывает уровни всех участников сервера одним проходом.
+
+        Возвращает количество участников, у которых уровень изменился.
+        """
+        def recompute(conn):
+            rows = conn.execute(SQL_GUILD_LEVELS, (guild_id,)).fetchall()
+            levels = curve.levels_for([row["total_xp"] for row in rows])
+            changed = [
+                (level, guild_id, row["user_id"])
+                for row, level in zip(rows, levels) if level != row["level"]
+            ]
+            conn.executemany(SQL_SET_LEVEL, changed)
+            return len(changed)
+
+        return await self.transaction(recompute)
+
+    # --- Предупреждения ---
+
+    async def add_warn(self, guild_id, user_id, moderator_id, reason):
+        """Добавляет предупреждение и возвращает их общее количество"""
+        created_at = datetime.now().isoformat()
+
+        def apply(conn):
+            conn.execute(SQL_ADD_WARN, (guild_id, user_id, moderator_id, reason, created_at))
+            return conn.execute(SQL_COUNT_WARNS, (guild_id, user_id)).fetchone()[0]
+
+        return await self.transaction(apply)
+
+    async def get_warns(self, guild_id, user_id):
+        return await self.fetchall(SQL_GET_WARNS, (guild_id, user_id))
+
+    async def delete_warn(self, warn_id):
+        await self.execute(SQL_DELETE_WARN, (warn_id,))
+
+    # --- Жалобы ---
+
+    async def add_report(self, guild_id, target_id, reporter_id, reason):
+        """Сохраняет новую жалобу и возвращает её номер"""
+        return await self.execute(SQL_ADD_REPORT, (
+            guild_id, target_id, reporter_id, reason, datetime.now().isoformat()
+        ))
+
+    async def get_report(self, report_id):
+        return await self.fetchone(SQL_GET_REPORT, (report_id,))
+
+    async def update_report(self, report_id, status, moderator_id, action_taken):
+        """Сохраняет решение по жалобе на рассмотрении. False — жалобы нет или её уже рассмотрели"""
+        def update(conn):
+            return conn.execute(SQL_UPDATE_REPORT, (status, moderator_id, action_taken, report_id)).rowcount > 0
+
+        return await self.transaction(update)
+
+    async def has_pending_report(self, guild_id, reporter_id, target_id):
+        """Есть ли у отправителя нерассмотренная жалоба на этого участника"""
+        return await self.fetchval(SQL_HAS_PENDING_REPORT, (reporter_id, target_id, guild_id)) is not None
+
+    async def get_reports(self, guild_id, target_id, limit=5, offset=0):
+        """Страница жалоб на участника, новые первыми"""
+        return await self.fetchall(SQL_TARGET_REPORTS, (guild_id, target_id, limit, offset))
+
+    async def get_report_stats(self, guild_id, target_id):
+        """Количество жалоб на участника по статусам: {status: count}"""
+        rows = await self.fetchall(SQL_TARGET_REPORT_STATS, (guild_id, target_id))
+        return {row["status"]: row["count"] for row in rows}
+
+    async def get_reports_by_status(self, guild_id, status, limit=5, offset=0):
+        """Страница жалоб сервера с указанным статусом, новые первыми"""
+        return await self.fetchall(SQL_STATUS_REPORTS, (guild_id, status, limit, offset))
+
+    async def count_reports_by_status(self, guild_id, status):
+        return await self.fetchval(SQL_COUNT_STATUS_REPORTS, (guild_id, status))
+
+    async def claim_legacy_reports(self, guild_id):
+        """Привязывает к серверу жалобы, перенесённые из JSON без guild_id"""
+        await self.execute(SQL_CLAIM_REPORTS, (guild_id,))
+
+    # --- Анкеты ---
+
+    async def add_survey(self, guild_id, user_id, survey):
+        """Сохраняет новую анкету и возвращает её ID"""
+        row = {
+            "status": "pending",
+            "created_at": datetime.now().isoformat(),
+            **survey,
+            "guild_id": guild_id,
+            "user_id": user_id
+        }
+        survey_id = await self.execute(SQL_ADD_SURVEY, row)
+        self._adjust_survey_count(guild_id, row["status"], 1)
+        return survey_id
+
+    async def get_survey(self, survey_id):
+        return await self.fetchone(SQL_GET_SURVEY, (survey_id,))
+
+    async def get_current_survey(self, user_id):
+        """Возвращает последнюю анкету пользователя"""
+        return await self.fetchone(SQL_CURRENT_SURVEY, (user_id,))
+
+    async def update_survey_status(self, survey_id, status, rejection_reason=None):
+        """Меняет статус анкеты на модерации. False — анкету уже рассмотрели"""
+        def update(conn):
+            state = conn.execute(SQL_SURVEY_STATE, (survey_id,)).fetchone()
+            if conn.execute(SQL_UPDATE_SURVEY, (status, rejection_reason, survey_id)).rowcount == 0:
+                return None
+            return state
+
+        # Счётчики живут в цикле событий, поэтому правятся после транзакции, а не в потоке базы
+        state = await self.transaction(update)
+        if state is None:
+            return False
+        self._adjust_survey_count(state["guild_id"], "pending", -1)
+        self._adjust_survey_count(state["guild_id"], status, 1)
+        return True
+
+    async def get_surveys_by_status(self, guild_id, status, limit=5, offset=0):
+        """Страница анкет сервера с указанным статусом, старые первыми"""
+        return await self.fetchall(SQL_STATUS_SURVEYS, (guild_id, status, limit, offset))
+
+    async def count_surveys_by_status(self, guild_id, status):
+        """Число анкет со статусом; после первого запроса берётся из памяти"""
+        key = (guild_id, status)
+        if key not in self._survey_counts:
+            self._survey_counts[key] = await self.fetchval(SQL_COUNT_STATUS_SURVEYS, key)
+        return self._survey_counts[key]
+
+    def _adjust_survey_count(self, guild_id, status, delta):
+        # Счётчик правится, только если уже загружен: иначе его посчитает первый запрос
+        key = (guild_id, status)
+        if key in self._survey_counts:
+            self._survey_counts[key] += delta
+
+    async def claim_legacy_surveys(self, guild_id):
+        """Привязывает к серверу анкеты, перенесённые из JSON без guild_id"""
+        await self.execute(SQL_CLAIM_SURVEYS, (guild_id,))
+        self._survey_counts.clear()
+
+    # --- Таймеры наказаний ---
+
+    async def add_timer(self, guild_id, user_id, kind, expires_at, reason=None):
+        """Ставит (или переносит) таймер вида kind для участника"""
+        await self.execute(SQL_ADD_TIMER, (guild_id, user_id, kind, expires_at, reason))
+
+    async def delete_timer(self, guild_id, user_id, kind):
+        await self.execute(SQL_DELETE_TIMER, (guild_id, user_id, kind))
+
+    async def get_due_timers(self, now, kinds, limit):
+        """Возвращает до limit истёкших таймеров указанных видов, ранние первыми"""
+        return await self.fetchall(SQL_DUE_TIMERS, (now, json.dumps(list(kinds)), limit))
+
+    async def next_timer_at(self, kinds):
+        """Время ближайшего таймера указанных видов или None"""
+        return await self.fetchval(SQL_NEXT_TIMER, (json.dumps(list(kinds)),))
+
+    async def finish_timers(self, done, postponed):
+        """Удаляет отработавшие таймеры и переносит неудачные одной транзакцией.
+
+        done — пары (id, срок), postponed — тройки (новое_время, id, срок).
+        Таймер, срок которого успели изменить, остаётся как есть.
+        """
+        def finish(conn):
+            conn.executemany(SQL_FINISH_TIMER, done)
+            conn.executemany(SQL_POSTPONE_TIMER, postponed)
+
+        await self.transaction(finish)
+
+    # --- Перенос старых форматов ---
+
+    def _migrate_global_leveling(self):
+        """Разносит общую таблицу leveling (ключ user_id) по серверам"""
+        columns = self._conn.execute("PRAGMA table_info(leveling)").fetchall()
+        if columns and sum(1 for column in columns if column["pk"]) == 1:
+            self._conn.execute("ALTER TABLE leveling RENAME TO leveling_legacy")
+            self._conn.execute("DROP INDEX IF EXISTS idx_leveling_guild")
+            self._conn.commit()
+            print("✅ Общая таблица опыта перенесена в leveling_legacy")
+
+    def _add_timer_attempts(self):
+        """Добавляет счётчик попыток в таблицу timers, созданную до его появления"""
+        columns = self._conn.execute("PRAGMA table_info(timers)").fetchall()
+        if not any(column["name"] == "attempts" for column in columns):
+            self._conn.execute("ALTER TABLE timers ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            self._conn.commit()
+
+    def _distribute_legacy_leveling(self):
+        """Переносит старые профили с известным сервером в серверную таблицу"""
+        with self._conn as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO leveling (guild_id, user_id, text_xp, voice_xp, total_xp, level, voice_time) "
+                "SELECT guild_id, user_id, text_xp, voice_xp, total_xp, level, voice_time "
+                "FROM leveling_legacy WHERE guild_id IS NOT NULL"
+            )
+            conn.execute("DELETE FROM leveling_legacy WHERE guild_id IS NOT NULL")
+
+    def _migrate_json_profiles(self):
+        """Однократно переносит data/users/<id>.json в таблицы базы"""
+        if not LEGACY_USERS_PATH.is_dir():
+            return
+
+        with self._conn as conn:
+            for file in LEGACY_USERS_PATH.glob("*.json"):
+                try:
+                    with open(file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    continue
+
+                user_id = int(data.get("user_id", file.stem))
+
+                if leveling := data.get("leveling"):
+                    conn.execute(SQL_SAVE_LEGACY_LEVELING, {
+                        "text_xp": 0, "voice_xp": 0, "total_xp": 0, "level": 1, "voice_time": 0,
+                        **leveling,
+                        "user_id": user_id,
+                        "guild_id": None
+                    })
+
+                moderation = data.get("moderation", {})
+                for warn in moderation.get("warns", []):
+                    conn.execute(SQL_ADD_WARN, (
+                        None, user_id, warn["moderator_id"], warn["reason"], warn["timestamp"]
+                    ))
+                for report in moderation.get("reports", []):
+                    conn.execute(SQL_IMPORT_REPORT, {
+                        "id": report["report_id"],
+                        "guild_id": None,
+                        "target_id": user_id,
+                        "reporter_id": None,
+                        "reason": None,
+                        "status": report["status"],
+                        "moderator_id": report.get("moderator_id"),
+                        "action_taken": report.get("action"),
+                        "created_at": report["timestamp"]
+                    })
+
+                # "current" хранился отдельной копией последней анкеты со свежим статусом
+                surveys = data.get("surveys", {})
+                history = list(surveys.get("history", []))
+                if surveys.get("current"):
+                    history[-1:] = [surveys["current"]]
+                for survey in history:
+                    conn.execute(SQL_ADD_SURVEY, {
+                        "guild_id": None,
+                        "user_id": user_id,
+                        "name": survey["name"],
+                        "age": survey["age"],
+                        "creativity": survey.get("creativity", ""),
+                        "about": survey["about"],
+                        "socials": survey.get("socials"),
+                        "status": survey.get("status", "pending"),
+                        "created_at": survey.get("timestamp", datetime.now().isoformat())
+                    })
+
+        LEGACY_USERS_PATH.rename(LEGACY_USERS_PATH.with_name("users.migrated"))
+        print(f"✅ Профили из {LEGACY_USERS_PATH} перенесены в {self.path}")
+
+    def _migrate_json_reports(self):
+        """Однократно переносит data/reports.json в таблицу reports"""
+        if not LEGACY_REPORTS_PATH.is_file():
+            return
+
+        try:
+            with open(LEGACY_REPORTS_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+
+        with self._conn as conn:
+            for report in data.get("reports", {}).values():
+                conn.execute(SQL_IMPORT_REPORT, {
+                    "reporter_id": None,
+                    "reason": None,
+                    "moderator_id": None,
+                    "action_taken": None,
+                    **report
+                })
+
+        LEGACY_REPORTS_PATH.rename(LEGACY_REPORTS_PATH.with_suffix(".json.migrated"))
+        print(f"✅ Жалобы из {LEGACY_REPORTS_PATH} перенесены в {self.path}")
+
+    def _backfill_report_guilds(self):
+        """Проставляет сервер жалобам без guild_id, если известен единственный сервер.
+
+        Иначе они остаются без сервера до claim_legacy_reports при запуске бота,
+        а запросы по серверу их не видят и читают страницы прямо из индекса.
+        """
+        guilds = self._conn.execute(SQL_REPORT_GUILDS).fetchall()
+        if len(guilds) == 1:
+            with self._conn as conn:
+                conn.execute(SQL_CLAIM_REPORTS, (guilds[0]["guild_id"],))
+
+
+db = Database()
+
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY,
-        guild_id INTEGER,
-        xp INTEGER DEFAULT 0,
-        level INTEGER DEFAULT 1,
-        text_xp INTEGER DEFAULT 0,
-        voice_xp INTEGER DEFAULT 0,
-        voice_time INTEGER DEFAULT 0,
-        last_update TEXT,
-        name TEXT,
-        age TEXT,
-        creative_fields TEXT,
-        about TEXT,
-        socials TEXT,
-        FOREIGN KEY (guild_id) REFERENCES guilds(guild_id)
-    )''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS guilds (
-        guild_id INTEGER PRIMARY KEY,
-        mod_channel_id INTEGER,
-        pub_channel_id INTEGER,
-        leaderboard_channel_id INTEGER,
-        leaderboard_time TEXT
-    )''')
-    
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    db.open()
@@ -0,0 +1,145 @@
+import time
+from collections import Counter, deque
+
+WAVE_REASON = "рассылка одинаковых сообщений"
+
+
+class Entry:
+    """Сообщение в окне детектора"""
+
+    __slots__ = ("time", "user_id", "digest", "channel_id", "message_id", "mentions", "removed")
+
+    def __init__(self, now, user_id, digest, channel_id, message_id, mentions):
+        self.time = now
+        self.user_id = user_id
+        self.digest = digest
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.mentions = mentions
+        self.removed = False
+
+
+class GuildWindow:
+    """Скользящее окно последних сообщений одного сервера со счётчиками"""
+
+    __slots__ = ("entries", "by_user", "messages", "duplicates", "mentions", "authors")
+
+    def __init__(self):
+        self.entries = deque()        # Entry в порядке поступления, вынутые помечены removed
+        self.by_user = {}             # user_id -> deque его Entry
+        self.messages = Counter()     # user_id -> сообщений в окне
+        self.duplicates = Counter()   # (user_id, хэш) -> одинаковых сообщений в окне
+        self.mentions = Counter()     # user_id -> упоминаний в окне
+        self.authors = {}             # хэш -> Counter(user_id -> сообщений с этим текстом)
+
+    def push(self, entry):
+        self.entries.append(entry)
+        self.by_user.setdefault(entry.user_id, deque()).append(entry)
+        self.messages[entry.user_id] += 1
+        self.mentions[entry.user_id] += entry.mentions
+        if entry.digest is not None:
+            self.duplicates[entry.user_id, entry.digest] += 1
+            self.authors.setdefault(entry.digest, Counter())[entry.user_id] += 1
+
+    def pop(self):
+        """Вытесняет самое старое сообщение (уже вынутые просто пропускаются)"""
+        entry = self.entries.popleft()
+        if entry.removed:
+            return
+        user_entries = self.by_user[entry.user_id]
+        user_entries.popleft()
+        if not user_entries:
+            del self.by_user[entry.user_id]
+        self._forget(entry)
+
+    def take_user(self, user_id):
+        """Вынимает сообщения участника за время, пропорциональное их числу"""
+        taken = self.by_user.pop(user_id, ())
+        for entry in taken:
+            entry.removed = True
+            self._forget(entry)
+        return taken
+
+    def _forget(self, entry):
+        self._decrement(self.messages, entry.user_id, 1)
+        self._decrement(self.mentions, entry.user_id, entry.mentions)
+        if entry.digest is not None:
+            self._decrement(self.duplicates, (entry.user_id, entry.digest), 1)
+            authors = self.authors[entry.digest]
+            self._decrement(authors, entry.user_id, 1)
+            if not authors:
+                del self.authors[entry.digest]
+
+    @staticmethod
+    def _decrement(counter, key, amount):
+        counter[key] -= amount
+        if counter[key] <= 0:
+            del counter[key]
+
+
+class FloodDetector:
+    """Детектор флуда: одинаковые сообщения, частые сообщения и массовые упоминания.
+
+    На каждый сервер хранится окно последних сообщений за window секунд
+    (не больше max_entries), а к нему — счётчики по участнику и по тексту
+    для всего сервера. Сообщение добавляется и старые вытесняются за O(1)
+    в среднем, поэтому проверка не замедляет обработку сообщений. Текст
+    сравнивается по хэшу; одинаковый текст от max_authors разных участников
+    считается волной спама, даже если каждый написал его один раз. Короткие
+    реплики («привет», «+») в волну не засчитываются: их пишут все.
+    """
+
+    def __init__(self, window=15, max_entries=1000, max_duplicates=4, max_messages=10,
+                 max_mentions=8, max_authors=5, min_wave_length=20, clock=time.monotonic):
+        self.window = window
+        self.max_entries = max_entries
+        self.max_duplicates = max_duplicates
+        self.max_messages = max_messages
+        self.max_mentions = max_mentions
+        self.max_authors = max_authors
+        self.min_wave_length = min_wave_length
+        self.clock = clock
+        self._guilds = {}
+
+    @staticmethod
+    def digest(content):
+        return hash(" ".join(content.lower().split())) if content else None
+
+    def check(self, guild_id, user_id, channel_id, message_id, content, mentions=0):
+        """Учитывает сообщение; возвращает причину, если участник флудит, иначе None"""
+        now = self.clock()
+        window = self._guilds.setdefault(guild_id, GuildWindow())
+        while window.entries and (now - window.entries[0].time > self.window or len(window.entries) >= self.max_entries):
+            window.pop()
+
+        digest = self.digest(content)
+        window.push(Entry(now, user_id, digest, channel_id, message_id, mentions))
+
+        if digest is not None:
+            if window.duplicates[user_id, digest] >= self.max_duplicates:
+                return "одинаковые сообщения"
+            if len(content) >= self.min_wave_length and len(window.authors[digest]) >= self.max_authors:
+                return WAVE_REASON
+        if window.messages[user_id] >= self.max_messages:
+            return "слишком частые сообщения"
+        if window.mentions[user_id] >= self.max_mentions:
+            return "массовые упоминания"
+        return None
+
+    def authors_of(self, guild_id, content):
+        """Участники, написавшие этот текст в пределах окна"""
+        window = self._guilds.get(guild_id)
+        digest = self.digest(content)
+        if window is None or digest not in window.authors:
+            return []
+        return list(window.authors[digest])
+
+    def take_messages(self, guild_id, user_id):
+        """Забирает сообщения участника из окна: {channel_id: [message_id, ...]}"""
+        window = self._guilds.get(guild_id)
+        if window is None:
+            return {}
+        found = {}
+        for entry in window.take_user(user_id):
+            found.setdefault(entry.channel_id, []).append(entry.message_id)
+        return found
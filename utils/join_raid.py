@@ -0,0 +1,45 @@
+import time
+from collections import deque
+
+
+class JoinRaidTracker:
+    """Частота входов на сервер в скользящем окне.
+
+    Режим рейда включается, когда за window секунд зашло threshold участников,
+    и выключается, только когда входов стало вдвое меньше порога, чтобы режим
+    не переключался на каждом входе у самой границы.
+    """
+
+    def __init__(self, window=60, threshold=10, clock=time.monotonic):
+        self.window = window
+        self.threshold = threshold
+        self.clock = clock
+        self._joins = {}
+        self._raids = set()
+
+    def _count(self, guild_id, now):
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            return 0
+        while joins and now - joins[0] > self.window:
+            joins.popleft()
+        if not joins:
+            del self._joins[guild_id]
+            return 0
+        return len(joins)
+
+    def record(self, guild_id):
+        """Учитывает вход; возвращает True, если сервер сейчас в режиме рейда"""
+        now = self.clock()
+        self._count(guild_id, now)
+        joins = self._joins.setdefault(guild_id, deque())
+        joins.append(now)
+        if len(joins) >= self.threshold:
+            self._raids.add(guild_id)
+        return self.in_raid(guild_id)
+
+    def in_raid(self, guild_id):
+        """Идёт ли рейд; заодно снимает режим, если входов стало мало"""
+        if guild_id in self._raids and self._count(guild_id, self.clock()) < self.threshold // 2:
+            self._raids.discard(guild_id)
+        return guild_id in self._raids
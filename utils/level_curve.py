@@ -0,0 +1,58 @@
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для массового пересчёта
+    np = None
+
+
+class LevelCurve:
+    """Кривая уровней: чтобы перейти с уровня L, нужно набрать L² · multiplier + base_xp опыта.
+
+    Пороги уровней считаются один раз и хранятся в отсортированном списке,
+    поэтому уровень по опыту находится двоичным поиском, а не перебором.
+    """
+
+    def __init__(self, base_xp=100, multiplier=50, max_level=1000):
+        self.base_xp = base_xp
+        self.multiplier = multiplier
+        self.thresholds = [self.xp_for_level(level) for level in range(1, max_level + 1)]
+        self._array = None
+
+    @property
+    def signature(self):
+        """Строка с параметрами кривой: по ней видно, что уровни пора пересчитать"""
+        return f"{self.base_xp}:{self.multiplier}"
+
+    def xp_for_level(self, level):
+        """Рассчитывает опыт, при котором заканчивается уровень"""
+        return int((level ** 2) * self.multiplier + self.base_xp)
+
+    def _extend(self, xp):
+        while self.thresholds[-1] <= xp:
+            self.thresholds.append(self.xp_for_level(len(self.thresholds) + 1))
+        self._array = None
+
+    def level_for(self, xp):
+        """Определяет уровень на основе опыта"""
+        if xp >= self.thresholds[-1]:
+            self._extend(xp)
+        return bisect_right(self.thresholds, xp) + 1
+
+    def levels_for(self, xp_values):
+        """Определяет уровни для целого списка значений опыта за один проход"""
+        if not len(xp_values):
+            return []
+        if max(xp_values) >= self.thresholds[-1]:
+            self._extend(max(xp_values))
+
+        if np is None:
+            return [bisect_right(self.thresholds, xp) + 1 for xp in xp_values]
+
+        if self._array is None:
+            self._array = np.asarray(self.thresholds, dtype=np.int64)
+        levels = np.searchsorted(self._array, np.asarray(xp_values, dtype=np.int64), side="right") + 1
+        return levels.tolist()
+
+
+curve = LevelCurve(base_xp=100, multiplier=50)
@@ -0,0 +1,64 @@
+import asyncio
+from collections import deque
+
+import discord
+
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+
+class LogDispatcher:
+    """Очередь записей в каналы логов с пакетной отправкой.
+
+    У каждого канала своя очередь и один обработчик: запись ставится в очередь
+    без ожидания, а обработчик собирает до 10 embed-ов (не больше 6000 символов)
+    в одно сообщение. Так в один маршрут Discord (сообщения канала) никогда
+    не уходит больше одного запроса одновременно; ожидание по 429 и повтор
+    запроса берёт на себя HTTP-клиент discord.py.
+    """
+
+    def __init__(self, linger=0.5):
+        self.linger = linger
+        self._queues = {}
+        self._workers = {}
+
+    def send(self, channel, embed):
+        """Ставит embed в очередь канала и сразу возвращается"""
+        self._queues.setdefault(channel.id, deque()).append(embed)
+        if channel.id not in self._workers:
+            self._workers[channel.id] = asyncio.create_task(self._work(channel))
+
+    def _next_batch(self, queue):
+        batch, size = [], 0
+        while queue and len(batch) < MAX_EMBEDS and size + len(queue[0]) <= MAX_EMBED_CHARS:
+            embed = queue.popleft()
+            batch.append(embed)
+            size += len(embed)
+        # Embed больше лимита всё равно уходит один: пусть Discord вернёт ошибку по нему
+        if not batch and queue:
+            batch.append(queue.popleft())
+        return batch
+
+    async def _work(self, channel):
+        queue = self._queues[channel.id]
+        try:
+            while queue:
+                # Короткая пауза, чтобы соседние действия модерации попали в один пакет
+                await asyncio.sleep(self.linger)
+                batch = self._next_batch(queue)
+                try:
+                    await channel.send(embeds=batch)
+                except discord.HTTPException as e:
+                    print(f"Ошибка отправки логов в канал {channel.id}: {e}")
+        finally:
+            self._workers.pop(channel.id, None)
+            if not queue:
+                self._queues.pop(channel.id, None)
+
+    async def flush(self):
+        """Дожидается отправки всего, что уже стоит в очередях"""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+
+log_dispatcher = LogDispatcher()
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class DMNotifier:
+    """Фоновая рассылка личных сообщений участникам.
+
+    Уведомления ставятся в очередь и отправляются несколькими обработчиками,
+    поэтому ответ на команду не ждёт доставки. Временные ошибки (429, 5xx,
+    обрыв соединения) повторяются с растущей паузой. Пользователи, у которых
+    закрыты ЛС, запоминаются на closed_ttl секунд, и им ничего не отправляется.
+    """
+
+    def __init__(self, workers=4, max_retries=3, base_delay=1.0, closed_ttl=6 * 3600, max_closed=10000):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.closed_ttl = closed_ttl
+        self.max_closed = max_closed
+        self._closed = OrderedDict()
+        self._queue = None
+        self._tasks = []
+
+    def is_closed(self, user_id):
+        """Известно ли, что пользователь не принимает ЛС"""
+        expires = self._closed.get(user_id)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._closed[user_id]
+            return False
+        return True
+
+    def _remember_closed(self, user_id):
+        self._closed[user_id] = time.monotonic() + self.closed_ttl
+        self._closed.move_to_end(user_id)
+        while len(self._closed) > self.max_closed:
+            self._closed.popitem(last=False)
+
+    def send(self, user, embed, remember_closed=True):
+        """Ставит уведомление в очередь. Возвращает False, если ЛС пользователя закрыты.
+
+        remember_closed=False — отказ не запоминается: после кика или бана ЛС
+        недоступны из-за отсутствия общего сервера, а не из-за настроек пользователя.
+        """
+        if self.is_closed(user.id):
+            return False
+        if self._queue is None:
+            self._start()
+        self._queue.put_nowait((user, embed, remember_closed))
+        return True
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _deliver(self, user, embed, remember_closed):
+        for attempt in range(self.max_retries):
+            try:
+                await user.send(embed=embed)
+                return
+            except discord.Forbidden:
+                if remember_closed:
+                    self._remember_closed(user.id)
+                return
+            except discord.NotFound:
+                return
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    print(f"Ошибка отправки ЛС {user.id}: {e}")
+                    return
+            except (OSError, asyncio.TimeoutError):
+                pass
+            await asyncio.sleep(self.base_delay * 2 ** attempt)
+        print(f"Не удалось отправить ЛС {user.id} после {self.max_retries} попыток")
+
+    async def _work(self):
+        while True:
+            user, embed, remember_closed = await self._queue.get()
+            try:
+                await self._deliver(user, embed, remember_closed)
+            except Exception as e:
+                print(f"Ошибка отправки ЛС {user.id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def close(self, timeout=10):
+        """Даёт очереди дослаться (не дольше timeout секунд) и останавливает обработчики"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Не отправлено уведомлений: {self._queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+
+
+notifier = DMNotifier()
@@ -0,0 +1,73 @@
+import datetime
+import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+WEEKDAYS = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+
+SLOT_PATTERN = re.compile(r"^(?:(пн|вт|ср|чт|пт|сб|вс)\s+)?(\d{1,2}):(\d{2})$")
+
+
+class Slot:
+    """Время публикации: ежедневно в ЧЧ:ММ или раз в неделю («пт 21:00»)"""
+
+    __slots__ = ("weekday", "hour", "minute")
+
+    def __init__(self, weekday, hour, minute):
+        self.weekday = weekday
+        self.hour = hour
+        self.minute = minute
+
+    @classmethod
+    def parse(cls, text):
+        """Разбирает «21:00», «9:20» или «пт 21:00»; при ошибке — ValueError"""
+        match = SLOT_PATTERN.match(text.strip().lower())
+        if not match:
+            raise ValueError(f"неверное время публикации: {text}")
+        day, hour, minute = match.groups()
+        hour, minute = int(hour), int(minute)
+        if hour > 23 or minute > 59:
+            raise ValueError(f"неверное время публикации: {text}")
+        return cls(WEEKDAYS.index(day) if day else None, hour, minute)
+
+    @property
+    def key(self):
+        """Каноническая запись слота: под ней хранится время последней публикации"""
+        time = f"{self.hour:02d}:{self.minute:02d}"
+        return f"{WEEKDAYS[self.weekday]} {time}" if self.weekday is not None else time
+
+    @property
+    def weekly(self):
+        return self.weekday is not None
+
+    def next_after(self, timestamp, tz=None):
+        """Ближайший момент слота строго позже timestamp (unix-время).
+
+        tz=None — местное время машины. Наивное время переводится в unix-время
+        с учётом перехода на летнее время, как и время с ZoneInfo.
+        """
+        now = datetime.datetime.fromtimestamp(timestamp, tz)
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.weekly:
+            candidate += datetime.timedelta(days=(self.weekday - candidate.weekday()) % 7)
+        step = datetime.timedelta(days=7 if self.weekly else 1)
+        while candidate.timestamp() <= timestamp:
+            candidate += step
+        return candidate.timestamp()
+
+
+def parse_slots(text):
+    """Разбирает несколько слотов через запятую"""
+    slots = [Slot.parse(part) for part in text.split(",") if part.strip()]
+    if not slots:
+        raise ValueError("не указано время публикации")
+    return slots
+
+
+def get_timezone(name):
+    """ZoneInfo по имени («Europe/Moscow»); None — местное время машины"""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"неизвестный часовой пояс: {name}")
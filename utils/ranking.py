@@ -0,0 +1,159 @@
+import asyncio
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+
+class RankIndex:
+    """Таблица лидеров одного сервера: отсортированный массив с поиском через bisect.
+
+    Ключи хранятся как (-total_xp, user_id), поэтому первые элементы массива —
+    самые активные участники, а при равном опыте выше тот, у кого меньше ID.
+    """
+
+    def __init__(self, scores=()):
+        self._scores = dict(scores)
+        self._keys = sorted((-xp, user_id) for user_id, xp in self._scores.items())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id):
+        return user_id in self._scores
+
+    def update(self, user_id, total_xp):
+        """Переставляет участника после изменения опыта"""
+        old_xp = self._scores.get(user_id)
+        if old_xp == total_xp:
+            return
+        if old_xp is not None:
+            del self._keys[bisect_left(self._keys, (-old_xp, user_id))]
+        self._scores[user_id] = total_xp
+        insort(self._keys, (-total_xp, user_id))
+
+    def discard(self, user_id):
+        """Убирает участника из таблицы"""
+        old_xp = self._scores.pop(user_id, None)
+        if old_xp is not None:
+            del self._keys[bisect_left(self._keys, (-old_xp, user_id))]
+
+    def rank(self, user_id):
+        """Возвращает место участника (с единицы) или None"""
+        xp = self._scores.get(user_id)
+        if xp is None:
+            return None
+        return bisect_left(self._keys, (-xp, user_id)) + 1
+
+    def page(self, offset, limit):
+        """Возвращает срез таблицы: список (user_id, total_xp)"""
+        return [(user_id, -neg_xp) for neg_xp, user_id in self._keys[offset:offset + limit]]
+
+
+class PageCache:
+    """LRU-кэш отрисованных страниц таблицы лидеров с поколениями.
+
+    Ключ записи — (guild_id, page, sort). У каждой страницы есть номер поколения:
+    изменение опыта увеличивает его только у страниц, через которые прошёл
+    участник, а появление нового участника сдвигает весь сервер. Запись,
+    сохранённая со старым поколением, считается устаревшей.
+    """
+
+    def __init__(self, per_page=10, max_size=256):
+        self.per_page = per_page
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._guild_generations = {}
+        self._page_generations = {}
+
+    def generation(self, guild_id, page, sort):
+        """Текущее поколение страницы: его нужно запомнить до начала отрисовки"""
+        return (
+            self._guild_generations.get((guild_id, sort), 0),
+            self._page_generations.get((guild_id, page, sort), 0)
+        )
+
+    def get(self, guild_id, page, sort):
+        """Возвращает страницу из кэша или None, если её нет или она устарела"""
+        key = (guild_id, page, sort)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        generation, value = entry
+        if generation != self.generation(guild_id, page, sort):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, guild_id, page, sort, generation, value):
+        """Сохраняет страницу, отрисованную при поколении generation"""
+        if generation != self.generation(guild_id, page, sort):
+            return
+        key = (guild_id, page, sort)
+        self._entries[key] = (generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_ranks(self, guild_id, sort, old_rank, new_rank):
+        """Помечает устаревшими страницы между старым и новым местом участника"""
+        if old_rank is None or new_rank is None:
+            # Участник появился или исчез: сдвигаются все места и общее число участников
+            key = (guild_id, sort)
+            self._guild_generations[key] = self._guild_generations.get(key, 0) + 1
+            return
+
+        first_page = (min(old_rank, new_rank) - 1) // self.per_page + 1
+        last_page = (max(old_rank, new_rank) - 1) // self.per_page + 1
+        for page in range(first_page, last_page + 1):
+            key = (guild_id, page, sort)
+            self._page_generations[key] = self._page_generations.get(key, 0) + 1
+
+
+class Leaderboards:
+    """Реестр таблиц лидеров по серверам с ленивой загрузкой из базы"""
+
+    SORT_XP = "xp"
+
+    def __init__(self, loader, per_page=10):
+        self.loader = loader
+        self.pages = PageCache(per_page)
+        self._indexes = {}
+        self._loading = {}
+        self._pending = {}
+
+    def is_loaded(self, guild_id):
+        return guild_id in self._indexes
+
+    async def get(self, guild_id):
+        """Возвращает таблицу сервера, при первом обращении строит её из базы"""
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            return index
+        # Параллельные запросы ждут одну и ту же загрузку
+        if guild_id not in self._loading:
+            self._pending[guild_id] = {}
+            self._loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+        return await asyncio.shield(self._loading[guild_id])
+
+    async def _load(self, guild_id):
+        try:
+            index = RankIndex(await self.loader(guild_id))
+            # Изменения, пришедшие во время загрузки, накладываем поверх
+            for user_id, total_xp in self._pending[guild_id].items():
+                index.update(user_id, total_xp)
+            self._indexes[guild_id] = index
+            return index
+        finally:
+            self._pending.pop(guild_id, None)
+            self._loading.pop(guild_id, None)
+
+    def update(self, guild_id, user_id, total_xp):
+        """Обновляет позицию участника в таблице сервера"""
+        if guild_id in self._pending:
+            self._pending[guild_id][user_id] = total_xp
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            old_rank = index.rank(user_id)
+            index.update(user_id, total_xp)
+            # Даже без смены места у участника меняются цифры на его странице
+            self.pages.invalidate_ranks(guild_id, self.SORT_XP, old_rank, index.rank(user_id))
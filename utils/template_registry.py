@@ -0,0 +1,134 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+from bisect import bisect_left
+from pathlib import Path
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+TEMPLATES_PACKAGE = "templates"
+MAX_CHOICES = 25  # Предел вариантов автодополнения в Discord
+
+
+class TemplateRegistry:
+    """Шаблоны сообщений из папки templates/.
+
+    Каждый файл импортируется один раз как templates.<имя_файла> и дальше
+    берётся из памяти. Фоновая проверка времени изменения перечитывает
+    изменённые файлы в новый модуль и подменяет старый только после успешной
+    загрузки, подхватывает новые файлы и убирает удалённые. Имя шаблона — константа NAME в файле, иначе имя файла.
+    Автодополнение ищет по отсортированному списку начал слов двоичным
+    поиском, а не перебором всех шаблонов.
+    """
+
+    def __init__(self, path=TEMPLATES_DIR, poll_interval=5):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._modules = {}  # имя файла -> (mtime, модуль)
+        self._by_name = {}  # имя шаблона -> модуль
+        self._index = []    # (начало слова в нижнем регистре, имя шаблона)
+        self._failed = {}   # имя файла -> mtime версии, которая не загрузилась
+        self._task = None
+
+    def get(self, name):
+        """Модуль шаблона по имени или None"""
+        return self._by_name.get(name)
+
+    def names(self):
+        return sorted(self._by_name)
+
+    def complete(self, current):
+        """Имена шаблонов, в которых какое-нибудь слово начинается с current"""
+        prefix = current.strip().lower()
+        found = []
+        for key, name in self._index[bisect_left(self._index, (prefix,)):]:
+            if not key.startswith(prefix) or len(found) == MAX_CHOICES:
+                break
+            if name not in found:
+                found.append(name)
+        return found
+
+    # --- Загрузка ---
+
+    def _scan(self):
+        """{имя файла: mtime} для всех шаблонов в папке"""
+        try:
+            entries = list(os.scandir(self.path))
+        except FileNotFoundError:
+            return {}
+        return {
+            entry.name[:-3]: entry.stat().st_mtime_ns
+            for entry in entries
+            if entry.name.endswith(".py") and not entry.name.startswith("_")
+        }
+
+    def _import(self, stem):
+        module_name = f"{TEMPLATES_PACKAGE}.{stem}"
+        if stem not in self._modules and module_name in sys.modules:
+            # Модуль уже импортирован (например, bot.py для постоянных кнопок)
+            return sys.modules[module_name]
+        # Новая версия исполняется в отдельном модуле: если файл упадёт на середине,
+        # в памяти и sys.modules останется прежняя целая версия
+        spec = importlib.util.spec_from_file_location(module_name, self.path / f"{stem}.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def load(self):
+        """Перечитывает изменённые шаблоны; ошибка в файле оставляет прежнюю версию"""
+        found = self._scan()
+        changed = False
+
+        for stem in set(self._modules) - set(found):
+            del self._modules[stem]
+            sys.modules.pop(f"{TEMPLATES_PACKAGE}.{stem}", None)
+            changed = True
+
+        for stem, mtime in found.items():
+            previous = self._modules.get(stem)
+            if (previous and previous[0] == mtime) or self._failed.get(stem) == mtime:
+                continue
+            try:
+                module = self._import(stem)
+                if not callable(getattr(module, "get_template", None)):
+                    raise AttributeError("нет функции get_template")
+            except Exception as e:
+                # Запоминаем версию файла, чтобы не повторять ошибку при каждой проверке
+                self._failed[stem] = mtime
+                print(f"Ошибка загрузки шаблона {stem}: {type(e).__name__} - {e}")
+                continue
+            self._failed.pop(stem, None)
+            self._modules[stem] = (mtime, module)
+            sys.modules[module.__name__] = module
+            changed = True
+
+        if changed:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._by_name = {
+            getattr(module, "NAME", stem): module
+            for stem, (_, module) in self._modules.items()
+        }
+        self._index = sorted(
+            (name.lower()[start:], name)
+            for name in self._by_name
+            for start in [0] + [i + 1 for i, char in enumerate(name) if char in " _-"]
+        )
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.load()
+
+
+template_registry = TemplateRegistry()
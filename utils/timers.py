@@ -0,0 +1,100 @@
+import asyncio
+import time
+from utils.db import db
+
+
+class PunishmentTimers:
+    """Планировщик снятия временных наказаний (разбан, снятие роли мута).
+
+    Таймеры хранятся в таблице timers, поэтому переживают перезапуск. Очередью
+    служит индекс по времени истечения: за проход читается не больше batch_size
+    самых ранних истёкших таймеров, так что стоимость прохода не зависит от
+    того, сколько таймеров ещё ждёт. Между проходами задача спит до ближайшего
+    срока, а новый более ранний таймер её будит.
+
+    Обработчики регистрируются когами по виду таймера. Если обработчик упал,
+    таймер переносится на retry_delay секунд, но не больше max_attempts раз.
+    Первый проход ждёт готовности бота: до входа кэш серверов пуст и снять
+    наказание ещё нельзя.
+    """
+
+    def __init__(self, batch_size=50, max_sleep=300, retry_delay=60, max_attempts=5):
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._handlers = {}
+        self._next_at = None
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def register(self, kind, handler, bot):
+        """Подключает обработчик handler(timer) и запускает планировщик"""
+        self._handlers[kind] = handler
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(bot))
+        else:
+            # Могли накопиться таймеры этого вида, пока обработчика не было
+            self._wake.set()
+
+    def unregister(self, kind):
+        """Отключает обработчик; без обработчиков планировщик останавливается"""
+        self._handlers.pop(kind, None)
+        if not self._handlers and self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def schedule(self, guild_id, user_id, kind, seconds, reason=None):
+        """Ставит таймер через seconds секунд (повторный вызов переносит срок)"""
+        expires_at = time.time() + seconds
+        await db.add_timer(guild_id, user_id, kind, expires_at, reason)
+        if self._next_at is None or expires_at < self._next_at:
+            self._wake.set()
+
+    async def cancel(self, guild_id, user_id, kind):
+        """Отменяет таймер, если наказание сняли вручную"""
+        await db.delete_timer(guild_id, user_id, kind)
+
+    async def _process(self, due):
+        results = await asyncio.gather(
+            *(self._handlers[timer["kind"]](timer) for timer in due),
+            return_exceptions=True
+        )
+        done, postponed = [], []
+        retry_at = time.time() + self.retry_delay
+        for timer, result in zip(due, results):
+            if isinstance(result, Exception):
+                print(f"Ошибка таймера {timer['kind']} для {timer['user_id']}: {result}")
+                if timer["attempts"] + 1 < self.max_attempts:
+                    postponed.append((retry_at, timer["id"], timer["expires_at"]))
+                    continue
+                print(f"Таймер {timer['kind']} для {timer['user_id']} снят после {self.max_attempts} попыток")
+            done.append((timer["id"], timer["expires_at"]))
+        await db.finish_timers(done, postponed)
+
+    async def _run(self, bot):
+        await bot.wait_until_ready()
+        while True:
+            self._wake.clear()
+            kinds = list(self._handlers)
+            try:
+                due = await db.get_due_timers(time.time(), kinds, self.batch_size)
+                if due:
+                    await self._process(due)
+                    if len(due) == self.batch_size:
+                        continue
+                self._next_at = await db.next_timer_at(kinds)
+            except Exception as e:
+                print(f"Ошибка планировщика наказаний: {e}")
+                self._next_at = None
+
+            delay = self.max_sleep
+            if self._next_at is not None:
+                delay = min(delay, max(0, self._next_at - time.time()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+timers = PunishmentTimers()
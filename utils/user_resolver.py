@@ -0,0 +1,78 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import discord
+
+
+class UserResolver:
+    """Поиск пользователей по ID для списков модерации.
+
+    Сначала проверяется кэш участников сервера и пользователей клиента, затем
+    LRU-кэш ранее загруженных через API (записи живут ttl секунд), и только
+    потом идут запросы fetch_user. Запросы выполняются параллельно, а одновременные
+    обращения к одному ID ждут один и тот же запрос.
+    """
+
+    def __init__(self, max_size=1024, ttl=3600, concurrency=10):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _cached(self, client, user_id, guild=None):
+        """Возвращает (найден, пользователь) без обращения к API"""
+        user = (guild.get_member(user_id) if guild else None) or client.get_user(user_id)
+        if user:
+            return True, user
+
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        expires, user = entry
+        if expires < time.monotonic():
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, user
+
+    def _remember(self, user_id, user):
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, client, user_id):
+        try:
+            async with self._semaphore:
+                user = await client.fetch_user(user_id)
+        except discord.NotFound:
+            # Удалённый аккаунт тоже запоминаем, чтобы не спрашивать API повторно
+            user = None
+        except discord.HTTPException:
+            return None
+        self._remember(user_id, user)
+        return user
+
+    async def resolve(self, client, user_id, guild=None):
+        """Возвращает участника или пользователя по ID, None — если его нет"""
+        found, user = self._cached(client, user_id, guild)
+        if found:
+            return user
+
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(client, user_id))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    async def resolve_many(self, client, user_ids, guild=None):
+        """Возвращает {user_id: пользователь или None}; недостающих загружает параллельно"""
+        user_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(*(self.resolve(client, user_id, guild) for user_id in user_ids))
+        return dict(zip(user_ids, users))
+
+
+users = UserResolver()
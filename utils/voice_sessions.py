@@ -0,0 +1,99 @@
+import time
+
+
+class VoiceSession:
+    """Голосовая сессия участника: текущий канал и накопленные активные минуты"""
+
+    __slots__ = ("channel_id", "active", "since", "minutes")
+
+    def __init__(self, channel_id, active, now):
+        self.channel_id = channel_id
+        self.active = active
+        self.since = now
+        self.minutes = 0.0
+
+    def settle(self, now):
+        """Переносит время с момента последнего перехода в накопленные минуты"""
+        if self.active:
+            self.minutes += (now - self.since) / 60
+        self.since = now
+
+
+class VoiceSessions:
+    """Учёт голосовых сессий по ключу (guild_id, user_id).
+
+    Время засчитывается, только пока сессия активна: участник не заглушён,
+    не отключил звук и не сидит в AFK-канале. Переходы между каналами и
+    смена состояния закрывают отрезок, не прерывая сессию, а периодический
+    сбор забирает минуты сразу у всех участников.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, key):
+        return key in self._sessions
+
+    def get(self, key):
+        return self._sessions.get(key)
+
+    def update(self, key, channel_id, active):
+        """Начинает сессию или фиксирует переход: смену канала, заглушение, отключение звука"""
+        now = self.clock()
+        session = self._sessions.get(key)
+        if session is None:
+            self._sessions[key] = VoiceSession(channel_id, active, now)
+            return
+        session.settle(now)
+        session.channel_id = channel_id
+        session.active = active
+
+    def end(self, key):
+        """Завершает сессию и возвращает (channel_id, минуты) или None"""
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return None
+        session.settle(self.clock())
+        return session.channel_id, session.minutes
+
+    def suspend(self):
+        """Останавливает отсчёт всех сессий при потере связи со шлюзом.
+
+        Что происходило без связи, неизвестно, поэтому время засчитывается
+        по момент отключения; следующий sync() продолжит сессии с этого места.
+        """
+        now = self.clock()
+        for session in self._sessions.values():
+            session.settle(now)
+            session.active = False
+
+    def sync(self, states):
+        """Приводит сессии к фактическим голосовым состояниям после запуска или переподключения.
+
+        states — {(guild_id, user_id): (channel_id, active)}. Уже идущие сессии
+        продолжаются, новые начинаются, а сессии ушедших участников завершаются
+        и возвращаются списком [(key, channel_id, минуты)].
+        """
+        ended = []
+        for key in list(self._sessions):
+            if key not in states:
+                channel_id, minutes = self.end(key)
+                ended.append((key, channel_id, minutes))
+        for key, (channel_id, active) in states.items():
+            self.update(key, channel_id, active)
+        return ended
+
+    def collect(self):
+        """Забирает накопленные минуты всех сессий: [(key, channel_id, минуты)]"""
+        now = self.clock()
+        collected = []
+        for key, session in self._sessions.items():
+            session.settle(now)
+            if session.minutes > 0:
+                collected.append((key, session.channel_id, session.minutes))
+                session.minutes = 0.0
+        return collected
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from collections import OrderedDict
+from utils.db import db
+from utils.xp_ledger import SOURCE_TEXT
+
+
+class XPBuffer:
+    """Накопитель опыта с отложенной пакетной записью в базу.
+
+    Прибавки складываются в памяти по ключу (guild_id, user_id) и сбрасываются
+    одной транзакцией раз в flush_interval секунд, при переполнении буфера
+    и при выгрузке кога. Повышение уровня определяется сразу по итогам в памяти.
+    Если передан журнал, каждая прибавка сначала попадает в него, а сброс буфера
+    служит снимком: вместе с опытом сохраняется LSN последней записи.
+
+    Итоги в памяти держатся, пока пользователь активен: при сбросе вытесняются
+    записи без несохранённых прибавок, к которым не обращались idle_ttl секунд.
+    """
+
+    def __init__(self, level_func, ledger=None, flush_interval=5, max_pending=200, idle_ttl=600):
+        self.level_func = level_func
+        self.ledger = ledger
+        self.snapshot_lsn = 0
+        self._last_lsn = None
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.idle_ttl = idle_ttl
+        self.totals = {}
+        self.pending = {}
+        self._touched = OrderedDict()  # (guild_id, user_id) -> время обращения, старые первыми
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._overflow_task = None
+
+    def start(self):
+        """Запускает периодический сброс буфера"""
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Останавливает фоновую задачу и сбрасывает остаток буфера"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._overflow_task:
+            await self._overflow_task
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def _get_totals(self, guild_id, user_id):
+        """Возвращает итоги пользователя из памяти, при первом обращении читает базу"""
+        key = (guild_id, user_id)
+        if key not in self.totals:
+            row = await db.get_leveling(guild_id, user_id) or {
+                "guild_id": guild_id,
+                "user_id": user_id,
+                "text_xp": 0,
+                "voice_xp": 0,
+                "total_xp": 0,
+                "level": 1,
+                "voice_time": 0
+            }
+            # Пока шло чтение, другой вызов мог уже положить итоги в память
+            self.totals.setdefault(key, row)
+        self._touch(key)
+        return self.totals[key]
+
+    def _touch(self, key):
+        self._touched[key] = time.monotonic()
+        self._touched.move_to_end(key)
+
+    def _evict_idle(self):
+        """Убирает из памяти итоги, которые сохранены и давно не использовались"""
+        deadline = time.monotonic() - self.idle_ttl
+        while self._touched:
+            key, touched_at = next(iter(self._touched.items()))
+            if touched_at > deadline:
+                break
+            del self._touched[key]
+            if key in self.pending:
+                # Прибавки ещё не сохранены: вытесним после следующего сброса
+                self._touch(key)
+                continue
+            self.totals.pop(key, None)
+
+    async def preload(self, guild_id, user_ids):
+        """Загружает в память итоги нескольких пользователей сервера одним запросом"""
+        missing = [user_id for user_id in user_ids if (guild_id, user_id) not in self.totals]
+        for user_id, row in (await db.get_leveling_many(guild_id, missing)).items():
+            self.totals.setdefault((guild_id, user_id), row)
+            self._touch((guild_id, user_id))
+
+    async def get(self, guild_id, user_id):
+        """Возвращает актуальные итоги пользователя на сервере или None, не кэшируя их"""
+        if (guild_id, user_id) in self.totals:
+            return dict(self.totals[(guild_id, user_id)])
+        return await db.get_leveling(guild_id, user_id)
+
+    async def get_many(self, guild_id, user_ids):
+        """Возвращает актуальные итоги нескольких пользователей сервера: {user_id: запись}"""
+        result = {
+            user_id: dict(self.totals[(guild_id, user_id)])
+            for user_id in user_ids if (guild_id, user_id) in self.totals
+        }
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        result.update(await db.get_leveling_many(guild_id, missing))
+        return result
+
+    async def add(self, guild_id, user_id, text_xp=0, voice_xp=0, voice_time=0, source=SOURCE_TEXT):
+        """Добавляет опыт в буфер и возвращает (старый_уровень, новый_уровень)"""
+        totals = await self._get_totals(guild_id, user_id)
+        # Между записью в журнал и попаданием в буфер не должно быть await,
+        # иначе сброс может сохранить LSN записи, которой ещё нет в пачке
+        if self.ledger:
+            self._last_lsn = self.ledger.append(guild_id, user_id, text_xp, voice_xp, voice_time, source)
+        totals["text_xp"] += text_xp
+        totals["voice_xp"] += voice_xp
+        totals["total_xp"] += text_xp + voice_xp
+        totals["voice_time"] += voice_time
+
+        old_level = totals["level"]
+        totals["level"] = max(1, self.level_func(totals["total_xp"]))
+
+        delta = self.pending.setdefault(
+            (guild_id, user_id),
+            {"text_xp": 0, "voice_xp": 0, "voice_time": 0}
+        )
+        delta["text_xp"] += text_xp
+        delta["voice_xp"] += voice_xp
+        delta["voice_time"] += voice_time
+
+        if len(self.pending) >= self.max_pending and (self._overflow_task is None or self._overflow_task.done()):
+            self._overflow_task = asyncio.create_task(self.flush())
+
+        return old_level, totals["level"]
+
+    async def flush(self):
+        """Записывает накопленные прибавки одной транзакцией"""
+        async with self._lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+            lsn = self._last_lsn
+
+            rows = [
+                {
+                    "guild_id": key[0],
+                    "user_id": key[1],
+                    **delta,
+                    "level": self.totals[key]["level"] if key in self.totals else None
+                }
+                for key, delta in batch.items()
+            ]
+            try:
+                if self.ledger:
+                    await self.ledger.sync()
+                await db.apply_xp_batch(rows, lsn)
+                if lsn is not None:
+                    self.snapshot_lsn = lsn
+                self._evict_idle()
+            except Exception as e:
+                print(f"Ошибка при сохранении опыта: {e}")
+                # Возвращаем прибавки в буфер, чтобы не потерять их до следующей попытки
+                for key, delta in batch.items():
+                    merged = self.pending.setdefault(key, {"text_xp": 0, "voice_xp": 0, "voice_time": 0})
+                    for field, value in delta.items():
+                        merged[field] += value
@@ -0,0 +1,171 @@
+import asyncio
+import gzip
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+LEDGER_PATH = Path("data/xp_ledger")
+
+SOURCE_TEXT = 1
+SOURCE_VOICE = 2
+SOURCE_ADMIN = 3
+
+# lsn, время, сервер, участник, текстовый опыт, голосовой опыт, минуты в войсе, источник
+RECORD = struct.Struct("<QdQQiidB")
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+
+XPRecord = namedtuple(
+    "XPRecord",
+    "lsn timestamp guild_id user_id text_xp voice_xp voice_time source"
+)
+
+
+class XPLedger:
+    """Журнал изменений опыта: двоичные записи фиксированной длины только на дозапись.
+
+    Каждая запись получает возрастающий номер (LSN) и контрольную сумму, поэтому
+    оборванный при сбое хвост распознаётся и отрезается. Журнал делится на сегменты;
+    снимком служит таблица leveling, в которой хранится LSN последней применённой
+    записи, так что при запуске нужно проиграть только хвост после него.
+    """
+
+    def __init__(self, path=LEDGER_PATH, segment_size=4 * 1024 * 1024, retention_days=30):
+        self.path = Path(path)
+        self.segment_size = segment_size
+        self.retention_days = retention_days
+        self.next_lsn = 1
+        self._file = None
+        self._buffer = bytearray()  # Записи, ещё не переданные в поток журнала
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="xp-ledger")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _segments(self):
+        """Сегменты журнала по возрастанию первого LSN: [(first_lsn, путь)]"""
+        segments = {}
+        for file in self.path.glob("*.log*"):
+            first_lsn = int(file.name.split(".")[0])
+            # Если сжатие прервалось, несжатая копия сегмента главнее
+            if first_lsn not in segments or file.suffix == ".log":
+                segments[first_lsn] = file
+        return sorted(segments.items())
+
+    @staticmethod
+    def _read_segment(file):
+        """Читает записи сегмента до первой повреждённой"""
+        opener = gzip.open if file.suffix == ".gz" else open
+        with opener(file, "rb") as f:
+            data = f.read()
+
+        records = []
+        for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            payload = data[offset:offset + RECORD.size]
+            (crc,) = CRC.unpack_from(data, offset + RECORD.size)
+            if zlib.crc32(payload) != crc:
+                break
+            records.append(XPRecord(*RECORD.unpack(payload)))
+        return records
+
+    def _open(self, snapshot_lsn):
+        self.path.mkdir(parents=True, exist_ok=True)
+        segments = self._segments()
+        last_lsn = snapshot_lsn
+
+        if segments and segments[-1][1].suffix == ".log":
+            first_lsn, file = segments[-1]
+            records = self._read_segment(file)
+            # Отрезаем недописанный при сбое хвост
+            with open(file, "r+b") as f:
+                f.truncate(len(records) * RECORD_SIZE)
+            last_lsn = max(last_lsn, first_lsn - 1, records[-1].lsn if records else 0)
+            self._file = open(file, "ab")
+        else:
+            self._file = open(self.path / f"{last_lsn + 1:020d}.log", "ab")
+
+        self.next_lsn = last_lsn + 1
+
+    async def open(self, snapshot_lsn=0):
+        """Открывает журнал; нумерация продолжается после snapshot_lsn и последней записи"""
+        await self._run(self._open, snapshot_lsn)
+
+    async def close(self):
+        if self._file:
+            await self.sync()
+            await self._run(self._file.close)
+            self._file = None
+        self._executor.shutdown(wait=True)
+
+    def append(self, guild_id, user_id, text_xp=0, voice_xp=0, voice_time=0, source=SOURCE_TEXT):
+        """Дописывает запись в буфер в памяти и возвращает её LSN.
+
+        Запись попадает в файл и становится надёжной при следующем sync().
+        """
+        lsn = self.next_lsn
+        self.next_lsn += 1
+        payload = RECORD.pack(
+            lsn, time.time(), guild_id, user_id,
+            int(text_xp), int(voice_xp), float(voice_time), source
+        )
+        self._buffer += payload + CRC.pack(zlib.crc32(payload))
+        return lsn
+
+    def _sync(self, data, next_lsn):
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if self._file.tell() >= self.segment_size:
+            self._file.close()
+            self._file = open(self.path / f"{next_lsn:020d}.log", "ab")
+
+    async def sync(self):
+        """Записывает буфер на диск и при необходимости начинает новый сегмент.
+
+        Запись, fsync и смена сегмента выполняются в потоке журнала,
+        поэтому цикл событий не ждёт диск.
+        """
+        data, self._buffer = bytes(self._buffer), bytearray()
+        await self._run(self._sync, data, self.next_lsn)
+
+    def _read_after(self, lsn):
+        segments = self._segments()
+        records = []
+        for i, (first_lsn, file) in enumerate(segments):
+            # Сегмент целиком до lsn, если следующий начинается не позже lsn + 1
+            if i + 1 < len(segments) and segments[i + 1][0] <= lsn + 1:
+                continue
+            records.extend(record for record in self._read_segment(file) if record.lsn > lsn)
+        return records
+
+    async def read_after(self, lsn):
+        """Возвращает записи с номером больше lsn — хвост после снимка"""
+        return await self._run(self._read_after, lsn)
+
+    def _compact(self, snapshot_lsn):
+        segments = self._segments()
+        expire_before = time.time() - self.retention_days * 86400
+        for i, (first_lsn, file) in enumerate(segments[:-1]):
+            # Закрытый сегмент полностью вошёл в снимок, если следующий начинается не позже него
+            if segments[i + 1][0] > snapshot_lsn + 1:
+                break
+            if file.stat().st_mtime < expire_before:
+                file.unlink()
+            elif file.suffix == ".log":
+                stat = file.stat()
+                tmp = file.with_suffix(".tmp")
+                with open(file, "rb") as src, gzip.open(tmp, "wb") as dst:
+                    dst.write(src.read())
+                # Срок хранения отсчитывается от времени записи, а не сжатия
+                os.utime(tmp, (stat.st_atime, stat.st_mtime))
+                os.replace(tmp, file.with_suffix(".log.gz"))
+                file.unlink()
+
+    async def compact(self, snapshot_lsn):
+        """Сжимает в фоне сегменты, вошедшие в снимок, и удаляет просроченные"""
+        await self._run(self._compact, snapshot_lsn)